@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Motor assíncrono (asyncio) para o Bot de Trading Betfair
+Monitoramento e descoberta rodam como tarefas independentes, cada uma com sua cadência,
+e os mercados candidatos são avaliados em paralelo com concorrência limitada
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict
+
+from betfair_api import AsyncBetfairAPI
+from betfair_bot import BetfairTradingBot, BetStatus, SportType
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTradingEngine:
+    """Executa as estratégias do BetfairTradingBot em um loop asyncio"""
+
+    def __init__(self, bot: BetfairTradingBot):
+        """
+        Args:
+            bot: Bot já inicializado (config, API autenticada e banco)
+        """
+        self.bot = bot
+
+        # Configurações do motor
+        self.max_concurrency = int(bot.bot_config.get('bot', 'max_concurrency', fallback='8'))
+        self.monitor_interval = float(bot.bot_config.get('bot', 'monitor_interval', fallback='5'))
+        self.check_interval = float(bot.check_interval)
+        self.max_markets_per_cycle = int(bot.bot_config.get('bot', 'max_markets_per_cycle', fallback='20'))
+
+        self.api = AsyncBetfairAPI(bot.api, max_concurrency=self.max_concurrency)
+
+        self.cycle_count = 0
+
+    async def ensure_login(self) -> bool:
+        """Garante que há um token de sessão válido"""
+        if self.api.session_token:
+            return True
+        logger.warning("⚠️ Token não encontrado, fazendo login...")
+        if await self.api.login():
+            logger.info("✅ Login realizado com sucesso")
+            return True
+        logger.error("❌ Falha no login")
+        return False
+
+    async def monitor_loop(self):
+        """Tarefa de monitoramento das apostas ativas (take profit, stop loss, timeout)"""
+        while True:
+            try:
+                if await self.ensure_login():
+                    await self.api.call(self._locked, self._monitor_active_bets)
+            except Exception as e:
+                logger.error(f"Erro no monitoramento: {e}", exc_info=True)
+
+            await asyncio.sleep(self.monitor_interval)
+
+    async def discovery_loop(self):
+        """Tarefa de descoberta de mercados e entrada em novas apostas"""
+        while True:
+            cycle_start = time.monotonic()
+            api_calls_before = self.bot.api.request_count
+            self.cycle_count += 1
+            logger.info(f"\n🔄 Ciclo #{self.cycle_count} - {datetime.now().strftime('%H:%M:%S')}")
+
+            try:
+                if await self.ensure_login():
+                    await self.run_cycle()
+                    await self.api.call(self.bot.confirm_placed_bets)
+
+                    # Estatísticas a cada 10 ciclos
+                    if self.cycle_count % 10 == 1:
+                        await self.api.call(self._locked, self.bot.print_stats)
+                else:
+                    self.bot.record_error("Falha no login")
+            except Exception as e:
+                logger.error(f"Erro no ciclo de descoberta: {e}", exc_info=True)
+                self.bot.record_error(e)
+
+            elapsed = time.monotonic() - cycle_start
+            logger.info(f"⏱️ Ciclo #{self.cycle_count} concluído em {elapsed:.2f}s")
+            # Inclui as chamadas do monitoramento feitas durante o ciclo
+            await self.api.call(
+                self._locked, self.bot.record_heartbeat,
+                self.cycle_count, elapsed, self.bot.api.request_count - api_calls_before
+            )
+            await asyncio.sleep(max(0.0, self.check_interval - elapsed))
+
+    async def run_cycle(self):
+        """Descobre mercados ao vivo e avalia os candidatos em paralelo"""
+        await self.api.call(self._locked, self.bot.begin_cycle)
+
+        live_sports = []
+        if self.bot.soccer_config['enabled']:
+            live_sports.append(SportType.SOCCER)
+
+        live_markets = await self.api.call(self.bot.discover_live_markets, live_sports)
+        matches = live_markets.get(SportType.SOCCER, [])[:self.max_markets_per_cycle]
+        logger.info(f"📊 Encontradas {len(matches)} partidas de futebol ao vivo")
+
+        if not matches:
+            return
+
+        # Saldo, ordens atuais e apostas do banco entram no snapshot antes da
+        # avaliação paralela (as avaliações só leem, sem buscar cada uma a sua)
+        await self.api.call(self._locked, self._prefetch_cycle_state)
+
+        results = await asyncio.gather(
+            *(self.evaluate_soccer_market(match) for match in matches),
+            return_exceptions=True
+        )
+
+        for match, result in zip(matches, results):
+            if isinstance(result, Exception):
+                logger.error(f"Erro ao avaliar mercado {match['market_id']}: {result}")
+
+        placed = sum(1 for result in results if result is True)
+        logger.info(f"📊 Futebol: {len(matches)} mercados verificados, {placed} apostas colocadas")
+
+    async def evaluate_soccer_market(self, match: Dict) -> bool:
+        """Avalia as condições de entrada de um mercado e aposta se forem atendidas"""
+        entry_conditions = await self.api.call(
+            self.bot.check_soccer_entry_conditions,
+            match['market_id'],
+            match.get('under_runner_id')
+        )
+        if not entry_conditions:
+            return False
+
+        bet_id = await self.api.call(self._open_soccer_bet, match, entry_conditions)
+        return bet_id is not None
+
+    def _locked(self, func, *args):
+        """Executa func com o estado compartilhado do bot travado (roda em thread)"""
+        with self.bot.state_lock:
+            return func(*args)
+
+    def _monitor_active_bets(self):
+        active_count = sum(1 for b in self.bot.active_bets.values() if b.status == BetStatus.ACTIVE)
+        if active_count > 0:
+            logger.info(f"📊 Monitorando {active_count} aposta(s) ativa(s)...")
+            self.bot.monitor_active_bets()
+
+    def _prefetch_cycle_state(self):
+        self.bot.get_account_balance()
+        self.bot.get_current_orders_snapshot()
+        self.bot.get_db_active_bets()
+
+    def _open_soccer_bet(self, match: Dict, entry_conditions: Dict):
+        """
+        Coloca a aposta com o estado do bot travado
+
+        Apenas uma aposta é colocada por vez (limites e saldo dependem das
+        anteriores), e nunca durante uma passada do monitoramento.
+        """
+        with self.bot.state_lock:
+            # Reverificar com o estado atualizado pelas apostas colocadas enquanto aguardava
+            if not self._can_open_soccer_bet(match['market_id']):
+                return None
+            return self.bot.open_soccer_bet(match, entry_conditions)
+
+    def _can_open_soccer_bet(self, market_id: str) -> bool:
+        """Verifica limite de apostas e duplicidade no mercado"""
+        active = [b for b in self.bot.active_bets.values() if b.status == BetStatus.ACTIVE]
+        if any(b.market_id == market_id for b in active):
+            logger.info(f"⚠️ Mercado {market_id}: Aposta já colocada neste ciclo")
+            return False
+        soccer_bets_count = sum(1 for b in active if b.sport == SportType.SOCCER)
+        if soccer_bets_count >= self.bot.max_bets_per_sport:
+            logger.info(f"⚠️ Limite de apostas de futebol atingido: {soccer_bets_count}/{self.bot.max_bets_per_sport}")
+            return False
+        return True
+
+    async def run(self):
+        """Executa as tarefas de monitoramento e descoberta até serem canceladas"""
+        logger.info("=" * 60)
+        logger.info(f"🤖 Bot iniciado (motor assíncrono, concorrência {self.max_concurrency}) - Procurando oportunidades...")
+        logger.info("=" * 60)
+
+        await asyncio.gather(self.monitor_loop(), self.discovery_loop())
+
+    def start(self):
+        """Ponto de entrada síncrono"""
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            logger.info("Bot interrompido pelo usuário")
+        finally:
+            self.api.close()
+            self.bot.db.close()
+
+
+if __name__ == '__main__':
+    AsyncTradingEngine(BetfairTradingBot()).start()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ponta a ponta dos ciclos do BetfairTradingBot
+
+Roda ciclos completos do bot (descoberta, monitoramento, estratégia de futebol)
+contra o simulador local (betfair_simulator.py, em processo separado) para cada
+combinação de mercados ao vivo x apostas ativas, e grava em JSON:
+p50/p95/p99 do tempo de ciclo, chamadas à API por ciclo, queries SQLite por
+ciclo e pico de memória.
+
+Uso:
+    python benchmark.py                              # 10/100/1000 mercados x 1/10/100 apostas
+    python benchmark.py --markets 100 --bets 10 --cycles 50 --latency-ms 40
+    python benchmark.py --output resultados/antes.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+import requests
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil com interpolação linear (pct de 0 a 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def free_port() -> int:
+    """Porta TCP livre na interface local"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class QueryCounter:
+    """Conta as instruções SQL (via trace callback do sqlite3) e as conexões abertas pelo BetDatabase"""
+
+    def __init__(self, db):
+        self.db = db
+        self.count = 0
+        get_connection = db._get_connection
+
+        def traced_connection(*args, **kwargs):
+            conn = get_connection(*args, **kwargs)
+            conn.set_trace_callback(self._trace)
+            return conn
+
+        db._get_connection = traced_connection
+
+    @property
+    def connections(self) -> int:
+        return self.db.connections_opened
+
+    def _trace(self, statement):
+        self.count += 1
+
+
+class SimulatorProcess:
+    """Simulador da exchange rodando em outro processo (não disputa o GIL com o bot)"""
+
+    def __init__(self, workdir: str, markets: int, args):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.config_file = os.path.join(workdir, 'config.ini')
+        self.log_file = open(os.path.join(workdir, 'simulator.log'), 'w')
+        self.process = subprocess.Popen(
+            [
+                sys.executable, os.path.join(BASE_DIR, 'betfair_simulator.py'),
+                '--port', str(self.port),
+                '--soccer-markets', str(markets),
+                '--latency-ms', str(args.latency_ms),
+                '--latency-jitter-ms', str(args.latency_jitter_ms),
+                '--volatility', str(args.volatility),
+                '--balance', '1000000',
+                '--seed', str(args.seed),
+                '--write-config', self.config_file,
+            ],
+            stdout=self.log_file,
+            stderr=subprocess.STDOUT,
+        )
+        self._wait_ready()
+
+    def _wait_ready(self, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise Exception(f"Simulador encerrou (código {self.process.returncode})")
+            try:
+                self.stats()
+                return
+            except requests.exceptions.RequestException:
+                time.sleep(0.1)
+        raise Exception("Simulador não respondeu a tempo")
+
+    def stats(self) -> Dict:
+        response = requests.get(f"{self.url}/simulator/stats", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log_file.close()
+
+
+def write_bot_config(path: str, bets: int, write_behind: bool = False):
+    """Config do bot para carga estável: sem janela de tempo, TP/SL e timeout fora de alcance"""
+    with open(path, 'w') as f:
+        f.write(
+            "[bot]\n"
+            "stake = 2.0\n"
+            f"max_bets_per_sport = {bets}\n"
+            "check_interval = 0\n"
+            f"db_write_behind = {'true' if write_behind else 'false'}\n"
+            "\n"
+            "[soccer]\n"
+            "enabled = true\n"
+            "check_time_window = false\n"
+            "min_odd = 1.01\n"
+            "take_profit_pct = 1000\n"
+            "stop_loss_pct = 1000\n"
+            "timeout_minutes = 100000\n"
+            "\n"
+            "[hockey]\n"
+            "enabled = false\n"
+            "\n"
+            "[tennis]\n"
+            "enabled = false\n"
+        )
+
+
+def seed_active_bets(bot, count: int) -> int:
+    """
+    Abre `count` apostas pelo fluxo normal do bot (place_back_bet + banco)
+
+    Com menos mercados que apostas, os mercados são reaproveitados (várias
+    apostas por mercado) para manter a carga de monitoramento pedida.
+    """
+    from betfair_bot import SportType
+
+    bot.begin_cycle()
+    matches = bot.discover_live_markets([SportType.SOCCER]).get(SportType.SOCCER, [])
+    if not matches:
+        return 0
+
+    placed = 0
+    attempts = 0
+    while placed < count and attempts < count * 3:
+        batch = [matches[(placed + i) % len(matches)] for i in range(min(len(matches), count - placed))]
+        books = bot.api.list_market_books(
+            [match['market_id'] for match in batch],
+            price_projection={'priceData': ['EX_BEST_OFFERS']}
+        )
+        for match in batch:
+            attempts += 1
+            book = books.get(match['market_id']) or {}
+            runner = next((r for r in book.get('runners', [])
+                           if r.get('selectionId') == match['under_runner_id']), None)
+            available = (runner or {}).get('ex', {}).get('availableToBack', [])
+            if not available:
+                continue  # mercado suspenso - tentar de novo na próxima passada
+            entry_conditions = {'selection_id': match['under_runner_id'], 'price': available[0]['price']}
+            if bot.open_soccer_bet(match, entry_conditions):
+                placed += 1
+                if placed >= count:
+                    break
+    return placed
+
+
+def run_scenario(markets: int, bets: int, args, root: str) -> Dict:
+    """Executa um cenário (mercados ao vivo x apostas ativas) e devolve as métricas"""
+    from betfair_bot import BetfairTradingBot, BetStatus
+
+    workdir = os.path.join(root, f"markets_{markets}_bets_{bets}")
+    os.makedirs(os.path.join(workdir, 'data'), exist_ok=True)
+    # BetDatabase usa caminho relativo (data/bets.db)
+    os.chdir(workdir)
+
+    simulator = SimulatorProcess(workdir, markets, args)
+    bot = None
+    try:
+        write_bot_config('bot_config.ini', bets, args.db_write_behind)
+        bot = BetfairTradingBot(config_file='config.ini', bot_config_file='bot_config.ini')
+        queries = QueryCounter(bot.db)
+
+        seeded = seed_active_bets(bot, bets)
+
+        cycle_times = []
+        api_requests = []
+        api_calls = []
+        calls_by_method: Dict[str, int] = {}
+        sqlite_queries = []
+        sqlite_connections = []
+        errors = 0
+
+        def run_one_cycle():
+            bot.begin_cycle()
+            bot.run_cycle()
+            bot.bet_counter += 1
+
+        for cycle in range(args.warmup + args.cycles):
+            api_before = simulator.stats()
+            queries_before = queries.count
+            connections_before = queries.connections
+            start = time.perf_counter()
+            try:
+                run_one_cycle()
+            except Exception as e:
+                errors += 1
+                logger.warning(f"Erro no ciclo {cycle + 1}: {e}")
+            elapsed = time.perf_counter() - start
+            api_after = simulator.stats()
+
+            if cycle < args.warmup:
+                continue
+
+            cycle_times.append(elapsed * 1000)
+            api_requests.append(api_after['requests'] - api_before['requests'])
+            api_calls.append(api_after['calls'] - api_before['calls'])
+            sqlite_queries.append(queries.count - queries_before)
+            sqlite_connections.append(queries.connections - connections_before)
+            for method, total in api_after['by_method'].items():
+                calls_by_method[method] = calls_by_method.get(method, 0) + total - api_before['by_method'].get(method, 0)
+
+        # Pico de memória de um ciclo medido à parte (tracemalloc distorce o tempo)
+        tracemalloc.start()
+        try:
+            run_one_cycle()
+        except Exception as e:
+            logger.warning(f"Erro no ciclo de memória: {e}")
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        cycles = len(cycle_times)
+        return {
+            'markets': markets,
+            'active_bets': bets,
+            'active_bets_seeded': seeded,
+            'active_bets_end': sum(1 for b in bot.active_bets.values() if b.status == BetStatus.ACTIVE),
+            'cycles': cycles,
+            'errors': errors,
+            'cycle_time_ms': {
+                'p50': round(percentile(cycle_times, 50), 3),
+                'p95': round(percentile(cycle_times, 95), 3),
+                'p99': round(percentile(cycle_times, 99), 3),
+                'mean': round(sum(cycle_times) / cycles, 3) if cycles else 0.0,
+                'min': round(min(cycle_times), 3) if cycles else 0.0,
+                'max': round(max(cycle_times), 3) if cycles else 0.0,
+            },
+            'api_requests_per_cycle': round(sum(api_requests) / cycles, 2) if cycles else 0.0,
+            'api_calls_per_cycle': round(sum(api_calls) / cycles, 2) if cycles else 0.0,
+            'api_calls_by_method_per_cycle': {
+                method: round(total / cycles, 2) for method, total in sorted(calls_by_method.items())
+            } if cycles else {},
+            'sqlite_queries_per_cycle': round(sum(sqlite_queries) / cycles, 2) if cycles else 0.0,
+            'sqlite_connections_per_cycle': round(sum(sqlite_connections) / cycles, 2) if cycles else 0.0,
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
+    finally:
+        if bot is not None:
+            bot.api.close()
+            bot.db.close()
+        simulator.stop()
+        os.chdir(root)
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Benchmark de ciclos do BetfairTradingBot contra o simulador local')
+    parser.add_argument('--markets', type=parse_int_list, default=[10, 100, 1000],
+                        help='Mercados ao vivo por cenário (ex: 10,100,1000)')
+    parser.add_argument('--bets', type=parse_int_list, default=[1, 10, 100],
+                        help='Apostas ativas por cenário (ex: 1,10,100)')
+    parser.add_argument('--cycles', type=int, default=20, help='Ciclos medidos por cenário')
+    parser.add_argument('--warmup', type=int, default=2, help='Ciclos de aquecimento (descartados)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latência do simulador por requisição')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--volatility', type=float, default=0.0,
+                        help='Volatilidade das odds (0 = odds paradas, carga repetível)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-write-behind', action='store_true',
+                        help='Ativar o escritor em segundo plano do banco (db_write_behind)')
+    parser.add_argument('--log-level', default='WARNING', help='Nível de log do bot durante o benchmark')
+    parser.add_argument('--workdir', default=None, help='Diretório de trabalho (padrão: temporário)')
+    parser.add_argument('--output', default='benchmark_results.json', help='Arquivo JSON de saída')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    root = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='betfair_benchmark_'))
+    os.makedirs(os.path.join(root, 'logs'), exist_ok=True)
+
+    # betfair_bot configura o log em logs/bot.log (relativo) ao ser importado
+    os.chdir(root)
+    sys.path.insert(0, BASE_DIR)
+    import betfair_bot  # noqa: F401
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    print(f"📁 Diretório de trabalho: {root}")
+    scenarios = []
+    for markets in args.markets:
+        for bets in args.bets:
+            print(f"⏱️ Cenário: {markets} mercados x {bets} apostas ativas...", flush=True)
+            result = run_scenario(markets, bets, args, root)
+            scenarios.append(result)
+            times = result['cycle_time_ms']
+            print(f"   p50 {times['p50']:.1f}ms | p95 {times['p95']:.1f}ms | p99 {times['p99']:.1f}ms | "
+                  f"API {result['api_calls_per_cycle']:.1f} chamadas ({result['api_requests_per_cycle']:.1f} req) | "
+                  f"SQLite {result['sqlite_queries_per_cycle']:.1f} | pico {result['peak_memory_kb']:.0f} KB", flush=True)
+
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'cycles': args.cycles,
+            'warmup': args.warmup,
+            'latency_ms': args.latency_ms,
+            'latency_jitter_ms': args.latency_jitter_ms,
+            'volatility': args.volatility,
+            'seed': args.seed,
+            'db_write_behind': args.db_write_behind,
+            'log_level': args.log_level.upper(),
+        },
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        'scenarios': scenarios,
+    }
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Resultados salvos em: {output}")
+
+
+if __name__ == '__main__':
+    main()
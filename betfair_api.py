@@ -3,12 +3,52 @@
 Cliente básico para interagir com a API Betfair Exchange
 """
 
+import asyncio
 import requests
 import json
 import logging
+import math
+import threading
 from configparser import ConfigParser
+from requests.adapters import HTTPAdapter
 from betfair_login import BetfairLogin
 
+# Limite de "data weight" por requisição de listMarketBook imposto pela Exchange
+MAX_MARKET_BOOK_WEIGHT = 200
+
+# Peso por mercado de cada priceData (sem priceData o peso é 2)
+PRICE_DATA_WEIGHTS = {
+    'SP_AVAILABLE': 3,
+    'SP_TRADED': 7,
+    'EX_BEST_OFFERS': 5,
+    'EX_ALL_OFFERS': 17,
+    'EX_TRADED': 17,
+}
+
+
+def market_book_weight(price_projection=None):
+    """
+    Calcula o peso (data weight) de um mercado em listMarketBook
+    
+    Args:
+        price_projection: Projeção de preços usada na requisição
+        
+    Returns:
+        int: Peso de um mercado para essa projeção
+    """
+    price_data = (price_projection or {}).get('priceData') or []
+    weight = sum(PRICE_DATA_WEIGHTS.get(item, 0) for item in price_data)
+    
+    # EX_BEST_OFFERS com profundidade maior que 3 pesa proporcionalmente mais
+    overrides = (price_projection or {}).get('exBestOffersOverrides') or {}
+    depth = overrides.get('bestPricesDepth')
+    if 'EX_BEST_OFFERS' in price_data and depth and depth > 3:
+        # Arredondar para cima: um peso subestimado estoura o limite da requisição
+        weight += math.ceil(PRICE_DATA_WEIGHTS['EX_BEST_OFFERS'] * depth / 3) - PRICE_DATA_WEIGHTS['EX_BEST_OFFERS']
+    
+    return max(weight, 2)
+
+
 class BetfairAPI:
     def __init__(self, config_file='config.ini'):
         """
@@ -17,6 +57,7 @@ class BetfairAPI:
         Args:
             config_file: Caminho para o arquivo de configuração
         """
+        self.config_file = config_file
         self.config = ConfigParser()
         self.config.read(config_file)
         
@@ -45,13 +86,105 @@ class BetfairAPI:
             self.fallback_endpoint = None
             self.fallback_account_endpoint = None
         
+        # URL base customizada (ex: simulador local em betfair_simulator.py)
+        api_url = self.config.get('betfair', 'api_url', fallback='').strip().rstrip('/')
+        if api_url:
+            self.api_endpoint = f'{api_url}/exchange/betting/json-rpc/v1'
+            self.account_endpoint = f'{api_url}/exchange/account/json-rpc/v1'
+            self.fallback_endpoint = None
+            self.fallback_account_endpoint = None
+        
         self.session_token = None
+        # Login em andamento é compartilhado entre threads (evita vários logins simultâneos)
+        self._login_lock = threading.Lock()
+        
+        # Pool de conexões HTTP (keep-alive) - um pool por endpoint
+        # Evita um novo handshake TCP/TLS a cada chamada da API
+        self.pool_maxsize = int(self.config.get('betfair', 'pool_maxsize', fallback='10'))
+        self.request_timeout = float(self.config.get('betfair', 'request_timeout', fallback='30'))
+        self._http_sessions = {}
+        self._http_sessions_lock = threading.Lock()
+        
+        # Total de requisições HTTP à API (um batch conta como uma)
+        self.request_count = 0
+        self._request_count_lock = threading.Lock()
+        
+    def _get_http_session(self, endpoint):
+        """
+        Retorna a sessão HTTP persistente (com pool de conexões) do endpoint
+        
+        Cada endpoint (betting, account, fallback) tem seu próprio pool,
+        criado sob demanda e reutilizado durante toda a vida do cliente.
+        
+        Args:
+            endpoint: URL do endpoint
+            
+        Returns:
+            requests.Session: Sessão com keep-alive para o endpoint
+        """
+        http_session = self._http_sessions.get(endpoint)
+        if http_session is not None:
+            return http_session
         
+        with self._http_sessions_lock:
+            http_session = self._http_sessions.get(endpoint)
+            if http_session is None:
+                http_session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=0  # Retry é feito em _make_request
+                )
+                http_session.mount('https://', adapter)
+                http_session.mount('http://', adapter)
+                http_session.headers.update({
+                    'Connection': 'keep-alive',
+                    'Accept-Encoding': 'gzip, deflate',
+                })
+                self._http_sessions[endpoint] = http_session
+        return http_session
+    
+    def _post(self, endpoint, payload, headers):
+        """POST JSON-RPC pela sessão persistente do endpoint (contabilizado em request_count)"""
+        with self._request_count_lock:
+            self.request_count += 1
+        return self._get_http_session(endpoint).post(
+            endpoint,
+            json=payload,
+            headers=headers,
+            timeout=self.request_timeout
+        )
+    
+    def close(self):
+        """Fecha todas as conexões HTTP abertas pelo cliente"""
+        with self._http_sessions_lock:
+            for http_session in self._http_sessions.values():
+                try:
+                    http_session.close()
+                except Exception:
+                    pass
+            self._http_sessions = {}
+    
     def login(self):
         """Faz login e obtém o token de sessão"""
-        login_client = BetfairLogin()
-        self.session_token = login_client.get_session_token()
-        return self.session_token is not None
+        with self._login_lock:
+            login_client = BetfairLogin(self.config_file)
+            self.session_token = login_client.get_session_token()
+            return self.session_token is not None
+    
+    def _relogin(self, expired_token):
+        """
+        Renova a sessão após INVALID_SESSION
+        
+        Chamadas concorrentes com o mesmo token expirado fazem um único login:
+        quem esperou pelo lock reaproveita o token novo obtido pela outra thread.
+        """
+        with self._login_lock:
+            if self.session_token is not None and self.session_token != expired_token:
+                return True
+            login_client = BetfairLogin(self.config_file)
+            self.session_token = login_client.get_session_token()
+            return self.session_token is not None
     
     def set_session_token(self, token):
         """Define o token de sessão manualmente"""
@@ -112,12 +245,7 @@ class BetfairAPI:
         for endpoint_to_use in endpoints_to_try:
             for attempt in range(max_retries):
                 try:
-                    response = requests.post(
-                        endpoint_to_use,
-                        json=payload,
-                        headers=headers,
-                        timeout=30  # Timeout de 30 segundos
-                    )
+                    response = self._post(endpoint_to_use, payload, headers)
                     
                     response.raise_for_status()
                     result = response.json()
@@ -132,17 +260,12 @@ class BetfairAPI:
                         if 'INVALID_SESSION_INFORMATION' in str(error_data) or 'INVALID_SESSION' in str(error_message):
                             logger.warning("Token de sessão inválido ou expirado. Tentando fazer novo login...")
                             # Tentar fazer novo login
-                            if self.login():
+                            if self._relogin(headers['X-Authentication']):
                                 logger.info("✓ Novo login realizado com sucesso. Tentando novamente a requisição...")
                                 # Atualizar headers com novo token
                                 headers['X-Authentication'] = self.session_token
                                 # Tentar novamente a requisição (apenas uma vez)
-                                response = requests.post(
-                                    endpoint_to_use,
-                                    json=payload,
-                                    headers=headers,
-                                    timeout=30
-                                )
+                                response = self._post(endpoint_to_use, payload, headers)
                                 response.raise_for_status()
                                 result = response.json()
                                 if 'error' in result:
@@ -210,6 +333,136 @@ class BetfairAPI:
             raise last_exception
         raise Exception("Erro desconhecido na requisição")
     
+    def _make_batch_request(self, calls, endpoint=None, max_retries=3):
+        """
+        Envia várias chamadas JSON-RPC em um único POST (batch)
+        
+        Todas as chamadas devem pertencer ao mesmo endpoint (ex: SportsAPING
+        no endpoint de betting). Cada resposta é associada à sua chamada
+        pelo 'id'; erros de uma chamada não afetam as demais.
+        
+        Args:
+            calls: Lista de tuplas (method, params)
+            endpoint: Endpoint customizado (opcional)
+            max_retries: Número máximo de tentativas em caso de erro de rede
+            
+        Returns:
+            list: Um item por chamada, na mesma ordem - o 'result' da chamada
+                  ou uma Exception com o erro retornado pela API
+        """
+        import time
+        logger = logging.getLogger(__name__)
+        
+        if not self.session_token:
+            raise Exception("Token de sessão não encontrado. Execute login() primeiro.")
+        
+        if not calls:
+            return []
+        
+        payload = [
+            {
+                'jsonrpc': '2.0',
+                'method': method,
+                'params': params or {},
+                'id': call_id
+            }
+            for call_id, (method, params) in enumerate(calls, start=1)
+        ]
+        
+        api_endpoint = endpoint or self.api_endpoint
+        endpoints_to_try = [api_endpoint]
+        if getattr(self, 'fallback_endpoint', None) and api_endpoint == self.api_endpoint:
+            endpoints_to_try.append(self.fallback_endpoint)
+        
+        relogin_done = False
+        last_exception = None
+        
+        for endpoint_to_use in endpoints_to_try:
+            attempt = 0
+            while attempt < max_retries:
+                headers = {
+                    'X-Application': self.app_key,
+                    'X-Authentication': self.session_token,
+                    'Content-Type': 'application/json'
+                }
+                
+                try:
+                    response = self._post(endpoint_to_use, payload, headers)
+                    response.raise_for_status()
+                    result = response.json()
+                except requests.exceptions.RequestException as e:
+                    last_exception = e
+                    error_str = str(e)
+                    is_dns_error = 'Failed to resolve' in error_str or 'NameResolutionError' in error_str
+                    if is_dns_error and endpoint_to_use != endpoints_to_try[-1]:
+                        logger.warning("Erro de DNS no batch. Tentando próximo endpoint...")
+                        break
+                    attempt += 1
+                    if attempt < max_retries:
+                        wait_time = attempt * 2
+                        logger.warning(f"Erro de rede no batch com {endpoint_to_use}. Tentativa {attempt}/{max_retries}. Aguardando {wait_time}s...")
+                        time.sleep(wait_time)
+                    continue
+                
+                # Erro no nível do batch (ex: JSON inválido) vem como objeto único
+                if isinstance(result, dict):
+                    if 'error' in result:
+                        raise Exception(f"Erro da API no batch: {result['error']}")
+                    result = [result]
+                
+                responses = {item.get('id'): item for item in result if isinstance(item, dict)}
+                
+                # Sessão inválida afeta todas as chamadas: refazer login e reenviar uma vez
+                session_invalid = any(
+                    'INVALID_SESSION' in str(item.get('error', ''))
+                    for item in responses.values()
+                )
+                if session_invalid:
+                    if relogin_done:
+                        raise Exception("Erro da API após re-login: sessão inválida no batch")
+                    logger.warning("Token de sessão inválido ou expirado no batch. Tentando fazer novo login...")
+                    if not self._relogin(headers['X-Authentication']):
+                        raise Exception("Falha ao fazer novo login após token expirado")
+                    relogin_done = True
+                    continue
+                
+                if endpoint_to_use != api_endpoint and endpoint_to_use == self.fallback_endpoint:
+                    logger.info(f"✓ Usando endpoint fallback: {endpoint_to_use}")
+                    self.api_endpoint = endpoint_to_use
+                
+                results = []
+                for call_id, (method, _params) in enumerate(calls, start=1):
+                    item = responses.get(call_id)
+                    if item is None:
+                        results.append(Exception(f"Sem resposta da API para {method} (id {call_id})"))
+                    elif 'error' in item:
+                        results.append(Exception(f"Erro da API: {item['error']}"))
+                    else:
+                        results.append(item.get('result', {}))
+                return results
+        
+        if last_exception:
+            raise last_exception
+        raise Exception("Erro desconhecido na requisição em batch")
+    
+    def batch(self, endpoint=None):
+        """
+        Cria um batch de chamadas para enviar em uma única requisição HTTP
+        
+        Uso:
+            with api.batch() as batch:
+                book = batch.list_market_book(market_ids=[market_id])
+                orders = batch.list_current_orders()
+            market_book = book.result()
+        
+        Args:
+            endpoint: Endpoint customizado (opcional)
+            
+        Returns:
+            BetfairBatch: Batch pronto para receber chamadas
+        """
+        return BetfairBatch(self, endpoint=endpoint)
+    
     def list_event_types(self, filter_dict=None):
         """
         Lista tipos de eventos disponíveis
@@ -254,6 +507,24 @@ class BetfairAPI:
         Returns:
             list: Lista de mercados
         """
+        params = self._market_catalogue_params(filter_dict, market_projection, sort, max_results)
+        return self._make_request('SportsAPING/v1.0/listMarketCatalogue', params)
+    
+    def list_events(self, filter_dict=None):
+        """
+        Lista eventos com a quantidade de mercados que atendem ao filtro
+        
+        Args:
+            filter_dict: Filtros de mercado (mesmo formato da listMarketCatalogue)
+            
+        Returns:
+            list: [{'event': {...}, 'marketCount': n}]
+        """
+        return self._make_request('SportsAPING/v1.0/listEvents', {'filter': filter_dict or {}})
+    
+    @staticmethod
+    def _market_catalogue_params(filter_dict=None, market_projection=None, sort=None, max_results=1000):
+        """Monta os parâmetros de listMarketCatalogue"""
         params = {
             'filter': filter_dict or {},
             'marketProjection': market_projection or [],
@@ -262,8 +533,7 @@ class BetfairAPI:
         }
         
         # Remover campos None para evitar problemas
-        params = {k: v for k, v in params.items() if v is not None}
-        return self._make_request('SportsAPING/v1.0/listMarketCatalogue', params)
+        return {k: v for k, v in params.items() if v is not None}
     
     def list_market_book(self, market_ids, price_projection=None, 
                         order_projection=None, match_projection=None):
@@ -279,13 +549,73 @@ class BetfairAPI:
         Returns:
             list: Lista de dados de mercado
         """
-        params = {
+        params = self._market_book_params(market_ids, price_projection, order_projection, match_projection)
+        return self._make_request('SportsAPING/v1.0/listMarketBook', params)
+    
+    def list_market_books(self, market_ids, price_projection=None,
+                          order_projection=None, match_projection=None):
+        """
+        Obtém o book de vários mercados respeitando o limite de data weight
+        
+        Divide a lista em blocos que ficam abaixo de MAX_MARKET_BOOK_WEIGHT
+        para a projeção escolhida e envia todos os blocos em um único POST
+        (batch JSON-RPC).
+        
+        Args:
+            market_ids: Lista de IDs de mercado (duplicados são ignorados)
+            price_projection: Projeção de preços
+            order_projection: Projeção de ordens
+            match_projection: Projeção de correspondências
+            
+        Returns:
+            dict: marketId -> dados do mercado (blocos que falharam são registrados
+                  no log e ficam de fora - com um ou vários blocos)
+        """
+        unique_ids = list(dict.fromkeys(str(market_id) for market_id in market_ids if market_id))
+        if not unique_ids:
+            return {}
+        
+        chunk_size = max(1, MAX_MARKET_BOOK_WEIGHT // market_book_weight(price_projection))
+        chunks = [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+        
+        logger = logging.getLogger(__name__)
+        books = {}
+        results = []
+        try:
+            if len(chunks) == 1:
+                results.append(self.list_market_book(chunks[0], price_projection, order_projection, match_projection))
+            else:
+                with self.batch() as batch:
+                    calls = [
+                        batch.list_market_book(chunk, price_projection, order_projection, match_projection)
+                        for chunk in chunks
+                    ]
+                for call in calls:
+                    try:
+                        results.append(call.result())
+                    except Exception as e:
+                        logger.warning(f"Erro ao buscar bloco de mercados: {e}")
+        except Exception as e:
+            # Falha da requisição inteira: todos os blocos ficam de fora
+            logger.warning(f"Erro ao buscar {len(chunks)} bloco(s) de mercados: {e}")
+        
+        for result in results:
+            for market in result or []:
+                market_id = market.get('marketId')
+                if market_id:
+                    books[market_id] = market
+        
+        return books
+    
+    @staticmethod
+    def _market_book_params(market_ids, price_projection=None, order_projection=None, match_projection=None):
+        """Monta os parâmetros de listMarketBook"""
+        return {
             'marketIds': market_ids,
             'priceProjection': price_projection or {},
             'orderProjection': order_projection,
             'matchProjection': match_projection
         }
-        return self._make_request('SportsAPING/v1.0/listMarketBook', params)
     
     def place_orders(self, market_id, instructions, customer_ref=None):
         """
@@ -368,7 +698,7 @@ class BetfairAPI:
         Cancela ordens (apostas) no mercado
         
         Args:
-            market_id: ID do mercado
+            market_id: ID do mercado (None = todos os mercados, sem bet_ids/instructions)
             bet_ids: Lista de IDs de apostas para cancelar (opcional)
             instructions: Lista de instruções de cancelamento (opcional)
             customer_ref: Referência do cliente (opcional)
@@ -377,10 +707,13 @@ class BetfairAPI:
             dict: Resultado do cancelamento
         """
         params = {
-            'marketId': market_id,
             'customerRef': customer_ref or ''
         }
         
+        # Sem mercado (e sem instruções): cancela todas as ordens de todos os mercados
+        if market_id:
+            params['marketId'] = market_id
+        
         if bet_ids:
             instructions = [{'betId': bet_id} for bet_id in bet_ids]
         
@@ -401,7 +734,8 @@ class BetfairAPI:
             return self._make_request('AccountAPING/v1.0/getAccountFunds', {}, endpoint=self.account_endpoint)
         return self._make_request('AccountAPING/v1.0/getAccountFunds', {})
     
-    def list_current_orders(self, bet_ids=None, market_ids=None, order_projection=None):
+    def list_current_orders(self, bet_ids=None, market_ids=None, order_projection=None,
+                            from_record=0, record_count=0):
         """
         Lista ordens (apostas) atuais
         
@@ -409,10 +743,42 @@ class BetfairAPI:
             bet_ids: Lista de IDs de apostas (opcional)
             market_ids: Lista de IDs de mercados (opcional)
             order_projection: Projeção de ordens (opcional)
+            from_record: Primeiro registro da página
+            record_count: Registros por página (0 = padrão da API, máximo 1000)
             
         Returns:
             dict: Resultado com ordens atuais
         """
+        params = self._current_orders_params(bet_ids, market_ids, order_projection, from_record, record_count)
+        return self._make_request('SportsAPING/v1.0/listCurrentOrders', params)
+    
+    def iter_current_orders(self, bet_ids=None, market_ids=None, order_projection=None, record_count=1000):
+        """
+        Percorre todas as páginas de listCurrentOrders
+        
+        Yields:
+            list: Ordens atuais de cada página
+        """
+        from_record = 0
+        while True:
+            result = self.list_current_orders(
+                bet_ids=bet_ids,
+                market_ids=market_ids,
+                order_projection=order_projection,
+                from_record=from_record,
+                record_count=record_count,
+            ) or {}
+            orders = result.get('currentOrders') or []
+            if orders:
+                yield orders
+            if not orders or not result.get('moreAvailable'):
+                return
+            from_record += len(orders)
+    
+    @staticmethod
+    def _current_orders_params(bet_ids=None, market_ids=None, order_projection=None,
+                               from_record=0, record_count=0):
+        """Monta os parâmetros de listCurrentOrders"""
         params = {}
         
         if bet_ids:
@@ -424,62 +790,189 @@ class BetfairAPI:
         if order_projection:
             params['orderProjection'] = order_projection
         
-        return self._make_request('SportsAPING/v1.0/listCurrentOrders', params)
+        if from_record:
+            params['fromRecord'] = from_record
+        
+        if record_count:
+            params['recordCount'] = record_count
+        
+        return params
     
-    def get_settled_bets(self, bet_ids=None, from_date=None, to_date=None, page_index=0):
+    def list_cleared_orders(self, bet_status='SETTLED', bet_ids=None, market_ids=None,
+                            settled_from=None, settled_to=None, from_record=0, record_count=1000,
+                            group_by=None):
         """
-        Busca apostas finalizadas (settled) da API de atividade da Betfair
+        Lista ordens liquidadas (listClearedOrders) - uma página
         
         Args:
+            bet_status: SETTLED, VOIDED, LAPSED ou CANCELLED
             bet_ids: Lista de IDs de apostas (opcional)
-            from_date: Data inicial (opcional)
-            to_date: Data final (opcional)
-            page_index: Índice da página (padrão 0)
+            market_ids: Lista de IDs de mercados (opcional)
+            settled_from: Data de liquidação inicial, ISO 8601 (inclusiva)
+            settled_to: Data de liquidação final, ISO 8601 (inclusiva)
+            from_record: Primeiro registro da página
+            record_count: Registros por página (máximo 1000)
+            group_by: Agrupamento (None = por aposta; MARKET traz a comissão do mercado)
             
         Returns:
-            dict: Dados das apostas finalizadas
+            dict: {'clearedOrders': [...], 'moreAvailable': bool}
         """
-        try:
-            # URL da API de atividade da Betfair Brasil
-            base_url = 'https://myactivity.betfair.bet.br/activity/exchange/settled'
+        params = {
+            'betStatus': bet_status,
+            'fromRecord': from_record,
+            'recordCount': record_count,
+        }
+        if group_by:
+            params['groupBy'] = group_by
+        if bet_ids:
+            params['betIds'] = [str(bet_id) for bet_id in bet_ids]
+        if market_ids:
+            params['marketIds'] = market_ids
+        if settled_from or settled_to:
+            params['settledDateRange'] = {}
+            if settled_from:
+                params['settledDateRange']['from'] = settled_from
+            if settled_to:
+                params['settledDateRange']['to'] = settled_to
+        
+        return self._make_request('SportsAPING/v1.0/listClearedOrders', params)
+    
+    def iter_cleared_orders(self, bet_ids=None, market_ids=None, settled_from=None,
+                            settled_to=None, record_count=1000):
+        """
+        Percorre todas as páginas de listClearedOrders (apostas SETTLED)
+        
+        Yields:
+            list: Ordens liquidadas de cada página
+        """
+        from_record = 0
+        while True:
+            result = self.list_cleared_orders(
+                bet_ids=bet_ids,
+                market_ids=market_ids,
+                settled_from=settled_from,
+                settled_to=settled_to,
+                from_record=from_record,
+                record_count=record_count,
+            ) or {}
+            orders = result.get('clearedOrders') or []
+            if orders:
+                yield orders
+            if not orders or not result.get('moreAvailable'):
+                return
+            from_record += len(orders)
+    
+    def get_market_commissions(self, market_ids, chunk_size=250):
+        """
+        Comissão cobrada em cada mercado (listClearedOrders agrupada por MARKET)
+        
+        No nível da aposta a Betfair não informa a comissão: ela é cobrada sobre
+        o lucro líquido do mercado e só aparece no resumo por mercado.
+        
+        Args:
+            market_ids: IDs dos mercados liquidados
+            chunk_size: Mercados por consulta
             
-            # Preparar headers com autenticação
-            headers = {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-            }
+        Returns:
+            dict: marketId -> comissão (mercados sem resumo ficam de fora)
+        """
+        market_ids = list(dict.fromkeys(market_id for market_id in market_ids if market_id))
+        commissions = {}
+        for start in range(0, len(market_ids), chunk_size):
+            from_record = 0
+            while True:
+                result = self.list_cleared_orders(
+                    market_ids=market_ids[start:start + chunk_size],
+                    group_by='MARKET',
+                    from_record=from_record,
+                ) or {}
+                summaries = result.get('clearedOrders') or []
+                for summary in summaries:
+                    if summary.get('marketId'):
+                        commissions[summary['marketId']] = float(summary.get('commission') or 0.0)
+                if not summaries or not result.get('moreAvailable'):
+                    break
+                from_record += len(summaries)
+        return commissions
+    
+    @staticmethod
+    def apportion_commission(orders, market_commissions):
+        """
+        Divide a comissão de cada mercado entre as suas apostas liquidadas
+        
+        Cada aposta com lucro recebe uma parte proporcional ao lucro; apostas
+        perdedoras não pagam comissão. A soma das partes é a comissão do mercado.
+        
+        Args:
+            orders: Ordens liquidadas (nível de aposta) - todas as do mercado
+            market_commissions: marketId -> comissão (get_market_commissions)
             
-            # Se tiver session token, tentar usar (pode não funcionar para API web)
-            if self.session_token:
-                headers['Authorization'] = f'Bearer {self.session_token}'
+        Returns:
+            dict: betId -> comissão da aposta (None se a do mercado não é conhecida)
+        """
+        winnings = {}
+        for order in orders:
+            market_id = order.get('marketId')
+            winnings[market_id] = winnings.get(market_id, 0.0) + max(order.get('profit') or 0.0, 0.0)
+        
+        shares = {}
+        for order in orders:
+            market_id = order.get('marketId')
+            commission = market_commissions.get(market_id)
+            if commission is None:
+                shares[order.get('betId')] = None
+            elif winnings[market_id] > 0:
+                shares[order.get('betId')] = commission * max(order.get('profit') or 0.0, 0.0) / winnings[market_id]
+            else:
+                shares[order.get('betId')] = 0.0
+        return shares
+    
+    @staticmethod
+    def cleared_order_to_settled_bet(order, commission=None):
+        """
+        Converte uma ordem de listClearedOrders no formato de aposta liquidada usado no banco
+        
+        Args:
+            order: Ordem liquidada (nível de aposta: profit é o lucro bruto)
+            commission: Parte da comissão do mercado que cabe à aposta (None = desconhecida,
+                        netProfit fica None)
+        """
+        profit = order.get('profit')
+        return {
+            'betId': order.get('betId'),
+            'marketId': order.get('marketId'),
+            'grossProfit': profit,
+            'netProfit': profit - commission if profit is not None and commission is not None else None,
+            'settledDate': order.get('settledDate'),
+            'betOutcome': order.get('betOutcome'),
+        }
+    
+    def get_settled_bets(self, bet_ids=None, from_date=None, to_date=None, page_index=0, page_size=1000):
+        """
+        Busca apostas finalizadas (settled) via listClearedOrders
+        
+        Args:
+            bet_ids: Lista de IDs de apostas (opcional)
+            from_date: Data de liquidação inicial, ISO 8601 (opcional)
+            to_date: Data de liquidação final, ISO 8601 (opcional)
+            page_index: Índice da página (padrão 0)
+            page_size: Apostas por página (máximo 1000)
             
-            # Parâmetros da requisição
-            params = {
-                'pageIndex': page_index,
-                'pageSize': 10
+        Returns:
+            dict: {'bets': [...], 'moreAvailable': bool} ou None em caso de erro
+        """
+        try:
+            result = self.list_cleared_orders(
+                bet_ids=bet_ids,
+                settled_from=from_date,
+                settled_to=to_date,
+                from_record=page_index * page_size,
+                record_count=page_size,
+            ) or {}
+            return {
+                'bets': [self.cleared_order_to_settled_bet(order) for order in result.get('clearedOrders') or []],
+                'moreAvailable': bool(result.get('moreAvailable')),
             }
-            
-            if bet_ids:
-                params['betIds'] = ','.join(bet_ids)
-            
-            # Fazer requisição
-            response = requests.get(
-                base_url,
-                params=params,
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                # Se falhar com autenticação, tentar sem (pode precisar de cookies de sessão)
-                logging.getLogger(__name__).warning(
-                    f"Erro ao buscar apostas finalizadas: {response.status_code}. "
-                    "Pode ser necessário autenticação via cookies."
-                )
-                return None
-                
         except Exception as e:
             logging.getLogger(__name__).error(f"Erro ao buscar apostas finalizadas: {e}")
             return None
@@ -554,6 +1047,166 @@ class BetfairAPI:
             return None
 
 
+class BetfairBatchCall:
+    """Resultado pendente de uma chamada dentro de um BetfairBatch"""
+    
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.done = False
+        self._result = None
+        self._error = None
+    
+    def _resolve(self, value):
+        """Define o resultado (ou o erro) da chamada"""
+        if isinstance(value, Exception):
+            self._error = value
+        else:
+            self._result = value
+        self.done = True
+    
+    def result(self):
+        """
+        Retorna o resultado da chamada
+        
+        Raises:
+            Exception: Se o batch ainda não foi executado ou se a API
+                       retornou erro para esta chamada
+        """
+        if not self.done:
+            raise Exception(f"Batch ainda não executado para {self.method}")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class BetfairBatch:
+    """Agrupa várias chamadas JSON-RPC e envia todas em um único POST"""
+    
+    def __init__(self, api, endpoint=None):
+        """
+        Args:
+            api: Cliente BetfairAPI autenticado
+            endpoint: Endpoint customizado (opcional)
+        """
+        self.api = api
+        self.endpoint = endpoint
+        self.calls = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        return False
+    
+    def add(self, method, params=None):
+        """
+        Adiciona uma chamada genérica ao batch
+        
+        Returns:
+            BetfairBatchCall: Resultado pendente da chamada
+        """
+        call = BetfairBatchCall(method, params or {})
+        self.calls.append(call)
+        return call
+    
+    def list_market_catalogue(self, filter_dict=None, market_projection=None,
+                              sort=None, max_results=1000):
+        """Adiciona listMarketCatalogue ao batch"""
+        params = BetfairAPI._market_catalogue_params(filter_dict, market_projection, sort, max_results)
+        return self.add('SportsAPING/v1.0/listMarketCatalogue', params)
+    
+    def list_market_book(self, market_ids, price_projection=None,
+                         order_projection=None, match_projection=None):
+        """Adiciona listMarketBook ao batch"""
+        params = BetfairAPI._market_book_params(market_ids, price_projection, order_projection, match_projection)
+        return self.add('SportsAPING/v1.0/listMarketBook', params)
+    
+    def list_current_orders(self, bet_ids=None, market_ids=None, order_projection=None):
+        """Adiciona listCurrentOrders ao batch"""
+        params = BetfairAPI._current_orders_params(bet_ids, market_ids, order_projection)
+        return self.add('SportsAPING/v1.0/listCurrentOrders', params)
+    
+    def execute(self):
+        """
+        Envia as chamadas pendentes em um único POST e distribui os resultados
+        
+        Returns:
+            list: Chamadas executadas (BetfairBatchCall)
+        """
+        pending = [call for call in self.calls if not call.done]
+        if not pending:
+            return self.calls
+        
+        results = self.api._make_batch_request(
+            [(call.method, call.params) for call in pending],
+            endpoint=self.endpoint
+        )
+        for call, value in zip(pending, results):
+            call._resolve(value)
+        return self.calls
+
+
+class AsyncBetfairAPI:
+    """
+    Contraparte assíncrona (asyncio) do BetfairAPI
+    
+    Cada chamada roda em uma thread (asyncio.to_thread) sobre o pool de
+    conexões keep-alive do cliente síncrono, com no máximo max_concurrency
+    chamadas simultâneas.
+    """
+    
+    def __init__(self, api=None, config_file='config.ini', max_concurrency=10):
+        """
+        Args:
+            api: Cliente BetfairAPI existente (opcional - um novo é criado se None)
+            config_file: Caminho para o arquivo de configuração
+            max_concurrency: Número máximo de chamadas simultâneas
+        """
+        self.api = api or BetfairAPI(config_file)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    
+    @property
+    def session_token(self):
+        return self.api.session_token
+    
+    async def call(self, func, *args, **kwargs):
+        """Executa uma função bloqueante em thread, respeitando o limite de concorrência"""
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+    
+    async def login(self):
+        return await self.call(self.api.login)
+    
+    async def list_market_catalogue(self, *args, **kwargs):
+        return await self.call(self.api.list_market_catalogue, *args, **kwargs)
+    
+    async def list_market_book(self, *args, **kwargs):
+        return await self.call(self.api.list_market_book, *args, **kwargs)
+    
+    async def list_market_books(self, *args, **kwargs):
+        return await self.call(self.api.list_market_books, *args, **kwargs)
+    
+    async def list_current_orders(self, *args, **kwargs):
+        return await self.call(self.api.list_current_orders, *args, **kwargs)
+    
+    async def place_orders(self, *args, **kwargs):
+        return await self.call(self.api.place_orders, *args, **kwargs)
+    
+    async def cancel_orders(self, *args, **kwargs):
+        return await self.call(self.api.cancel_orders, *args, **kwargs)
+    
+    async def get_account_funds(self):
+        return await self.call(self.api.get_account_funds)
+    
+    def close(self):
+        """Fecha as conexões HTTP do cliente síncrono"""
+        self.api.close()
+
+
 def main():
     """Exemplo de uso da API"""
     print("=== Exemplo de Uso da API Betfair ===\n")
@@ -8,6 +8,8 @@ import time
 import json
 import logging
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
@@ -15,6 +17,8 @@ from enum import Enum
 from betfair_api import BetfairAPI
 from configparser import ConfigParser
 from database import BetDatabase
+from heartbeat import write_heartbeat
+from event_log import EventLogWriter
 from telegram_notifier import TelegramNotifier
 
         # Configurar logging
@@ -71,6 +75,87 @@ class ActiveBet:
     close_reason: Optional[str] = None
 
 
+class MarketCatalogueCache:
+    """Cache do catálogo de mercados por marketId com TTL e remoção LRU (thread-safe)"""
+    
+    def __init__(self, ttl_seconds: float = 1800, max_size: int = 2000):
+        """
+        Args:
+            ttl_seconds: Tempo de vida de cada entrada em segundos
+            max_size: Número máximo de mercados mantidos (os menos usados saem primeiro)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Os workers do motor assíncrono leem enquanto a descoberta grava
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+    
+    def __contains__(self, market_id) -> bool:
+        """Verifica se o mercado está no cache (sem afetar contadores)"""
+        with self._lock:
+            entry = self._entries.get(market_id)
+        return entry is not None and entry[0] > time.monotonic()
+    
+    def get(self, market_id: str) -> Optional[Dict]:
+        """Retorna o catálogo do mercado ou None se ausente/expirado"""
+        with self._lock:
+            entry = self._entries.get(market_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, market = entry
+            if expires_at <= time.monotonic():
+                self._entries.pop(market_id, None)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(market_id)
+            self.hits += 1
+            return market
+    
+    def put(self, market: Dict):
+        """Adiciona/atualiza um mercado do catálogo (listMarketCatalogue)"""
+        with self._lock:
+            self._put(market, time.monotonic() + self.ttl_seconds)
+    
+    def put_many(self, markets: List[Dict]):
+        """Adiciona vários mercados do catálogo"""
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds
+            for market in markets or []:
+                self._put(market, expires_at)
+    
+    def _put(self, market: Dict, expires_at: float):
+        """Grava uma entrada (chamar com self._lock adquirido)"""
+        market_id = market.get('marketId')
+        if not market_id:
+            return
+        
+        self._entries[market_id] = (expires_at, market)
+        self._entries.move_to_end(market_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict:
+        """Contadores do cache (hits, misses, tamanho, taxa de acerto)"""
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'size': size,
+            'hit_rate': (hits / total) if total else 0.0,
+        }
+
+
 class BetfairTradingBot:
     """Bot de trading para Betfair com estratégias de Time Decay"""
     
@@ -116,6 +201,23 @@ class BetfairTradingBot:
             'stop_loss_pct': float(self.bot_config.get('tennis', 'stop_loss_pct', fallback='10.0')),
         }
         
+        # Cache do catálogo de mercados (horário de início, runners, evento)
+        self.catalogue_cache = MarketCatalogueCache(
+            ttl_seconds=float(self.bot_config.get('bot', 'catalogue_cache_ttl', fallback='1800')),
+            max_size=int(self.bot_config.get('bot', 'catalogue_cache_size', fallback='2000')),
+        )
+        
+        # Descoberta de mercados ao vivo (varredura única do catálogo para todos os esportes)
+        self.discovery_page_size = int(self.bot_config.get('bot', 'discovery_page_size', fallback='100'))
+        self.discovery_max_pages = int(self.bot_config.get('bot', 'discovery_max_pages', fallback='10'))
+        # Por esporte: marketId -> candidato já processado (None = mercado descartado)
+        self.known_markets: Dict[SportType, Dict[str, Optional[Dict]]] = {}
+        
+        # Preço/P&L das apostas ativas no banco: no máximo uma gravação por aposta a cada intervalo
+        self.price_update_interval = float(self.bot_config.get('bot', 'price_update_interval', fallback='5'))
+        # bet_id -> (preço gravado, time.monotonic() da gravação)
+        self._recorded_prices: Dict[str, tuple] = {}
+        
         # API
         self.api = BetfairAPI(config_file)
         self.api.login()
@@ -123,10 +225,32 @@ class BetfairTradingBot:
         # Banco de dados
         self.db = BetDatabase()
         
+        # Escritas do banco em segundo plano (fora do loop de trading) - opcional
+        if self.bot_config.getboolean('bot', 'db_write_behind', fallback=False):
+            self.db.start_writer(
+                queue_size=int(self.bot_config.get('bot', 'db_write_queue_size', fallback='1000')),
+                flush_interval=float(self.bot_config.get('bot', 'db_flush_interval', fallback='0.5')),
+            )
+        
         # Carregar apostas ativas do banco de dados
         self.active_bets: Dict[str, ActiveBet] = self.load_active_bets()
         self.bet_counter = 0
         
+        # Log estruturado de eventos (lido pelos dashboards no lugar do log de texto)
+        self.events = EventLogWriter()
+        
+        # Último erro do loop principal (vai no heartbeat)
+        self.last_error: Optional[str] = None
+        self.last_error_time: Optional[str] = None
+        
+        # Snapshot do ciclo atual (saldo, ordens atuais, apostas ativas do banco)
+        # None = fora de um ciclo, sem cache
+        self.cycle_snapshot: Optional[Dict] = None
+        
+        # Protege active_bets, stats e cycle_snapshot quando monitoramento e
+        # descoberta rodam em threads diferentes (motor assíncrono)
+        self.state_lock = threading.RLock()
+        
         # Estatísticas
         self.stats = {
             'total_bets': 0,
@@ -190,199 +314,525 @@ class BetfairTradingBot:
         # individualmente quando criadas/atualizadas
         pass
     
+    def record_error(self, error):
+        """Registra o último erro do loop principal (reportado no heartbeat)"""
+        self.last_error = str(error)
+        self.last_error_time = datetime.now().isoformat(timespec='seconds')
+    
+    def confirm_placed_bets(self, timeout: float = 5.0) -> List[str]:
+        """
+        Confirma a gravação das apostas enfileiradas no escritor do banco
+        
+        Chamado no fim do ciclo (fora do caminho de colocação). Apostas que
+        falharam são reenfileiradas pelo banco; as que não puderam ser gravadas
+        geram alerta (log, heartbeat e Telegram).
+        
+        Returns:
+            list: bet_ids que não foram gravados
+        """
+        lost = self.db.confirm_inserts(timeout=timeout)
+        if lost:
+            message = f"Apostas colocadas na Betfair mas não gravadas no banco: {', '.join(lost)}"
+            logger.error(f"❌ {message}")
+            self.record_error(message)
+            if self.telegram and self.telegram.enabled:
+                self.telegram.send_message(f"❌ {message}")
+        return lost
+    
+    def record_heartbeat(self, cycle: int, cycle_duration: float, api_calls: int):
+        """
+        Grava o heartbeat do ciclo (os dashboards usam para saber se o bot está vivo)
+        
+        Args:
+            cycle: Número do ciclo
+            cycle_duration: Duração do ciclo em segundos
+            api_calls: Requisições à API feitas no ciclo
+        """
+        active_count = sum(1 for b in list(self.active_bets.values()) if b.status == BetStatus.ACTIVE)
+        write_heartbeat({
+            'cycle': cycle,
+            'cycle_duration': round(cycle_duration, 3),
+            'api_calls': api_calls,
+            'api_calls_total': self.api.request_count,
+            'active_bets': active_count,
+            'last_error': self.last_error,
+            'last_error_time': self.last_error_time,
+            'timestamp': time.time(),
+            'time': datetime.now().isoformat(timespec='seconds'),
+        })
+        self.events.emit(
+            'cycle',
+            cycle=cycle,
+            duration=round(cycle_duration, 3),
+            api_calls=api_calls,
+            stats=dict(self.stats, active_bets=active_count),
+        )
+    
+    def _record_closed_bet(self, bet: ActiveBet, status: str, profit_pct: float, current_price: float):
+        """Fecha a aposta no banco e registra o evento bet_closed no log estruturado"""
+        self.db.close_bet(bet.bet_id, status, profit_pct, bet.close_reason, current_price)
+        self.events.emit(
+            'bet_closed',
+            bet_id=bet.bet_id,
+            market_id=bet.market_id,
+            sport=bet.sport.name,
+            status=status,
+            profit_pct=round(profit_pct, 4),
+            profit=round(bet.stake * profit_pct / 100, 2),
+            close_reason=bet.close_reason,
+            price=current_price,
+        )
+    
+    def begin_cycle(self):
+        """Inicia um novo ciclo descartando o snapshot do ciclo anterior"""
+        self.cycle_snapshot = {}
+    
+    def _snapshot_get(self, key: str, loader):
+        """Retorna um valor do snapshot do ciclo, carregando com loader() na primeira vez"""
+        snapshot = self.cycle_snapshot
+        if snapshot is None:
+            return loader()
+        with self.state_lock:
+            if key in snapshot:
+                return snapshot[key]
+        
+        # loader() faz I/O: não segurar o lock durante a chamada
+        value = loader()
+        if value is None:
+            return None
+        return self._snapshot_put(key, value, snapshot)
+    
+    def _snapshot_put(self, key: str, value, snapshot: Optional[Dict] = None):
+        """
+        Grava um valor no snapshot do ciclo sob state_lock
+        
+        Se outra thread gravou a mesma chave antes, o valor já gravado é mantido
+        (as apostas registradas nele por _record_placed_bet não se perdem).
+        
+        Returns:
+            O valor que ficou no snapshot (ou value, fora de um ciclo)
+        """
+        if snapshot is None:
+            snapshot = self.cycle_snapshot
+        if snapshot is None:
+            return value
+        with self.state_lock:
+            return snapshot.setdefault(key, value)
+    
+    def _snapshot_live_markets(self, candidates: Dict):
+        """Registra os candidatos da descoberta no snapshot do ciclo (sob state_lock)"""
+        with self.state_lock:
+            if self.cycle_snapshot is not None:
+                self.cycle_snapshot.setdefault('live_markets', {}).update(candidates)
+    
+    def get_db_active_bets(self) -> List[Dict]:
+        """Apostas ativas do banco de dados (uma leitura por ciclo)"""
+        return self._snapshot_get('db_active_bets', self.db.get_active_bets)
+    
+    def get_current_orders_snapshot(self) -> Optional[Dict]:
+        """Ordens atuais da conta (uma busca por ciclo)"""
+        return self._snapshot_get('current_orders', self.api.list_current_orders)
+    
+    def _record_placed_bet(self, bet_row: Dict):
+        """
+        Atualiza o snapshot do ciclo com uma aposta recém-colocada
+        
+        Evita buscar novamente saldo, ordens e apostas do banco no mesmo ciclo.
+        Também registra o evento bet_placed no log estruturado.
+        """
+        self.events.emit(
+            'bet_placed',
+            bet_id=bet_row['bet_id'],
+            market_id=bet_row['market_id'],
+            event_name=bet_row.get('event_name'),
+            sport=bet_row['sport'],
+            strategy=bet_row.get('strategy'),
+            side=bet_row['side'],
+            price=bet_row['entry_price'],
+            stake=bet_row['stake'],
+            liability=bet_row.get('liability', 0.0),
+        )
+        
+        if self.cycle_snapshot is None:
+            return
+        
+        amount = bet_row['liability'] if bet_row['side'] == 'LAY' else bet_row['stake']
+        
+        balance = self.cycle_snapshot.get('balance')
+        if balance:
+            balance['available'] -= amount
+            # A Betfair reporta a exposição como valor negativo
+            balance['exposure'] -= amount
+        
+        current_orders = self.cycle_snapshot.get('current_orders')
+        if current_orders is not None:
+            current_orders.setdefault('currentOrders', []).append({
+                'betId': bet_row['bet_id'],
+                'marketId': bet_row['market_id'],
+                'selectionId': bet_row['selection_id'],
+                'side': bet_row['side'],
+                'status': 'EXECUTABLE',
+                'sizeMatched': 0,
+                'priceSize': {'price': bet_row['entry_price'], 'size': bet_row['stake']},
+            })
+        
+        db_active_bets = self.cycle_snapshot.get('db_active_bets')
+        if db_active_bets is not None:
+            db_active_bets.insert(0, dict(bet_row))
+    
     def get_sport_id(self, sport: SportType) -> str:
         """Retorna o ID do esporte na Betfair"""
         sport_ids = {
             SportType.SOCCER: "1",
-            SportType.ICE_HOCKEY: "2",
+            SportType.ICE_HOCKEY: "7524",
             SportType.TENNIS: "2",
         }
         return sport_ids.get(sport, "1")
     
-    def find_live_soccer_matches(self) -> List[Dict]:
-        """Encontra partidas de futebol ao vivo com placar 0-0"""
-        try:
-            filter_dict = {
-                'eventTypeIds': ['1'],  # Soccer
-                'marketTypeCodes': ['OVER_UNDER_45'],
-                'inPlay': True,
-            }
-            
-            markets = self.api.list_market_catalogue(
-                filter_dict=filter_dict,
-                market_projection=['MARKET_DESCRIPTION', 'RUNNER_DESCRIPTION', 'EVENT'],
-                max_results=100
+    def get_market_type_codes(self, sport: SportType) -> List[str]:
+        """Retorna os tipos de mercado buscados para cada esporte"""
+        if sport == SportType.SOCCER:
+            # Ex: under_goals 4.5 -> OVER_UNDER_45
+            return [f"OVER_UNDER_{int(round(self.soccer_config['under_goals'] * 10))}"]
+        if sport == SportType.ICE_HOCKEY:
+            return ['TOTAL_GOALS']
+        return ['MATCH_ODDS']
+    
+    def _scan_live_catalogue(self, event_type_ids: List[str], market_type_codes: List[str]) -> List[Dict]:
+        """
+        Busca o catálogo in-play completo, além do limite de resultados por página
+        
+        A listMarketCatalogue não tem offset, e paginar pelo marketStartTime
+        perde mercados quando mais de uma página começa no mesmo minuto (todos os
+        mercados de um evento têm o mesmo horário). Por isso a varredura é
+        particionada: a listEvents informa quantos mercados cada evento tem, os
+        eventos são agrupados em partições menores que discovery_page_size e cada
+        partição vira uma listMarketCatalogue por eventIds (todas em um único POST).
+        Eventos grandes demais são divididos por tipo de mercado. Uma página
+        cheia ou partições além de discovery_max_pages geram aviso de truncamento.
+        """
+        filter_dict = {
+            'eventTypeIds': event_type_ids,
+            'marketTypeCodes': market_type_codes,
+            'inPlay': True,
+        }
+        
+        events = self.api.list_events(filter_dict=filter_dict) or []
+        
+        # Partições com menos mercados que uma página: página cheia = possível truncamento
+        partitions = []
+        event_ids = []
+        market_count = 0
+        for item in sorted(events, key=lambda item: item.get('marketCount', 0), reverse=True):
+            event_id = (item.get('event') or {}).get('id')
+            count = item.get('marketCount', 0)
+            if not event_id or count <= 0:
+                continue
+            if count >= self.discovery_page_size:
+                partitions.extend(
+                    dict(filter_dict, eventIds=[event_id], marketTypeCodes=[code])
+                    for code in market_type_codes
+                )
+                continue
+            if market_count + count >= self.discovery_page_size:
+                partitions.append(dict(filter_dict, eventIds=event_ids))
+                event_ids, market_count = [], 0
+            event_ids.append(event_id)
+            market_count += count
+        if event_ids:
+            partitions.append(dict(filter_dict, eventIds=event_ids))
+        
+        if len(partitions) > self.discovery_max_pages:
+            logger.warning(
+                f"⚠️ Catálogo ao vivo truncado: {len(partitions)} partições, "
+                f"limite discovery_max_pages={self.discovery_max_pages}"
             )
+            partitions = partitions[:self.discovery_max_pages]
+        if not partitions:
+            return []
+        
+        projection = ['MARKET_DESCRIPTION', 'RUNNER_DESCRIPTION', 'EVENT', 'EVENT_TYPE', 'MARKET_START_TIME']
+        with self.api.batch() as batch:
+            calls = [
+                batch.list_market_catalogue(
+                    filter_dict=partition,
+                    market_projection=projection,
+                    sort='FIRST_TO_START',
+                    max_results=self.discovery_page_size
+                )
+                for partition in partitions
+            ]
+        
+        markets_by_id = OrderedDict()
+        for partition, call in zip(partitions, calls):
+            try:
+                page = call.result() or []
+            except Exception as e:
+                logger.warning(f"Erro ao buscar partição do catálogo ao vivo: {e}")
+                continue
             
-            valid_matches = []
-            for market in markets:
-                event = market.get('event', {})
-                event_name = event.get('name', '')
-                
-                # Verificar se é Over/Under com a quantidade de gols configurada
-                market_name = market.get('marketName', '')
-                under_goals_str = str(self.soccer_config['under_goals']).replace('.', r'\.')
-                # Verificar se o mercado contém a quantidade de gols configurada (ex: 4.5, 2.5, 3.5)
-                if str(self.soccer_config['under_goals']) not in market_name.upper():
-                    continue
-                
+            if len(page) >= self.discovery_page_size:
+                logger.warning(
+                    f"⚠️ Catálogo ao vivo possivelmente truncado: página cheia "
+                    f"({len(page)} mercados) para os eventos {partition['eventIds'][:5]}"
+                )
+            for market in page:
                 market_id = market.get('marketId')
-                if market_id:
-                    # Verificar status do mercado ANTES de adicionar
-                    # (vamos verificar no market book depois, mas já filtra alguns)
-                    
-                    # Obter runners do catalogue
-                    runners = market.get('runners', [])
-                    
-                    # Encontrar runner Under X.5 no catalogue (usando valor configurado)
-                    under_runner_catalogue = None
-                    under_goals_search = str(self.soccer_config['under_goals'])
-                    for runner in runners:
-                        runner_name = runner.get('runnerName', '').upper()
-                        if 'UNDER' in runner_name and under_goals_search in runner_name:
-                            under_runner_catalogue = runner
-                            break
-                    
-                    if under_runner_catalogue:
-                        # Tentar obter ID do runner - pode estar em selectionId ou id
-                        runner_id = under_runner_catalogue.get('selectionId') or \
-                                   under_runner_catalogue.get('id') or \
-                                   under_runner_catalogue.get('runnerId')
-                        
-                        # Converter para int se for string
-                        if runner_id and isinstance(runner_id, str):
-                            try:
-                                runner_id = int(runner_id)
-                            except (ValueError, TypeError):
-                                logger.warning(f"Mercado {market_id}: Runner ID inválido: {runner_id}")
-                                continue
-                        
-                        if not runner_id:
-                            logger.warning(f"Mercado {market_id}: Runner sem ID válido")
-                            continue
-                        
-                        valid_matches.append({
-                            'market_id': market_id,
-                            'event_id': event.get('id'),
-                            'event_name': event_name,
-                            'market': market,
-                            'under_runner_id': runner_id,
-                            'under_runner_name': under_runner_catalogue.get('runnerName', '')
-                        })
-            
-            return valid_matches
-        except Exception as e:
-            logger.error(f"Erro ao buscar partidas de futebol: {e}")
-            return []
+                if market_id and market_id not in markets_by_id:
+                    markets_by_id[market_id] = market
+        
+        return list(markets_by_id.values())
     
-    def find_live_hockey_matches(self) -> List[Dict]:
-        """Encontra partidas de hóquei ao vivo"""
+    def discover_live_markets(self, sports: Optional[List[SportType]] = None) -> Dict[SportType, List[Dict]]:
+        """
+        Descoberta única de mercados ao vivo para vários esportes
+        
+        Faz uma só varredura do catálogo com todos os eventTypeIds e
+        marketTypeCodes, separa os mercados por esporte e reaproveita o
+        resultado já processado de mercados conhecidos (sem reprocessar runners).
+        
+        Args:
+            sports: Esportes a buscar (padrão: todos os habilitados no config)
+            
+        Returns:
+            dict: SportType -> lista de candidatos
+        """
+        if sports is None:
+            sports = [sport for sport, config in (
+                (SportType.SOCCER, self.soccer_config),
+                (SportType.ICE_HOCKEY, self.hockey_config),
+                (SportType.TENNIS, self.tennis_config),
+            ) if config['enabled']]
+        
+        candidates = {sport: [] for sport in sports}
+        if not sports:
+            return candidates
+        
+        sport_by_event_type = {self.get_sport_id(sport): sport for sport in sports}
+        market_types = {sport: self.get_market_type_codes(sport) for sport in sports}
+        parsers = {
+            SportType.SOCCER: self._parse_soccer_market,
+            SportType.ICE_HOCKEY: self._parse_hockey_market,
+            SportType.TENNIS: self._parse_tennis_market,
+        }
+        
         try:
-            filter_dict = {
-                'eventTypeIds': ['2'],  # Ice Hockey
-                'marketTypeCodes': ['TOTAL_GOALS'],
-                'inPlay': True,
-            }
-            
-            markets = self.api.list_market_catalogue(
-                filter_dict=filter_dict,
-                market_projection=['MARKET_DESCRIPTION', 'RUNNER_DESCRIPTION', 'EVENT'],
-                max_results=100
+            markets = self._scan_live_catalogue(
+                list(sport_by_event_type.keys()),
+                sorted({code for codes in market_types.values() for code in codes})
             )
+        except Exception as e:
+            logger.error(f"Erro ao buscar mercados ao vivo: {e}")
+            # Registrar o resultado vazio: get_live_matches não deve varrer de novo no mesmo ciclo
+            self._snapshot_live_markets(candidates)
+            return candidates
+        
+        self.catalogue_cache.put_many(markets)
+        
+        with self.state_lock:
+            previous_known = {sport: self.known_markets.get(sport, {}) for sport in sports}
+        
+        known_markets = {sport: {} for sport in sports}
+        for market in markets:
+            market_id = market.get('marketId')
+            sport = sport_by_event_type.get(market.get('eventType', {}).get('id'))
+            if not market_id or sport is None:
+                continue
             
-            valid_matches = []
-            for market in markets:
-                event = market.get('event', {})
-                market_name = market.get('marketName', '')
-                
-                # Procurar por mercados de período
-                if '1ST PERIOD' in market_name.upper() or 'PERIOD' in market_name.upper():
-                    market_id = market.get('marketId')
-                    if market_id:
-                        valid_matches.append({
-                            'market_id': market_id,
-                            'event_id': event.get('id'),
-                            'event_name': event.get('name', ''),
-                            'market': market
-                        })
+            # O filtro combinado aceita qualquer par esporte/tipo - manter apenas os pares do esporte
+            market_type = market.get('description', {}).get('marketType')
+            if market_type and market_type not in market_types[sport]:
+                continue
             
-            return valid_matches
-        except Exception as e:
-            logger.error(f"Erro ao buscar partidas de hóquei: {e}")
-            return []
+            previous = previous_known[sport]
+            if market_id in previous:
+                candidate = previous[market_id]
+            else:
+                candidate = parsers[sport](market)
+            
+            known_markets[sport][market_id] = candidate
+            if candidate is not None:
+                candidates[sport].append(candidate)
+        
+        # Manter apenas os mercados que continuam ao vivo
+        with self.state_lock:
+            self.known_markets.update(known_markets)
+        
+        self._snapshot_live_markets(candidates)
+        
+        return candidates
+    
+    def get_live_matches(self, sport: SportType) -> List[Dict]:
+        """Candidatos ao vivo do esporte (da descoberta do ciclo, se já feita)"""
+        live_markets = (self.cycle_snapshot or {}).get('live_markets', {})
+        if sport in live_markets:
+            return live_markets[sport]
+        return self.discover_live_markets([sport]).get(sport, [])
+    
+    def _parse_soccer_market(self, market: Dict) -> Optional[Dict]:
+        """Extrai o candidato de futebol (runner Under X.5) de um mercado do catálogo"""
+        event = market.get('event', {})
+        event_name = event.get('name', '')
+        
+        # Verificar se é Over/Under com a quantidade de gols configurada
+        market_name = market.get('marketName', '')
+        # Verificar se o mercado contém a quantidade de gols configurada (ex: 4.5, 2.5, 3.5)
+        if str(self.soccer_config['under_goals']) not in market_name.upper():
+            return None
+        
+        market_id = market.get('marketId')
+        if not market_id:
+            return None
+        
+        # Obter runners do catalogue
+        runners = market.get('runners', [])
+        
+        # Encontrar runner Under X.5 no catalogue (usando valor configurado)
+        under_runner_catalogue = None
+        under_goals_search = str(self.soccer_config['under_goals'])
+        for runner in runners:
+            runner_name = runner.get('runnerName', '').upper()
+            if 'UNDER' in runner_name and under_goals_search in runner_name:
+                under_runner_catalogue = runner
+                break
+        
+        if not under_runner_catalogue:
+            return None
+        
+        # Tentar obter ID do runner - pode estar em selectionId ou id
+        runner_id = under_runner_catalogue.get('selectionId') or \
+                   under_runner_catalogue.get('id') or \
+                   under_runner_catalogue.get('runnerId')
+        
+        # Converter para int se for string
+        if runner_id and isinstance(runner_id, str):
+            try:
+                runner_id = int(runner_id)
+            except (ValueError, TypeError):
+                logger.warning(f"Mercado {market_id}: Runner ID inválido: {runner_id}")
+                return None
+        
+        if not runner_id:
+            logger.warning(f"Mercado {market_id}: Runner sem ID válido")
+            return None
+        
+        return {
+            'market_id': market_id,
+            'event_id': event.get('id'),
+            'event_name': event_name,
+            'market': market,
+            'under_runner_id': runner_id,
+            'under_runner_name': under_runner_catalogue.get('runnerName', '')
+        }
+    
+    def _parse_hockey_market(self, market: Dict) -> Optional[Dict]:
+        """Extrai o candidato de hóquei (mercado de período) de um mercado do catálogo"""
+        event = market.get('event', {})
+        market_name = market.get('marketName', '')
+        
+        # Procurar por mercados de período
+        if '1ST PERIOD' in market_name.upper() or 'PERIOD' in market_name.upper():
+            market_id = market.get('marketId')
+            if market_id:
+                return {
+                    'market_id': market_id,
+                    'event_id': event.get('id'),
+                    'event_name': event.get('name', ''),
+                    'market': market
+                }
+        return None
+    
+    def _parse_tennis_market(self, market: Dict) -> Optional[Dict]:
+        """Extrai o candidato de tênis (Match Odds com 2+ runners) de um mercado do catálogo"""
+        event = market.get('event', {})
+        market_id = market.get('marketId')
+        if not market_id or len(market.get('runners', [])) < 2:
+            return None
+        return {
+            'market_id': market_id,
+            'event_id': event.get('id'),
+            'event_name': event.get('name', ''),
+            'market': market
+        }
+    
+    def find_live_soccer_matches(self) -> List[Dict]:
+        """Encontra partidas de futebol ao vivo com placar 0-0"""
+        return self.get_live_matches(SportType.SOCCER)
+    
+    def find_live_hockey_matches(self) -> List[Dict]:
+        """Encontra partidas de hóquei ao vivo"""
+        return self.get_live_matches(SportType.ICE_HOCKEY)
     
     def find_live_tennis_matches(self) -> List[Dict]:
         """Encontra partidas de tênis ao vivo"""
         try:
-            filter_dict = {
-                'eventTypeIds': ['2'],  # Tennis
-                'marketTypeCodes': ['MATCH_ODDS'],
-                'inPlay': True,
-            }
+            candidates = self.get_live_matches(SportType.TENNIS)
+            if not candidates:
+                return []
             
-            markets = self.api.list_market_catalogue(
-                filter_dict=filter_dict,
-                market_projection=['MARKET_DESCRIPTION', 'RUNNER_DESCRIPTION', 'EVENT'],
-                max_results=100
+            # Obter odds atuais de todos os candidatos de uma vez
+            market_books = self.api.list_market_books(
+                [candidate['market_id'] for candidate in candidates],
+                price_projection={'priceData': ['EX_BEST_OFFERS']}
             )
             
             valid_matches = []
-            for market in markets:
-                event = market.get('event', {})
-                runners = market.get('runners', [])
+            for candidate in candidates:
+                market_book = market_books.get(candidate['market_id'])
+                if not market_book:
+                    continue
                 
-                # Encontrar o favorito (menor odd)
-                if len(runners) >= 2:
-                    # Obter odds atuais
-                    market_id = market.get('marketId')
-                    if market_id:
-                        market_book = self.api.list_market_book(
-                            market_ids=[market_id],
-                            price_projection={'priceData': ['EX_BEST_OFFERS']}
-                        )
-                        
-                        if market_book:
-                            runners_data = market_book[0].get('runners', [])
-                            if runners_data:
-                                # Encontrar menor odd (favorito)
-                                favorite = min(runners_data, 
-                                             key=lambda r: r.get('ex', {}).get('availableToBack', [{}])[0].get('price', 999))
-                                favorite_odd = favorite.get('ex', {}).get('availableToBack', [{}])[0].get('price', 999)
-                                
-                                if favorite_odd < self.tennis_config['favorite_max_odd']:
-                                    valid_matches.append({
-                                        'market_id': market_id,
-                                        'event_id': event.get('id'),
-                                        'event_name': event.get('name', ''),
-                                        'favorite_runner': favorite,
-                                        'favorite_odd': favorite_odd,
-                                        'market': market
-                                    })
+                runners_data = market_book.get('runners', [])
+                if runners_data:
+                    # Encontrar menor odd (favorito)
+                    favorite = min(runners_data, 
+                                 key=lambda r: r.get('ex', {}).get('availableToBack', [{}])[0].get('price', 999))
+                    favorite_odd = favorite.get('ex', {}).get('availableToBack', [{}])[0].get('price', 999)
+                    
+                    if favorite_odd < self.tennis_config['favorite_max_odd']:
+                        valid_matches.append(dict(
+                            candidate,
+                            favorite_runner=favorite,
+                            favorite_odd=favorite_odd
+                        ))
             
             return valid_matches
         except Exception as e:
             logger.error(f"Erro ao buscar partidas de tênis: {e}")
             return []
     
-    def get_match_time(self, market_id: str) -> Optional[int]:
-        """Obtém o tempo de jogo em minutos (aproximado) baseado no tempo decorrido desde o início do mercado"""
+    def get_match_time(self, market_id: str, markets: Optional[List[Dict]] = None) -> Optional[int]:
+        """Obtém o tempo de jogo em minutos (aproximado) baseado no tempo decorrido desde o início do mercado
+        
+        O horário de início vem do cache do catálogo (preenchido pelos find_live_*);
+        só há requisição à API quando o mercado não está no cache.
+        
+        Args:
+            market_id: ID do mercado
+            markets: Resposta de listMarketCatalogue já obtida (ex: via batch) - evita nova requisição
+        """
         try:
-            # Buscar informações do mercado para obter o horário de início
-            filter_dict = {
-                'marketIds': [market_id]
-            }
-            
-            markets = self.api.list_market_catalogue(
-                filter_dict=filter_dict,
-                market_projection=['MARKET_START_TIME', 'EVENT'],
-                max_results=1
-            )
-            
-            if not markets or len(markets) == 0:
-                logger.debug(f"Mercado {market_id}: Não encontrado no catálogo")
-                return None
+            market = self.catalogue_cache.get(market_id)
+            if market is None or not market.get('marketStartTime'):
+                if markets is None:
+                    # Buscar informações do mercado para obter o horário de início
+                    filter_dict = {
+                        'marketIds': [market_id]
+                    }
+                    
+                    markets = self.api.list_market_catalogue(
+                        filter_dict=filter_dict,
+                        market_projection=['MARKET_START_TIME', 'EVENT'],
+                        max_results=1
+                    )
+                
+                if not markets or len(markets) == 0:
+                    logger.debug(f"Mercado {market_id}: Não encontrado no catálogo")
+                    return None
+                
+                market = markets[0]
+                self.catalogue_cache.put(market)
             
-            market = markets[0]
             market_start_time_str = market.get('marketStartTime')
             
             if not market_start_time_str:
@@ -453,10 +903,41 @@ class BetfairTradingBot:
     def check_soccer_entry_conditions(self, market_id: str, under_runner_id: int = None) -> Optional[Dict]:
         """Verifica condições de entrada para futebol"""
         try:
-            market_book = self.api.list_market_book(
-                market_ids=[market_id],
-                price_projection={'priceData': ['EX_BEST_OFFERS']}
-            )
+            # Buscar book, ordens atuais e horário de início em um único POST (batch JSON-RPC)
+            with self.api.batch() as batch:
+                book_call = batch.list_market_book(
+                    market_ids=[market_id],
+                    price_projection={'priceData': ['EX_BEST_OFFERS']}
+                )
+                current_orders = (self.cycle_snapshot or {}).get('current_orders')
+                orders_call = batch.list_current_orders() if current_orders is None else None
+                catalogue_call = None
+                if self.soccer_config['check_time_window'] and market_id not in self.catalogue_cache:
+                    catalogue_call = batch.list_market_catalogue(
+                        filter_dict={'marketIds': [market_id]},
+                        market_projection=['MARKET_START_TIME', 'EVENT'],
+                        max_results=1
+                    )
+            
+            # Guardar ordens e catálogo antes de qualquer retorno antecipado: os
+            # próximos mercados do ciclo não repetem listCurrentOrders
+            if orders_call is not None:
+                try:
+                    current_orders = orders_call.result()
+                except Exception as e:
+                    logger.debug(f"Erro ao obter ordens atuais no batch (mercado {market_id}): {e}")
+                if current_orders is not None:
+                    current_orders = self._snapshot_put('current_orders', current_orders)
+            catalogue = None
+            if catalogue_call is not None:
+                try:
+                    catalogue = catalogue_call.result()
+                except Exception as e:
+                    logger.debug(f"Erro ao obter catálogo do mercado {market_id} no batch: {e}")
+                    catalogue = []
+                self.catalogue_cache.put_many(catalogue)
+            
+            market_book = book_call.result()
             
             if not market_book:
                 logger.debug(f"Mercado {market_id}: Sem dados de mercado")
@@ -540,14 +1021,14 @@ class BetfairTradingBot:
                 return None
             
             # ✅ Verificar se já temos aposta ativa neste mercado (na memória)
-            for bet in self.active_bets.values():
+            for bet in list(self.active_bets.values()):
                 if bet.market_id == market_id and bet.status == BetStatus.ACTIVE:
                     logger.info(f"⚠️ Mercado {market_id}: Já tem aposta ativa na memória (Bet ID: {bet.bet_id})")
                     return None
             
             # ✅ Verificar se já existe aposta ativa no banco de dados (mesmo que não esteja na memória)
             try:
-                db_active_bets = self.db.get_active_bets()
+                db_active_bets = self.get_db_active_bets()
                 for db_bet in db_active_bets:
                     if db_bet.get('market_id') == market_id and db_bet.get('status') == 'ACTIVE':
                         db_bet_id = db_bet.get('bet_id', 'N/A')
@@ -558,7 +1039,6 @@ class BetfairTradingBot:
             
             # ✅ Verificar se já existe aposta ativa na Betfair API (mesmo após reinício do container)
             try:
-                current_orders = self.api.list_current_orders()
                 if current_orders and 'currentOrders' in current_orders:
                     for order in current_orders['currentOrders']:
                         order_market_id = order.get('marketId')
@@ -575,7 +1055,7 @@ class BetfairTradingBot:
                 # Continuar mesmo se houver erro na verificação da API
             
             # Verificar limite de apostas
-            soccer_bets_count = sum(1 for b in self.active_bets.values() 
+            soccer_bets_count = sum(1 for b in list(self.active_bets.values()) 
                                   if b.sport == SportType.SOCCER and b.status == BetStatus.ACTIVE)
             if soccer_bets_count >= self.max_bets_per_sport:
                 logger.info(f"⚠️ Limite de apostas de futebol atingido: {soccer_bets_count}/{self.max_bets_per_sport}")
@@ -595,7 +1075,7 @@ class BetfairTradingBot:
             # ✅ VERIFICAR TEMPO DE JOGO (entry_min_minute e entry_max_minute) - apenas se habilitado
             match_time = None  # Inicializar variável
             if self.soccer_config['check_time_window']:
-                match_time = self.get_match_time(market_id)
+                match_time = self.get_match_time(market_id, markets=catalogue)
                 if match_time is None:
                     logger.debug(f"Mercado {market_id}: Não foi possível obter tempo de jogo - pulando verificação de tempo")
                     # Se não conseguir obter o tempo e a verificação estiver habilitada, não apostar (mais conservador)
@@ -709,7 +1189,7 @@ class BetfairTradingBot:
                     instruction_error = report.get('instruction', {}).get('errorCode', '')
                     logger.error(f"❌ Falha ao colocar aposta LAY: Status={status}, ErrorCode={error_code}, InstructionError={instruction_error}, Message={error_message}")
                     if error_code == 'INSUFFICIENT_FUNDS':
-                        balance = self.get_account_balance()
+                        balance = self.get_account_balance(refresh=True)
                         if balance:
                             logger.error(f"   Saldo disponível: R$ {balance['available']:.2f}, Necessário: R$ {liability:.2f}")
                     return None
@@ -984,19 +1464,34 @@ class BetfairTradingBot:
             logger.error(f"Erro ao cancelar aposta: {e}")
             return False
     
-    def check_and_close_bet(self, bet: ActiveBet) -> bool:
-        """Verifica se uma aposta deve ser fechada e fecha se necessário"""
+    def check_and_close_bet(self, bet: ActiveBet, market: Optional[Dict] = None,
+                            price_updates: Optional[List[tuple]] = None) -> bool:
+        """Verifica se uma aposta deve ser fechada e fecha se necessário
+        
+        Args:
+            bet: Aposta ativa
+            market: Book do mercado já obtido (ex: snapshot de monitor_active_bets)
+            price_updates: Lista onde acumular (bet_id, preço, P&L) para gravação em
+                lote (None = gravar o preço aqui mesmo)
+        """
         try:
-            market_book = self.api.list_market_book(
-                market_ids=[bet.market_id],
-                price_projection={'priceData': ['EX_BEST_OFFERS']}
-            )
-            
-            if not market_book:
-                return False
+            if market is None:
+                market_book = self.api.list_market_book(
+                    market_ids=[bet.market_id],
+                    price_projection={'priceData': ['EX_BEST_OFFERS']}
+                )
+                
+                if not market_book:
+                    return False
+                
+                market = market_book[0]
             
-            runners = market_book[0].get('runners', [])
-            current_runner = next((r for r in runners if r.get('id') == bet.selection_id), None)
+            # Books da listMarketBook identificam o runner por selectionId (int); selection_id pode vir como str
+            runners = market.get('runners', [])
+            current_runner = next(
+                (r for r in runners if str(r.get('selectionId') or r.get('id')) == str(bet.selection_id)),
+                None
+            )
             
             if not current_runner:
                 return False
@@ -1015,6 +1510,7 @@ class BetfairTradingBot:
                 else:
                     current_price = bet.entry_price
             
+            previous_price = bet.current_price
             bet.current_price = current_price
             
             # Calcular P&L
@@ -1039,6 +1535,13 @@ class BetfairTradingBot:
             
             bet.profit_loss = profit_pct
             
+            # Registrar preço/P&L no banco só quando o preço mudar (alimenta o feed ao vivo do dashboard)
+            if current_price != previous_price or price_updates is not None:
+                if price_updates is not None:
+                    price_updates.append((bet.bet_id, current_price, profit_pct))
+                else:
+                    self.db.update_bet_price(bet.bet_id, current_price, profit_pct)
+            
             # Verificar Take Profit
             if profit_pct >= bet.take_profit_pct:
                 if self.cancel_bet(bet.market_id, bet.bet_id):
@@ -1048,13 +1551,7 @@ class BetfairTradingBot:
                     self.stats['total_profit'] += (bet.stake * profit_pct / 100)
                     
                     # Atualizar no banco de dados
-                    self.db.close_bet(
-                        bet.bet_id,
-                        'CLOSED_PROFIT',
-                        profit_pct,
-                        bet.close_reason,
-                        current_price
-                    )
+                    self._record_closed_bet(bet, 'CLOSED_PROFIT', profit_pct, current_price)
                     
                     logger.info(f"✓ Take Profit: {bet.sport.value} - {profit_pct:.2f}%")
                     return True
@@ -1068,13 +1565,7 @@ class BetfairTradingBot:
                     self.stats['total_profit'] += (bet.stake * profit_pct / 100)
                     
                     # Atualizar no banco de dados
-                    self.db.close_bet(
-                        bet.bet_id,
-                        'CLOSED_LOSS',
-                        profit_pct,
-                        bet.close_reason,
-                        current_price
-                    )
+                    self._record_closed_bet(bet, 'CLOSED_LOSS', profit_pct, current_price)
                     
                     logger.warning(f"✗ Stop Loss: {bet.sport.value} - {profit_pct:.2f}%")
                     return True
@@ -1091,13 +1582,7 @@ class BetfairTradingBot:
                         self.stats['total_profit'] += (bet.stake * profit_pct / 100)
                         
                         # Atualizar no banco de dados
-                        self.db.close_bet(
-                            bet.bet_id,
-                            'CLOSED_PROFIT',
-                            profit_pct,
-                            bet.close_reason,
-                            current_price
-                        )
+                        self._record_closed_bet(bet, 'CLOSED_PROFIT', profit_pct, current_price)
                         
                         logger.info(f"✓ Timeout Profit: {bet.sport.value} - {profit_pct:.2f}%")
                         return True
@@ -1107,6 +1592,93 @@ class BetfairTradingBot:
             logger.error(f"Erro ao verificar aposta {bet.bet_id}: {e}")
             return False
     
+    def open_soccer_bet(self, match: Dict, entry_conditions: Dict) -> Optional[str]:
+        """Faz a aposta BACK Under de um mercado de futebol e registra na memória, banco e Telegram
+        
+        Returns:
+            str: ID da aposta ou None se falhou
+        """
+        market_id = match['market_id']
+        # Fazer aposta BACK (a favor de Under 4.5 Goals)
+        bet_id = self.place_back_bet(
+            market_id=market_id,
+            selection_id=entry_conditions['selection_id'],
+            price=entry_conditions['price'],
+            stake=self.stake
+        )
+        
+        if bet_id:
+            # BACK: não tem liability, apenas stake
+            entry_time = datetime.now()
+            under_goals = self.soccer_config['under_goals']
+            strategy_name = f"Back Under {under_goals}"
+            bet = ActiveBet(
+                bet_id=bet_id,
+                market_id=market_id,
+                event_id=match['event_id'],
+                sport=SportType.SOCCER,
+                strategy=strategy_name,
+                side="BACK",
+                selection_id=entry_conditions['selection_id'],
+                entry_price=entry_conditions['price'],
+                entry_time=entry_time,
+                stake=self.stake,
+                liability=0.0,  # BACK não tem liability
+                take_profit_pct=self.soccer_config['take_profit_pct'],
+                stop_loss_pct=self.soccer_config['stop_loss_pct'],
+            )
+            
+            self.active_bets[bet_id] = bet
+            self.stats['total_bets'] += 1
+            self.stats['soccer_bets'] += 1
+            
+            # Salvar no banco de dados
+            bet_row = {
+                'bet_id': bet_id,
+                'market_id': market_id,
+                'event_id': match['event_id'],
+                'event_name': match.get('event_name', ''),
+                'sport': SportType.SOCCER.name,
+                'strategy': strategy_name,
+                'side': "BACK",
+                'selection_id': entry_conditions['selection_id'],
+                'entry_price': entry_conditions['price'],
+                'entry_time': entry_time.isoformat(),
+                'stake': self.stake,
+                'liability': 0.0,
+                'take_profit_pct': self.soccer_config['take_profit_pct'],
+                'stop_loss_pct': self.soccer_config['stop_loss_pct'],
+                'status': 'ACTIVE',
+            }
+            self.db.insert_bet(bet_row)
+            self._record_placed_bet(bet_row)
+            
+            max_goals = int(under_goals)
+            logger.info(f"✓✓✓ NOVA APOSTA FUTEBOL (BACK Under {under_goals}): {match['event_name']} - Price {entry_conditions['price']:.2f} - Stake R$ {self.stake:.2f}")
+            logger.info(f"   → Você GANHA se o jogo tiver MENOS de {under_goals} gols (0 a {max_goals} gols)")
+            
+            # Enviar notificação do Telegram
+            if self.telegram and self.telegram.enabled:
+                try:
+                    balance = self.get_account_balance()
+                    bet_info = {
+                        'bet_id': bet_id,
+                        'event_name': match.get('event_name', ''),
+                        'sport': SportType.SOCCER.name,
+                        'strategy': strategy_name,
+                        'side': "BACK",
+                        'entry_price': entry_conditions['price'],
+                        'stake': self.stake,
+                        'liability': 0.0,
+                    }
+                    self.telegram.notify_new_bet(bet_info, balance)
+                except Exception as e:
+                    logger.warning(f"Erro ao enviar notificação do Telegram: {e}")
+        else:
+            logger.warning(f"✗ Falha ao colocar aposta BACK para {match['event_name']}")
+        
+        return bet_id
+    
     def process_soccer_strategy(self):
         """Processa estratégia de futebol"""
         if not self.soccer_config['enabled']:
@@ -1147,81 +1719,7 @@ class BetfairTradingBot:
             if entry_conditions:
                 matches_with_conditions += 1
                 logger.info(f"✅ Condições atendidas para {event_name} - Price: {entry_conditions['price']:.2f}")
-                # Fazer aposta BACK (a favor de Under 4.5 Goals)
-                bet_id = self.place_back_bet(
-                    market_id=market_id,
-                    selection_id=entry_conditions['selection_id'],
-                    price=entry_conditions['price'],
-                    stake=self.stake
-                )
-                
-                if bet_id:
-                    # BACK: não tem liability, apenas stake
-                    entry_time = datetime.now()
-                    under_goals = self.soccer_config['under_goals']
-                    strategy_name = f"Back Under {under_goals}"
-                    bet = ActiveBet(
-                        bet_id=bet_id,
-                        market_id=market_id,
-                        event_id=match['event_id'],
-                        sport=SportType.SOCCER,
-                        strategy=strategy_name,
-                        side="BACK",
-                        selection_id=entry_conditions['selection_id'],
-                        entry_price=entry_conditions['price'],
-                        entry_time=entry_time,
-                        stake=self.stake,
-                        liability=0.0,  # BACK não tem liability
-                        take_profit_pct=self.soccer_config['take_profit_pct'],
-                        stop_loss_pct=self.soccer_config['stop_loss_pct'],
-                    )
-                    
-                    self.active_bets[bet_id] = bet
-                    self.stats['total_bets'] += 1
-                    self.stats['soccer_bets'] += 1
-                    
-                    # Salvar no banco de dados
-                    self.db.insert_bet({
-                        'bet_id': bet_id,
-                        'market_id': market_id,
-                        'event_id': match['event_id'],
-                        'event_name': match.get('event_name', ''),
-                        'sport': SportType.SOCCER.name,
-                        'strategy': strategy_name,
-                        'side': "BACK",
-                        'selection_id': entry_conditions['selection_id'],
-                        'entry_price': entry_conditions['price'],
-                        'entry_time': entry_time.isoformat(),
-                        'stake': self.stake,
-                        'liability': 0.0,
-                        'take_profit_pct': self.soccer_config['take_profit_pct'],
-                        'stop_loss_pct': self.soccer_config['stop_loss_pct'],
-                        'status': 'ACTIVE',
-                    })
-                    
-                    max_goals = int(under_goals)
-                    logger.info(f"✓✓✓ NOVA APOSTA FUTEBOL (BACK Under {under_goals}): {match['event_name']} - Price {entry_conditions['price']:.2f} - Stake R$ {self.stake:.2f}")
-                    logger.info(f"   → Você GANHA se o jogo tiver MENOS de {under_goals} gols (0 a {max_goals} gols)")
-                    
-                    # Enviar notificação do Telegram
-                    if self.telegram and self.telegram.enabled:
-                        try:
-                            balance = self.get_account_balance()
-                            bet_info = {
-                                'bet_id': bet_id,
-                                'event_name': match.get('event_name', ''),
-                                'sport': SportType.SOCCER.name,
-                                'strategy': strategy_name,
-                                'side': "BACK",
-                                'entry_price': entry_conditions['price'],
-                                'stake': self.stake,
-                                'liability': 0.0,
-                            }
-                            self.telegram.notify_new_bet(bet_info, balance)
-                        except Exception as e:
-                            logger.warning(f"Erro ao enviar notificação do Telegram: {e}")
-                else:
-                    logger.warning(f"✗ Falha ao colocar aposta BACK para {match['event_name']}")
+                self.open_soccer_bet(match, entry_conditions)
         
         if matches_checked > 0:
             logger.info(f"📊 Futebol: {matches_checked} mercados verificados, {matches_with_conditions} com condições atendidas")
@@ -1327,7 +1825,7 @@ class BetfairTradingBot:
                     self.stats['hockey_bets'] += 1
                     
                     # Salvar no banco de dados
-                    self.db.insert_bet({
+                    bet_row = {
                         'bet_id': bet_id,
                         'market_id': market_id,
                         'event_id': match['event_id'],
@@ -1343,7 +1841,9 @@ class BetfairTradingBot:
                         'take_profit_pct': self.hockey_config['take_profit_pct'],
                         'stop_loss_pct': self.hockey_config['stop_loss_pct'],
                         'status': 'ACTIVE',
-                    })
+                    }
+                    self.db.insert_bet(bet_row)
+                    self._record_placed_bet(bet_row)
                     
                     logger.info(f"✓ Nova aposta Hóquei: {match['event_name']} - Price {entry_conditions['price']}")
                     
@@ -1520,7 +2020,7 @@ class BetfairTradingBot:
                     self.stats['tennis_bets'] += 1
                     
                     # Salvar no banco de dados
-                    self.db.insert_bet({
+                    bet_row = {
                         'bet_id': bet_id,
                         'market_id': market_id,
                         'event_id': match['event_id'],
@@ -1536,7 +2036,9 @@ class BetfairTradingBot:
                         'take_profit_pct': self.tennis_config['take_profit_pct'],
                         'stop_loss_pct': self.tennis_config['stop_loss_pct'],
                         'status': 'ACTIVE',
-                    })
+                    }
+                    self.db.insert_bet(bet_row)
+                    self._record_placed_bet(bet_row)
                     
                     logger.info(f"✓ Nova aposta Tênis: {match['event_name']} - Favorite {current_price}")
                     
@@ -1565,18 +2067,79 @@ class BetfairTradingBot:
         """Monitora e gerencia apostas ativas"""
         bets_to_remove = []
         
-        for bet_id, bet in self.active_bets.items():
-            if bet.status == BetStatus.ACTIVE:
-                closed = self.check_and_close_bet(bet)
-                if closed:
-                    bets_to_remove.append(bet_id)
+        active = [bet for bet in list(self.active_bets.values()) if bet.status == BetStatus.ACTIVE]
+        if not active:
+            return
+        
+        # Buscar o book de todos os mercados de uma vez (snapshot compartilhado)
+        try:
+            market_books = self.api.list_market_books(
+                [bet.market_id for bet in active],
+                price_projection={'priceData': ['EX_BEST_OFFERS']}
+            )
+        except Exception as e:
+            logger.error(f"Erro ao buscar books das apostas ativas: {e}")
+            return
+        
+        price_updates = []
+        for bet in active:
+            market = market_books.get(bet.market_id)
+            if market is None:
+                logger.debug(f"Mercado {bet.market_id}: Sem dados de mercado para aposta {bet.bet_id}")
+                continue
+            closed = self.check_and_close_bet(bet, market, price_updates)
+            if closed:
+                bets_to_remove.append(bet.bet_id)
+        
+        self.record_bet_prices(price_updates, closed_bet_ids=bets_to_remove)
         
         # Remover apostas fechadas (opcional - manter histórico)
         # for bet_id in bets_to_remove:
         #     del self.active_bets[bet_id]
     
-    def get_account_balance(self):
-        """Obtém o saldo da conta Betfair"""
+    def record_bet_prices(self, price_updates: List[tuple], closed_bet_ids: Optional[List[str]] = None):
+        """
+        Grava em lote os preços da passada do monitoramento
+        
+        Cada aposta é gravada só se o preço mudou desde a última gravação e
+        passou price_update_interval desde ela (preço final de apostas fechadas
+        já foi gravado no fechamento).
+        
+        Args:
+            price_updates: Tuplas (bet_id, preço, P&L) de check_and_close_bet
+            closed_bet_ids: Apostas fechadas nesta passada (saem do controle)
+        """
+        import time
+        now = time.monotonic()
+        closed = set(closed_bet_ids or [])
+        for bet_id in closed:
+            self._recorded_prices.pop(bet_id, None)
+        
+        due = []
+        for bet_id, price, profit_pct in price_updates:
+            if bet_id in closed:
+                continue
+            recorded = self._recorded_prices.get(bet_id)
+            if recorded and (recorded[0] == price or now - recorded[1] < self.price_update_interval):
+                continue
+            due.append((bet_id, price, profit_pct))
+        
+        if due and self.db.update_bet_prices(due):
+            for bet_id, price, _ in due:
+                self._recorded_prices[bet_id] = (price, now)
+    
+    def get_account_balance(self, refresh: bool = False):
+        """Obtém o saldo da conta Betfair
+        
+        Dentro de um ciclo o saldo é buscado uma única vez e mantido no snapshot
+        (atualizado localmente a cada aposta colocada).
+        
+        Args:
+            refresh: Ignorar o snapshot e buscar o saldo na API
+        """
+        if not refresh and self.cycle_snapshot and self.cycle_snapshot.get('balance'):
+            return dict(self.cycle_snapshot['balance'])
+        
         try:
             funds = self.api.get_account_funds()
             logger.debug(f"Resposta get_account_funds: {funds}")
@@ -1592,6 +2155,9 @@ class BetfairTradingBot:
                     'exposure': float(exposure) if exposure else 0.0
                 }
                 logger.debug(f"Saldo extraído: {balance_info}")
+                with self.state_lock:
+                    if self.cycle_snapshot is not None:
+                        self.cycle_snapshot['balance'] = dict(balance_info)
                 return balance_info
             else:
                 logger.warning("get_account_funds retornou None ou vazio")
@@ -1605,7 +2171,7 @@ class BetfairTradingBot:
         
         # Obter saldo da conta
         logger.debug("Buscando saldo da conta...")
-        balance = self.get_account_balance()
+        balance = self.get_account_balance(refresh=True)
         logger.debug(f"Resultado get_account_balance: {balance}")
         
         logger.info("=" * 60)
@@ -1617,6 +2183,8 @@ class BetfairTradingBot:
         logger.info(f"Apostas com perda: {self.stats['loss_bets']}")
         logger.info(f"Lucro total: R$ {self.stats['total_profit']:.2f}")
         logger.info(f"Futebol: {self.stats['soccer_bets']} | Hóquei: {self.stats['hockey_bets']} | Tênis: {self.stats['tennis_bets']}")
+        cache_stats = self.catalogue_cache.stats()
+        logger.info(f"Cache de catálogo: {cache_stats['hits']} hits | {cache_stats['misses']} misses | {cache_stats['size']} mercados")
         
         if balance:
             logger.info(f"💰 Saldo disponível: R$ {balance['available']:.2f}")
@@ -1630,11 +2198,58 @@ class BetfairTradingBot:
                 balance['total'],
                 balance.get('exposure', 0)
             )
+            self.events.emit(
+                'balance',
+                available=balance['available'],
+                total=balance['total'],
+                exposure=balance.get('exposure', 0),
+            )
         else:
             logger.warning("⚠️ Não foi possível obter saldo da conta")
         
         logger.info("=" * 60)
     
+    def run_cycle(self):
+        """Executa um ciclo do bot: descoberta, monitoramento, estratégias e estatísticas
+        
+        Deve ser chamado após begin_cycle() e com sessão válida (usado por run() e benchmark.py).
+        """
+        # Descoberta única de mercados ao vivo para os esportes processados no ciclo
+        live_sports = []
+        if self.soccer_config['enabled']:
+            live_sports.append(SportType.SOCCER)
+        # if self.hockey_config['enabled']:
+        #     live_sports.append(SportType.ICE_HOCKEY)
+        # if self.tennis_config['enabled']:
+        #     live_sports.append(SportType.TENNIS)
+        self.discover_live_markets(live_sports)
+        
+        # Monitorar apostas ativas
+        active_count = sum(1 for b in self.active_bets.values() if b.status == BetStatus.ACTIVE)
+        if active_count > 0:
+            logger.info(f"📊 Monitorando {active_count} aposta(s) ativa(s)...")
+        self.monitor_active_bets()
+        
+        # Processar estratégias
+        if self.soccer_config['enabled']:
+            self.process_soccer_strategy()
+        else:
+            logger.debug("Estratégia de futebol desabilitada no config")
+        
+        # Hóquei desabilitado
+        # if self.hockey_config['enabled']:
+        #     self.process_hockey_strategy()
+        
+        # Tênis desabilitado
+        # if self.tennis_config['enabled']:
+        #     self.process_tennis_strategy()
+        
+        self.confirm_placed_bets()
+        
+        # Estatísticas a cada 10 ciclos
+        if self.bet_counter % 10 == 0:
+            self.print_stats()
+    
     def run(self):
         """Loop principal do bot"""
         logger.info("=" * 60)
@@ -1642,8 +2257,11 @@ class BetfairTradingBot:
         logger.info("=" * 60)
         
         while True:
+            cycle_timer = time.monotonic()
+            api_calls_before = self.api.request_count
             try:
                 cycle_start = datetime.now()
+                self.begin_cycle()
                 logger.info(f"\n🔄 Ciclo #{self.bet_counter + 1} - {cycle_start.strftime('%H:%M:%S')}")
                 
                 # Verificar login
@@ -1651,44 +2269,27 @@ class BetfairTradingBot:
                     logger.warning("⚠️ Token não encontrado, fazendo login...")
                     if not self.api.login():
                         logger.error("❌ Falha no login. Aguardando antes de tentar novamente...")
+                        self.record_error("Falha no login")
+                        self.record_heartbeat(self.bet_counter, time.monotonic() - cycle_timer,
+                                              self.api.request_count - api_calls_before)
                         time.sleep(60)  # Aguardar 1 minuto antes de tentar novamente
                         continue
                     else:
                         logger.info("✅ Login realizado com sucesso")
                 
-                # Monitorar apostas ativas
-                active_count = sum(1 for b in self.active_bets.values() if b.status == BetStatus.ACTIVE)
-                if active_count > 0:
-                    logger.info(f"📊 Monitorando {active_count} aposta(s) ativa(s)...")
-                self.monitor_active_bets()
-                
-                # Processar estratégias
-                if self.soccer_config['enabled']:
-                    self.process_soccer_strategy()
-                else:
-                    logger.debug("Estratégia de futebol desabilitada no config")
-                
-                # Hóquei desabilitado
-                # if self.hockey_config['enabled']:
-                #     self.process_hockey_strategy()
-                
-                # Tênis desabilitado
-                # if self.tennis_config['enabled']:
-                #     self.process_tennis_strategy()
-                
-                # Estatísticas a cada 10 ciclos
-                if self.bet_counter % 10 == 0:
-                    self.print_stats()
-                    # Atualizar estatísticas diárias no banco
-                    self.db.update_daily_stats()
+                self.run_cycle()
                 
                 self.bet_counter += 1
+                self.record_heartbeat(self.bet_counter, time.monotonic() - cycle_timer,
+                                      self.api.request_count - api_calls_before)
                 
                 # Aguardar antes do próximo ciclo
                 time.sleep(self.check_interval)
                 
             except KeyboardInterrupt:
                 logger.info("Bot interrompido pelo usuário")
+                self.api.close()
+                self.db.close()
                 break
             except Exception as e:
                 error_str = str(e)
@@ -1704,6 +2305,9 @@ class BetfairTradingBot:
                         logger.error(f"Erro ao tentar fazer novo login: {login_error}")
                 
                 logger.error(f"Erro no loop principal: {e}", exc_info=True)
+                self.record_error(e)
+                self.record_heartbeat(self.bet_counter, time.monotonic() - cycle_timer,
+                                      self.api.request_count - api_calls_before)
                 time.sleep(self.check_interval)
 
 
@@ -35,6 +35,11 @@ class BetfairLogin:
         else:
             self.endpoint = f"https://identitysso-cert.betfair.{jurisdiction}/api/certlogin"
         
+        # URL de login customizada (ex: simulador local em betfair_simulator.py)
+        login_url = self.config.get('betfair', 'login_url', fallback='').strip()
+        if login_url:
+            self.endpoint = login_url
+        
     def login(self):
         """
         Faz login na API Betfair e retorna o token de sessão
@@ -0,0 +1,1075 @@
+#!/usr/bin/env python3
+"""
+Simulador local da Exchange Betfair para benchmarks e testes offline
+
+Servidor HTTP que fala o mesmo JSON-RPC usado por BetfairAPI._make_request
+(inclusive requisições em lote) e o endpoint de certlogin do BetfairLogin.
+Gera mercados in-play sintéticos cujas odds variam com o tempo e permite
+configurar latência e injeção de erros.
+
+Uso:
+    python betfair_simulator.py --port 8600 --soccer-markets 200 --latency-ms 40
+
+E no config.ini (seção [betfair]):
+    api_url = http://127.0.0.1:8600
+    login_url = http://127.0.0.1:8600/api/certlogin
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from configparser import ConfigParser
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from betfair_api import MAX_MARKET_BOOK_WEIGHT, market_book_weight
+
+logger = logging.getLogger(__name__)
+
+# Faixas da escada de preços da Betfair: (limite superior, incremento)
+PRICE_LADDER = [
+    (2.0, 0.01), (3.0, 0.02), (4.0, 0.05), (6.0, 0.1), (10.0, 0.2),
+    (20.0, 0.5), (30.0, 1.0), (50.0, 2.0), (100.0, 5.0), (1000.0, 10.0),
+]
+
+# Esportes simulados: eventTypeId, tipo de mercado, nomes dos runners e duração (min)
+SPORTS = {
+    'soccer': {'event_type_id': '1', 'event_type_name': 'Soccer', 'duration': 110},
+    'hockey': {'event_type_id': '7524', 'event_type_name': 'Ice Hockey', 'duration': 150},
+    'tennis': {'event_type_id': '2', 'event_type_name': 'Tennis', 'duration': 120},
+}
+
+TEAMS = [
+    'Flamengo', 'Palmeiras', 'Corinthians', 'Santos', 'Gremio', 'Internacional',
+    'Arsenal', 'Chelsea', 'Liverpool', 'Everton', 'Benfica', 'Porto',
+    'Ajax', 'Feyenoord', 'Napoli', 'Lazio', 'Sevilla', 'Valencia',
+]
+
+
+def to_tick(price: float) -> float:
+    """Arredonda o preço para o tick válido mais próximo (1.01 a 1000)"""
+    price = min(max(price, 1.01), 1000.0)
+    lower = 1.0
+    for upper, step in PRICE_LADDER:
+        if price <= upper:
+            return round(lower + round((price - lower) / step) * step, 2)
+        lower = upper
+    return 1000.0
+
+
+def tick_step(price: float) -> float:
+    """Incremento da escada de preços na faixa do preço"""
+    for upper, step in PRICE_LADDER:
+        if price < upper:
+            return step
+    return PRICE_LADDER[-1][1]
+
+
+def format_time(dt: datetime) -> str:
+    """Formata no padrão ISO 8601 da Betfair (ex: 2024-01-20T15:30:00.000Z)"""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def parse_time(value: str) -> datetime:
+    """Converte o horário ISO 8601 da Betfair em datetime UTC"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class SimulatorError(Exception):
+    """Erro de API (APINGException) devolvido ao cliente"""
+
+    def __init__(self, error_code: str, message: str = 'ANGX-0001'):
+        super().__init__(error_code)
+        self.error_code = error_code
+        self.message = message
+
+    def to_rpc(self) -> Dict:
+        return {
+            'code': -32099,
+            'message': self.message,
+            'data': {
+                'APINGException': {
+                    'requestUUID': str(uuid.uuid4()),
+                    'errorCode': self.error_code,
+                    'errorDetails': '',
+                },
+                'exceptionname': 'APINGException',
+            }
+        }
+
+
+class SimulatedMarket:
+    """Mercado in-play sintético com odds em passeio aleatório"""
+
+    def __init__(self, market_id: str, sport: str, event_id: str, event_name: str,
+                 start_time: datetime, runners: List[Dict], market_type: str,
+                 market_name: str, volatility: float, rng: random.Random):
+        self.market_id = market_id
+        self.sport = sport
+        self.event_id = event_id
+        self.event_name = event_name
+        self.start_time = start_time
+        self.runners = runners  # [{'selectionId', 'runnerName', 'price'}]
+        self.market_type = market_type
+        self.market_name = market_name
+        self.volatility = volatility
+        self.rng = rng
+        self.status = 'OPEN'
+        self.total_matched = round(rng.uniform(1000, 50000), 2)
+        self.last_update = time.monotonic()
+        self.duration = SPORTS[sport]['duration']
+        self.winner_id = None
+
+    @property
+    def elapsed_minutes(self) -> float:
+        return (datetime.now(timezone.utc) - self.start_time).total_seconds() / 60
+
+    def advance(self):
+        """Atualiza as odds pelo tempo decorrido desde a última atualização"""
+        now = time.monotonic()
+        dt = now - self.last_update
+        if dt <= 0 or self.status == 'CLOSED':
+            return
+        self.last_update = now
+
+        if self.elapsed_minutes >= self.duration:
+            self.close()
+            return
+
+        # Suspensões curtas (gol, ponto, revisão)
+        if self.status == 'SUSPENDED':
+            if self.rng.random() < min(1.0, dt / 10):
+                self.status = 'OPEN'
+            return
+        if self.rng.random() < min(1.0, dt / 600):
+            self.status = 'SUSPENDED'
+
+        # Passeio aleatório no log do preço do primeiro runner; o segundo acompanha
+        # (soma das probabilidades implícitas ~ 100%)
+        first = self.runners[0]
+        shock = self.rng.gauss(0, self.volatility * math.sqrt(dt))
+        # Time decay: o Under/favorito tende a cair conforme o jogo avança
+        # (proporcional à volatilidade - com volatility=0 as odds ficam paradas)
+        drift = -0.025 * self.volatility * dt
+        probability = 1 / first['price']
+        probability = min(max(probability * math.exp(-(shock + drift)), 0.01), 0.99)
+        first['price'] = to_tick(1 / probability)
+        if len(self.runners) > 1:
+            self.runners[1]['price'] = to_tick(1 / (1 - probability))
+        self.total_matched = round(self.total_matched + self.rng.uniform(0, 50) * dt, 2)
+
+    def close(self):
+        """Fecha o mercado e define o vencedor pela probabilidade implícita"""
+        if self.status == 'CLOSED':
+            return
+        self.status = 'CLOSED'
+        weights = [1 / runner['price'] for runner in self.runners]
+        self.winner_id = self.rng.choices(self.runners, weights=weights)[0]['selectionId']
+
+    def best_back(self, selection_id: int) -> Optional[float]:
+        for runner in self.runners:
+            if runner['selectionId'] == selection_id:
+                return runner['price']
+        return None
+
+    def catalogue(self, projection: List[str]) -> Dict:
+        """Representação de listMarketCatalogue com as projeções pedidas"""
+        market = {
+            'marketId': self.market_id,
+            'marketName': self.market_name,
+            'totalMatched': self.total_matched,
+        }
+        if 'MARKET_START_TIME' in projection:
+            market['marketStartTime'] = format_time(self.start_time)
+        if 'MARKET_DESCRIPTION' in projection:
+            market['description'] = {
+                'persistenceEnabled': True,
+                'bspMarket': False,
+                'marketTime': format_time(self.start_time),
+                'bettingType': 'ODDS',
+                'turnInPlayEnabled': True,
+                'marketType': self.market_type,
+                'regulator': 'MALTA LOTTERIES AND GAMBLING AUTHORITY',
+            }
+        if 'RUNNER_DESCRIPTION' in projection:
+            market['runners'] = [{
+                'selectionId': runner['selectionId'],
+                'runnerName': runner['runnerName'],
+                'handicap': 0.0,
+                'sortPriority': priority,
+            } for priority, runner in enumerate(self.runners, start=1)]
+        if 'EVENT_TYPE' in projection:
+            market['eventType'] = {
+                'id': SPORTS[self.sport]['event_type_id'],
+                'name': SPORTS[self.sport]['event_type_name'],
+            }
+        if 'EVENT' in projection:
+            market['event'] = {
+                'id': self.event_id,
+                'name': self.event_name,
+                'countryCode': 'BR',
+                'timezone': 'GMT',
+                'openDate': format_time(self.start_time),
+            }
+        return market
+
+    def book(self, with_prices: bool) -> Dict:
+        """Representação de listMarketBook"""
+        runners = []
+        for runner in self.runners:
+            price = runner['price']
+            status = 'ACTIVE'
+            if self.status == 'CLOSED':
+                status = 'WINNER' if runner['selectionId'] == self.winner_id else 'LOSER'
+            book = {
+                'selectionId': runner['selectionId'],
+                'handicap': 0.0,
+                'status': status,
+                'lastPriceTraded': price,
+                'totalMatched': round(self.total_matched / len(self.runners), 2),
+            }
+            if with_prices and self.status == 'OPEN':
+                lay_price = to_tick(price + tick_step(price))
+                book['ex'] = {
+                    'availableToBack': [
+                        {'price': to_tick(price - level * tick_step(price)), 'size': round(self.rng.uniform(20, 500), 2)}
+                        for level in range(3)
+                    ],
+                    'availableToLay': [
+                        {'price': to_tick(lay_price + level * tick_step(lay_price)), 'size': round(self.rng.uniform(20, 500), 2)}
+                        for level in range(3)
+                    ],
+                    'tradedVolume': [],
+                }
+            elif with_prices:
+                book['ex'] = {'availableToBack': [], 'availableToLay': [], 'tradedVolume': []}
+            runners.append(book)
+
+        return {
+            'marketId': self.market_id,
+            'isMarketDataDelayed': False,
+            'status': self.status,
+            'betDelay': 5,
+            'bspReconciled': False,
+            'complete': True,
+            'inplay': True,
+            'numberOfWinners': 1,
+            'numberOfRunners': len(self.runners),
+            'numberOfActiveRunners': len(self.runners) if self.status != 'CLOSED' else 0,
+            'lastMatchTime': format_time(datetime.now(timezone.utc)),
+            'totalMatched': self.total_matched,
+            'totalAvailable': round(self.total_matched / 3, 2),
+            'crossMatching': True,
+            'runnersVoidable': False,
+            'version': int(self.last_update * 1000),
+            'runners': runners,
+        }
+
+
+class ExchangeSimulator:
+    """Exchange Betfair simulada: estado dos mercados, ordens, conta e servidor HTTP"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8600,
+                 soccer_markets: int = 50, hockey_markets: int = 0, tennis_markets: int = 0,
+                 under_goals: float = 4.5, latency_ms: float = 0.0, latency_jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, http_error_rate: float = 0.0,
+                 session_ttl: Optional[float] = None, volatility: float = 0.02,
+                 balance: float = 1000.0, commission_rate: float = 0.05, seed: Optional[int] = None):
+        """
+        Args:
+            host: Endereço de escuta
+            port: Porta (0 = porta livre escolhida pelo sistema)
+            soccer_markets: Mercados Over/Under de futebol ao vivo mantidos
+            hockey_markets: Mercados TOTAL_GOALS de hóquei ao vivo mantidos
+            tennis_markets: Mercados MATCH_ODDS de tênis ao vivo mantidos
+            under_goals: Linha de gols dos mercados de futebol (ex: 4.5)
+            latency_ms: Latência fixa adicionada a cada requisição HTTP
+            latency_jitter_ms: Variação aleatória (0..jitter) somada à latência
+            error_rate: Probabilidade de uma chamada JSON-RPC devolver erro da API
+            http_error_rate: Probabilidade de uma requisição HTTP devolver 503
+            session_ttl: Validade (s) dos tokens de sessão (None = não expiram)
+            volatility: Volatilidade das odds por raiz de segundo
+            balance: Saldo inicial da conta
+            commission_rate: Comissão sobre o lucro líquido de cada mercado
+            seed: Semente do gerador aleatório (reprodutibilidade)
+        """
+        self.host = host
+        self.port = port
+        self.market_counts = {'soccer': soccer_markets, 'hockey': hockey_markets, 'tennis': tennis_markets}
+        self.under_goals = under_goals
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.session_ttl = session_ttl
+        self.volatility = volatility
+        self.rng = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self.markets: Dict[str, SimulatedMarket] = {}
+        self.orders: Dict[str, Dict] = {}
+        # Ordens liquidadas (listClearedOrders), em ordem de liquidação
+        self.cleared_orders: List[Dict] = []
+        # Comissão cobrada por mercado liquidado (só aparece em listClearedOrders por MARKET)
+        self.commission_rate = commission_rate
+        self.market_commissions: Dict[str, float] = {}
+        self.sessions: Dict[str, float] = {}
+        self.balance = balance
+        self.exposure = 0.0
+
+        self._next_market = 2000001
+        self._next_event = 34000001
+        self._next_selection = 47000001
+        self._next_bet = 300000000001
+
+        self.request_count = 0
+        self.call_counts: Dict[str, int] = {}
+
+        self.server = None
+        self._thread = None
+
+        with self.lock:
+            for sport, count in self.market_counts.items():
+                for _ in range(count):
+                    # Inícios espalhados pelo tempo de jogo (entradas em várias janelas)
+                    minutes_ago = self.rng.uniform(0, SPORTS[sport]['duration'] * 0.85)
+                    self._create_market(sport, datetime.now(timezone.utc) - timedelta(minutes=minutes_ago))
+
+    # ------------------------------------------------------------------
+    # Servidor HTTP
+    # ------------------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        """URL base do simulador (usar em api_url do config.ini)"""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        """Inicia o servidor em uma thread em segundo plano e retorna a URL base"""
+        self.server = ThreadingHTTPServer((self.host, self.port), _SimulatorRequestHandler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='betfair-simulator', daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Simulador Betfair em {self.url}")
+        return self.url
+
+    def stop(self):
+        """Para o servidor"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def serve_forever(self):
+        """Executa o servidor na thread atual (modo linha de comando)"""
+        self.server = ThreadingHTTPServer((self.host, self.port), _SimulatorRequestHandler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.port = self.server.server_address[1]
+        logger.info(f"🧪 Simulador Betfair em {self.url}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def write_config(self, config_file: str, cert_dir: Optional[str] = None):
+        """
+        Grava um config.ini apontando para o simulador
+
+        Os arquivos de certificado são criados vazios (o BetfairLogin exige que
+        existam; em HTTP o certificado não é usado).
+        """
+        cert_dir = cert_dir or os.path.join(os.path.dirname(os.path.abspath(config_file)), 'certs')
+        os.makedirs(cert_dir, exist_ok=True)
+        cert_file = os.path.join(cert_dir, 'simulator.crt')
+        key_file = os.path.join(cert_dir, 'simulator.key')
+        for path in (cert_file, key_file):
+            if not os.path.exists(path):
+                open(path, 'w').close()
+
+        config = ConfigParser()
+        config['betfair'] = {
+            'username': 'simulator',
+            'password': 'simulator',
+            'app_key': 'simulator',
+            'cert_file': cert_file,
+            'key_file': key_file,
+            'jurisdiction': 'com',
+            'api_url': self.url,
+            'login_url': f"{self.url}/api/certlogin",
+        }
+        with open(config_file, 'w') as f:
+            config.write(f)
+
+    def stats(self) -> Dict:
+        """Contadores de requisições HTTP e chamadas por método"""
+        with self.lock:
+            return {
+                'requests': self.request_count,
+                'calls': sum(self.call_counts.values()),
+                'by_method': dict(self.call_counts),
+            }
+
+    def reset_stats(self):
+        """Zera os contadores de requisições"""
+        with self.lock:
+            self.request_count = 0
+            self.call_counts = {}
+
+    def simulate_latency(self):
+        """Aplica a latência configurada (fora do lock - requisições concorrentes não se bloqueiam)"""
+        delay = self.latency_ms + (self.rng.uniform(0, self.latency_jitter_ms) if self.latency_jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    # ------------------------------------------------------------------
+    # Login e sessão
+    # ------------------------------------------------------------------
+
+    def login(self, username: str, password: str) -> Dict:
+        """certlogin: qualquer usuário/senha não vazios é aceito"""
+        if not username or not password:
+            return {'loginStatus': 'INVALID_USERNAME_OR_PASSWORD'}
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[token] = time.monotonic()
+        return {'sessionToken': token, 'loginStatus': 'SUCCESS'}
+
+    def _check_session(self, token: Optional[str]):
+        issued = self.sessions.get(token)
+        if issued is None:
+            raise SimulatorError('INVALID_SESSION_INFORMATION', 'ANGX-0003')
+        if self.session_ttl is not None and time.monotonic() - issued > self.session_ttl:
+            del self.sessions[token]
+            raise SimulatorError('INVALID_SESSION_INFORMATION', 'ANGX-0003')
+
+    # ------------------------------------------------------------------
+    # Despacho JSON-RPC
+    # ------------------------------------------------------------------
+
+    def handle_rpc(self, request: Dict, token: Optional[str]) -> Dict:
+        """Processa uma chamada JSON-RPC e devolve o objeto de resposta"""
+        call_id = request.get('id')
+        method = str(request.get('method', '')).split('/')[-1]
+        params = request.get('params') or {}
+
+        handlers = {
+            'listEvents': self.list_events,
+            'listMarketCatalogue': self.list_market_catalogue,
+            'listMarketBook': self.list_market_book,
+            'placeOrders': self.place_orders,
+            'cancelOrders': self.cancel_orders,
+            'listCurrentOrders': self.list_current_orders,
+            'listClearedOrders': self.list_cleared_orders,
+            'getAccountFunds': self.get_account_funds,
+        }
+
+        with self.lock:
+            self.call_counts[method] = self.call_counts.get(method, 0) + 1
+            try:
+                handler = handlers.get(method)
+                if handler is None:
+                    return {'jsonrpc': '2.0', 'id': call_id,
+                            'error': {'code': -32601, 'message': 'Method not found'}}
+                self._check_session(token)
+                if self.error_rate and self.rng.random() < self.error_rate:
+                    raise SimulatorError(self.rng.choice(['SERVICE_BUSY', 'TIMEOUT_ERROR', 'UNEXPECTED_ERROR']))
+                self._advance_markets()
+                return {'jsonrpc': '2.0', 'id': call_id, 'result': handler(params)}
+            except SimulatorError as e:
+                return {'jsonrpc': '2.0', 'id': call_id, 'error': e.to_rpc()}
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Parâmetros inválidos em {method}: {e}")
+                return {'jsonrpc': '2.0', 'id': call_id,
+                        'error': SimulatorError('INVALID_INPUT_DATA', 'DSC-0018').to_rpc()}
+
+    # ------------------------------------------------------------------
+    # Mercados
+    # ------------------------------------------------------------------
+
+    def _create_market(self, sport: str, start_time: datetime) -> SimulatedMarket:
+        # Como na exchange real, o horário de início é sempre em minuto cheio
+        start_time = start_time.replace(second=0, microsecond=0)
+        market_id = f"1.{self._next_market}"
+        event_id = str(self._next_event)
+        self._next_market += 1
+        self._next_event += 1
+
+        home, away = self.rng.sample(TEAMS, 2)
+        selection_ids = [self._next_selection, self._next_selection + 1]
+        self._next_selection += 2
+
+        if sport == 'soccer':
+            line = self.under_goals
+            market_type = f"OVER_UNDER_{int(round(line * 10))}"
+            market_name = f"Over/Under {line} Goals"
+            names = [f"Under {line} Goals", f"Over {line} Goals"]
+            first_price = self.rng.uniform(1.05, 1.8)
+        elif sport == 'hockey':
+            market_type = 'TOTAL_GOALS'
+            market_name = '1st Period Total Goals'
+            names = ['Under 1.5 Goals', 'Over 1.5 Goals']
+            first_price = self.rng.uniform(1.3, 2.5)
+        else:
+            home, away = f"{home} Player", f"{away} Player"
+            market_type = 'MATCH_ODDS'
+            market_name = 'Match Odds'
+            names = [home, away]
+            first_price = self.rng.uniform(1.1, 3.0)
+
+        first_price = to_tick(first_price)
+        runners = [
+            {'selectionId': selection_ids[0], 'runnerName': names[0], 'price': first_price},
+            {'selectionId': selection_ids[1], 'runnerName': names[1],
+             'price': to_tick(1 / (1 - 1 / first_price)) if first_price > 1.01 else 100.0},
+        ]
+
+        market = SimulatedMarket(
+            market_id, sport, event_id, f"{home} v {away}", start_time,
+            runners, market_type, market_name, self.volatility, self.rng
+        )
+        self.markets[market_id] = market
+        return market
+
+    def _advance_markets(self):
+        """Atualiza odds, fecha mercados encerrados e repõe mercados ao vivo"""
+        live = {sport: 0 for sport in SPORTS}
+        for market in list(self.markets.values()):
+            if market.status == 'CLOSED':
+                continue
+            market.advance()
+            if market.status == 'CLOSED':
+                self._settle_market(market)
+            else:
+                live[market.sport] += 1
+
+        for sport, count in self.market_counts.items():
+            for _ in range(count - live[sport]):
+                self._create_market(sport, datetime.now(timezone.utc))
+
+        self._match_orders()
+
+    def _live_markets(self) -> List[SimulatedMarket]:
+        return [market for market in self.markets.values() if market.status != 'CLOSED']
+
+    def _select_markets(self, filter_dict: Dict) -> List[SimulatedMarket]:
+        """Mercados que atendem a um MarketFilter"""
+        event_type_ids = set(filter_dict.get('eventTypeIds') or [])
+        market_type_codes = set(filter_dict.get('marketTypeCodes') or [])
+        market_ids = set(filter_dict.get('marketIds') or [])
+        event_ids = set(filter_dict.get('eventIds') or [])
+        in_play = filter_dict.get('inPlay')
+        start_from = (filter_dict.get('marketStartTime') or {}).get('from')
+        start_to = (filter_dict.get('marketStartTime') or {}).get('to')
+        start_from = parse_time(start_from) if start_from else None
+        start_to = parse_time(start_to) if start_to else None
+
+        # Mercados fechados só aparecem quando pedidos pelo ID
+        markets = self.markets.values() if market_ids else self._live_markets()
+        selected = []
+        for market in markets:
+            if market_ids and market.market_id not in market_ids:
+                continue
+            if event_type_ids and SPORTS[market.sport]['event_type_id'] not in event_type_ids:
+                continue
+            if market_type_codes and market.market_type not in market_type_codes:
+                continue
+            if event_ids and market.event_id not in event_ids:
+                continue
+            if in_play is False:
+                continue
+            if start_from and market.start_time < start_from:
+                continue
+            if start_to and market.start_time > start_to:
+                continue
+            selected.append(market)
+        return selected
+
+    def list_market_catalogue(self, params: Dict) -> List[Dict]:
+        projection = params.get('marketProjection') or []
+        max_results = int(params.get('maxResults', 1000))
+        if max_results > 1000:
+            raise SimulatorError('TOO_MUCH_DATA', 'DSC-0008')
+
+        selected = self._select_markets(params.get('filter') or {})
+        sort = params.get('sort')
+        if sort == 'FIRST_TO_START':
+            selected.sort(key=lambda m: (m.start_time, m.market_id))
+        elif sort == 'LAST_TO_START':
+            selected.sort(key=lambda m: (m.start_time, m.market_id), reverse=True)
+        elif sort in ('MAXIMUM_TRADED', 'MINIMUM_TRADED'):
+            selected.sort(key=lambda m: m.total_matched, reverse=(sort == 'MAXIMUM_TRADED'))
+
+        return [market.catalogue(projection) for market in selected[:max_results]]
+
+    def list_events(self, params: Dict) -> List[Dict]:
+        events = {}
+        for market in self._select_markets(params.get('filter') or {}):
+            if market.event_id not in events:
+                events[market.event_id] = {
+                    'event': market.catalogue(['EVENT'])['event'],
+                    'marketCount': 0,
+                }
+            events[market.event_id]['marketCount'] += 1
+        return list(events.values())
+
+    def list_market_book(self, params: Dict) -> List[Dict]:
+        market_ids = params['marketIds']
+        price_projection = params.get('priceProjection')
+        if len(market_ids) * market_book_weight(price_projection) > MAX_MARKET_BOOK_WEIGHT:
+            raise SimulatorError('TOO_MUCH_DATA', 'DSC-0008')
+
+        with_prices = bool((price_projection or {}).get('priceData'))
+        order_projection = params.get('orderProjection')
+
+        books = []
+        for market_id in market_ids:
+            market = self.markets.get(market_id)
+            if market is None:
+                continue
+            book = market.book(with_prices)
+            if order_projection:
+                orders_by_runner = {}
+                for order in self._filter_orders(market_ids=[market_id], order_projection=order_projection):
+                    orders_by_runner.setdefault(order['selectionId'], []).append({
+                        'betId': order['betId'],
+                        'orderType': order['orderType'],
+                        'status': order['status'],
+                        'persistenceType': order['persistenceType'],
+                        'side': order['side'],
+                        'price': order['priceSize']['price'],
+                        'size': order['priceSize']['size'],
+                        'bspLiability': 0.0,
+                        'placedDate': order['placedDate'],
+                        'avgPriceMatched': order['averagePriceMatched'],
+                        'sizeMatched': order['sizeMatched'],
+                        'sizeRemaining': order['sizeRemaining'],
+                        'sizeLapsed': 0.0,
+                        'sizeCancelled': order['sizeCancelled'],
+                        'sizeVoided': 0.0,
+                    })
+                for runner in book['runners']:
+                    runner['orders'] = orders_by_runner.get(runner['selectionId'], [])
+            books.append(book)
+        return books
+
+    # ------------------------------------------------------------------
+    # Ordens e conta
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _liability(side: str, price: float, size: float) -> float:
+        return size if side == 'BACK' else size * (price - 1)
+
+    def _available_balance(self) -> float:
+        return round(self.balance + self.exposure, 2)
+
+    def place_orders(self, params: Dict) -> Dict:
+        market_id = params['marketId']
+        instructions = params['instructions']
+        market = self.markets.get(market_id)
+
+        def failure(error_code, reports=None):
+            return {
+                'customerRef': params.get('customerRef', ''),
+                'status': 'FAILURE',
+                'errorCode': error_code,
+                'marketId': market_id,
+                'instructionReports': reports or [
+                    {'status': 'FAILURE', 'errorCode': error_code, 'instruction': instruction}
+                    for instruction in instructions
+                ],
+            }
+
+        if market is None:
+            return failure('MARKET_NOT_OPEN_FOR_BETTING')
+        if market.status != 'OPEN':
+            return failure('MARKET_SUSPENDED' if market.status == 'SUSPENDED' else 'MARKET_NOT_OPEN_FOR_BETTING')
+
+        total_liability = 0.0
+        for instruction in instructions:
+            limit_order = instruction['limitOrder']
+            price = float(limit_order['price'])
+            size = float(limit_order['size'])
+            if to_tick(price) != round(price, 2):
+                return failure('INVALID_ODDS')
+            if size <= 0:
+                return failure('INVALID_BET_SIZE')
+            if market.best_back(int(instruction['selectionId'])) is None:
+                return failure('RUNNER_REMOVED')
+            total_liability += self._liability(instruction['side'], price, size)
+
+        if total_liability > self._available_balance():
+            return failure('INSUFFICIENT_FUNDS')
+
+        reports = []
+        placed_date = format_time(datetime.now(timezone.utc))
+        for instruction in instructions:
+            limit_order = instruction['limitOrder']
+            price = round(float(limit_order['price']), 2)
+            size = round(float(limit_order['size']), 2)
+            bet_id = str(self._next_bet)
+            self._next_bet += 1
+
+            order = {
+                'betId': bet_id,
+                'marketId': market_id,
+                'selectionId': int(instruction['selectionId']),
+                'handicap': 0.0,
+                'priceSize': {'price': price, 'size': size},
+                'bspLiability': 0.0,
+                'side': instruction['side'],
+                'status': 'EXECUTABLE',
+                'persistenceType': limit_order.get('persistenceType', 'LAPSE'),
+                'orderType': instruction.get('orderType', 'LIMIT'),
+                'placedDate': placed_date,
+                'averagePriceMatched': 0.0,
+                'sizeMatched': 0.0,
+                'sizeRemaining': size,
+                'sizeLapsed': 0.0,
+                'sizeCancelled': 0.0,
+                'sizeVoided': 0.0,
+                'regulatorCode': 'MALTA LOTTERIES AND GAMBLING AUTHORITY',
+                'customerOrderRef': instruction.get('customerOrderRef', ''),
+            }
+            self.orders[bet_id] = order
+            self.exposure -= self._liability(order['side'], price, size)
+            self._try_match(order, market)
+
+            reports.append({
+                'status': 'SUCCESS',
+                'instruction': instruction,
+                'betId': bet_id,
+                'placedDate': placed_date,
+                'averagePriceMatched': order['averagePriceMatched'],
+                'sizeMatched': order['sizeMatched'],
+                'orderStatus': order['status'],
+            })
+
+        return {
+            'customerRef': params.get('customerRef', ''),
+            'status': 'SUCCESS',
+            'marketId': market_id,
+            'instructionReports': reports,
+        }
+
+    def _try_match(self, order: Dict, market: SimulatedMarket):
+        """Casa a ordem inteira se o preço pedido for alcançado pelo mercado"""
+        if order['status'] != 'EXECUTABLE' or market.status != 'OPEN':
+            return
+        current = market.best_back(order['selectionId'])
+        price = order['priceSize']['price']
+        if current is None:
+            return
+        lay_price = to_tick(current + tick_step(current))
+        if (order['side'] == 'BACK' and price <= current) or (order['side'] == 'LAY' and price >= lay_price):
+            order['sizeMatched'] = order['sizeRemaining']
+            order['sizeRemaining'] = 0.0
+            order['averagePriceMatched'] = price
+            order['status'] = 'EXECUTION_COMPLETE'
+
+    def _match_orders(self):
+        for order in self.orders.values():
+            if order['status'] == 'EXECUTABLE':
+                market = self.markets.get(order['marketId'])
+                if market is not None:
+                    self._try_match(order, market)
+
+    def _settle_market(self, market: SimulatedMarket):
+        """Liquida as ordens do mercado fechado e atualiza saldo e exposição"""
+        settled_date = format_time(datetime.now(timezone.utc))
+        market_profit = 0.0
+        for bet_id, order in list(self.orders.items()):
+            if order['marketId'] != market.market_id:
+                continue
+            price = order['priceSize']['price']
+            self.exposure += self._liability(order['side'], price, order['priceSize']['size'])
+            matched = order['sizeMatched']
+            won = order['selectionId'] == market.winner_id
+            if order['side'] == 'BACK':
+                profit = matched * (price - 1) if won else -matched
+            else:
+                profit = -matched * (price - 1) if won else matched
+            self.balance = round(self.balance + profit, 2)
+            market_profit += profit
+            if matched > 0:
+                self.cleared_orders.append({
+                    'eventTypeId': SPORTS[market.sport]['event_type_id'],
+                    'marketId': market.market_id,
+                    'selectionId': order['selectionId'],
+                    'handicap': 0.0,
+                    'betId': bet_id,
+                    'placedDate': order['placedDate'],
+                    'side': order['side'],
+                    'priceRequested': price,
+                    'settledDate': settled_date,
+                    'betOutcome': 'WON' if profit > 0 else 'LOST',
+                    'priceMatched': price,
+                    'sizeSettled': matched,
+                    'profit': round(profit, 2),
+                })
+            del self.orders[bet_id]
+
+        # Comissão sobre o lucro líquido do mercado (o profit por aposta é bruto)
+        commission = round(max(market_profit, 0.0) * self.commission_rate, 2)
+        self.market_commissions[market.market_id] = commission
+        self.balance = round(self.balance - commission, 2)
+
+    def _filter_orders(self, bet_ids=None, market_ids=None, order_projection=None) -> List[Dict]:
+        bet_ids = set(bet_ids or [])
+        market_ids = set(market_ids or [])
+        orders = []
+        for order in self.orders.values():
+            if bet_ids and order['betId'] not in bet_ids:
+                continue
+            if market_ids and order['marketId'] not in market_ids:
+                continue
+            if order_projection in ('EXECUTABLE', 'EXECUTION_COMPLETE') and order['status'] != order_projection:
+                continue
+            orders.append(order)
+        return orders
+
+    def cancel_orders(self, params: Dict) -> Dict:
+        market_id = params.get('marketId')
+        instructions = params.get('instructions')
+
+        if instructions:
+            targets = []
+            for instruction in instructions:
+                order = self.orders.get(str(instruction['betId']))
+                if order is None or (market_id and order['marketId'] != market_id):
+                    return {
+                        'customerRef': params.get('customerRef', ''),
+                        'status': 'FAILURE',
+                        'errorCode': 'BET_ACTION_ERROR',
+                        'marketId': market_id,
+                        'instructionReports': [{
+                            'status': 'FAILURE',
+                            'errorCode': 'INVALID_BET_ID',
+                            'instruction': instruction,
+                        }],
+                    }
+                targets.append((instruction, order))
+        else:
+            targets = [
+                ({'betId': order['betId']}, order)
+                for order in self._filter_orders(market_ids=[market_id] if market_id else None,
+                                                 order_projection='EXECUTABLE')
+            ]
+
+        reports = []
+        cancelled_date = format_time(datetime.now(timezone.utc))
+        for instruction, order in targets:
+            size_cancelled = order['sizeRemaining']
+            if instruction.get('sizeReduction'):
+                size_cancelled = min(size_cancelled, float(instruction['sizeReduction']))
+            if size_cancelled > 0:
+                order['sizeRemaining'] = round(order['sizeRemaining'] - size_cancelled, 2)
+                order['sizeCancelled'] = round(order['sizeCancelled'] + size_cancelled, 2)
+                self.exposure += self._liability(order['side'], order['priceSize']['price'], size_cancelled)
+                if order['sizeRemaining'] <= 0:
+                    order['status'] = 'EXECUTION_COMPLETE'
+            reports.append({
+                'status': 'SUCCESS',
+                'instruction': instruction,
+                'sizeCancelled': size_cancelled,
+                'cancelledDate': cancelled_date,
+            })
+
+        return {
+            'customerRef': params.get('customerRef', ''),
+            'status': 'SUCCESS',
+            'marketId': market_id,
+            'instructionReports': reports,
+        }
+
+    def list_current_orders(self, params: Dict) -> Dict:
+        orders = self._filter_orders(
+            params.get('betIds'), params.get('marketIds'), params.get('orderProjection')
+        )
+        orders.sort(key=lambda order: order['placedDate'])
+        from_record = int(params.get('fromRecord', 0))
+        record_count = int(params.get('recordCount', 0)) or 1000
+        page = orders[from_record:from_record + record_count]
+        return {
+            'currentOrders': [dict(order) for order in page],
+            'moreAvailable': from_record + record_count < len(orders),
+        }
+
+    def list_cleared_orders(self, params: Dict) -> Dict:
+        if params.get('betStatus', 'SETTLED') != 'SETTLED':
+            return {'clearedOrders': [], 'moreAvailable': False}
+        bet_ids = set(params.get('betIds') or [])
+        market_ids = set(params.get('marketIds') or [])
+        date_range = params.get('settledDateRange') or {}
+        orders = [
+            order for order in self.cleared_orders
+            if (not bet_ids or order['betId'] in bet_ids)
+            and (not market_ids or order['marketId'] in market_ids)
+            and (not date_range.get('from') or order['settledDate'] >= date_range['from'])
+            and (not date_range.get('to') or order['settledDate'] <= date_range['to'])
+        ]
+        if params.get('groupBy') == 'MARKET':
+            orders = self._market_summaries(orders)
+        from_record = int(params.get('fromRecord', 0))
+        record_count = min(int(params.get('recordCount', 0)) or 1000, 1000)
+        page = orders[from_record:from_record + record_count]
+        return {
+            'clearedOrders': [dict(order) for order in page],
+            'moreAvailable': from_record + record_count < len(orders),
+        }
+
+    def _market_summaries(self, orders: List[Dict]) -> List[Dict]:
+        """Resumo por mercado (groupBy=MARKET): lucro somado e comissão do mercado"""
+        summaries: Dict[str, Dict] = {}
+        for order in orders:
+            summary = summaries.setdefault(order['marketId'], {
+                'eventTypeId': order['eventTypeId'],
+                'marketId': order['marketId'],
+                'settledDate': order['settledDate'],
+                'profit': 0.0,
+                'commission': self.market_commissions.get(order['marketId'], 0.0),
+                'betCount': 0,
+            })
+            summary['profit'] = round(summary['profit'] + order['profit'], 2)
+            summary['betCount'] += 1
+        return list(summaries.values())
+
+    def get_account_funds(self, params: Dict) -> Dict:
+        return {
+            'availableToBetBalance': self._available_balance(),
+            'exposure': round(self.exposure, 2),
+            'retainedCommission': 0.0,
+            'exposureLimit': -10000.0,
+            'discountRate': 0.0,
+            'pointsBalance': 0,
+            'wallet': 'UK',
+        }
+
+
+class _SimulatorRequestHandler(BaseHTTPRequestHandler):
+    """Handler HTTP: certlogin (form) e JSON-RPC (objeto único ou lote)"""
+
+    # Keep-alive, como a API real (o BetfairAPI reutiliza as conexões do pool)
+    protocol_version = 'HTTP/1.1'
+    # Sem Nagle: cabeçalho e corpo saem em writes separados (evita atraso de ~40ms do ACK)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # Contadores do simulador (usados pelo benchmark.py em outro processo)
+        if self.path.rstrip('/') == '/simulator/stats':
+            self._send_json(200, self.server.simulator.stats())
+            return
+        self._send_json(404, {'error': 'Not Found'})
+
+    def do_POST(self):
+        simulator = self.server.simulator
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length) if length else b''
+
+        with simulator.lock:
+            simulator.request_count += 1
+        simulator.simulate_latency()
+
+        if simulator.http_error_rate and simulator.rng.random() < simulator.http_error_rate:
+            self._send_json(503, {'error': 'Service Unavailable'})
+            return
+
+        if self.path.rstrip('/').endswith('/certlogin'):
+            form = parse_qs(raw.decode('utf-8'))
+            result = simulator.login(form.get('username', [''])[0], form.get('password', [''])[0])
+            self._send_json(200, result)
+            return
+
+        if '/json-rpc/' not in self.path:
+            self._send_json(404, {'error': 'Not Found'})
+            return
+
+        try:
+            payload = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            self._send_json(200, {'jsonrpc': '2.0', 'id': None,
+                                  'error': {'code': -32700, 'message': 'Parse error'}})
+            return
+
+        token = self.headers.get('X-Authentication')
+        if isinstance(payload, list):
+            self._send_json(200, [simulator.handle_rpc(call, token) for call in payload])
+        else:
+            self._send_json(200, simulator.handle_rpc(payload, token))
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Simulador local da Exchange Betfair')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--soccer-markets', type=int, default=50)
+    parser.add_argument('--hockey-markets', type=int, default=0)
+    parser.add_argument('--tennis-markets', type=int, default=0)
+    parser.add_argument('--under-goals', type=float, default=4.5)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidade de erro da API por chamada')
+    parser.add_argument('--http-error-rate', type=float, default=0.0, help='Probabilidade de HTTP 503 por requisição')
+    parser.add_argument('--session-ttl', type=float, default=None, help='Validade do token de sessão (s)')
+    parser.add_argument('--volatility', type=float, default=0.02)
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--commission-rate', type=float, default=0.05, help='Comissão sobre o lucro de cada mercado')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--write-config', metavar='ARQUIVO', help='Gravar config.ini apontando para o simulador')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    simulator = ExchangeSimulator(
+        host=args.host,
+        port=args.port,
+        soccer_markets=args.soccer_markets,
+        hockey_markets=args.hockey_markets,
+        tennis_markets=args.tennis_markets,
+        under_goals=args.under_goals,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        http_error_rate=args.http_error_rate,
+        session_ttl=args.session_ttl,
+        volatility=args.volatility,
+        balance=args.balance,
+        commission_rate=args.commission_rate,
+        seed=args.seed,
+    )
+
+    if args.write_config:
+        simulator.write_config(args.write_config)
+        logger.info(f"📝 Config gravado em {args.write_config}")
+
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Simulador interrompido pelo usuário")
+
+
+if __name__ == '__main__':
+    main()
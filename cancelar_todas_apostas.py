@@ -1,13 +1,207 @@
 #!/usr/bin/env python3
 """
 Script para cancelar todas as apostas ativas na Betfair
+
+Uso:
+    python cancelar_todas_apostas.py              # cancela mercado a mercado (em paralelo)
+    python cancelar_todas_apostas.py --cancel-all # um único cancelOrders sem mercado
 """
 
-from betfair_api import BetfairAPI
+from betfair_api import AsyncBetfairAPI, BetfairAPI
+import argparse
+import asyncio
 import json
+import uuid
 from datetime import datetime
 
+# Chamadas de cancelamento simultâneas e por segundo
+CANCEL_MAX_CONCURRENCY = 10
+CANCEL_RATE_PER_SECOND = 20
+
+# Limite de instruções por cancelOrders na Betfair
+CANCEL_MAX_INSTRUCTIONS = 60
+
+# Rodadas de verificação (listar o que sobrou e cancelar de novo)
+CANCEL_VERIFY_ROUNDS = 2
+
+
+class AsyncRateLimiter:
+    """Limita o início de chamadas a rate por segundo (espaçamento uniforme)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class MassCancel:
+    """
+    Cancelamento em massa das ordens executáveis
+
+    - lista todas as ordens EXECUTABLE seguindo moreAvailable (páginas de 1000);
+    - cancela mercado a mercado com chamadas simultâneas (até max_concurrency,
+      no máximo rate_per_second por segundo), em blocos de até 60 instruções;
+    - ou, no modo cancel_all, envia um único cancelOrders sem mercado;
+    - termina com uma varredura de verificação que cancela o que sobrou.
+
+    Cada chamada usa um customerRef único na execução (id da execução +
+    rodada + índice): a Betfair deduplica pela referência, e uma rodada de
+    verificação não pode repetir a referência de uma rodada anterior.
+    """
+
+    def __init__(self, api, max_concurrency=CANCEL_MAX_CONCURRENCY,
+                 rate_per_second=CANCEL_RATE_PER_SECOND):
+        """
+        Args:
+            api: Cliente BetfairAPI autenticado
+            max_concurrency: Chamadas de cancelamento simultâneas
+            rate_per_second: Chamadas de cancelamento iniciadas por segundo
+        """
+        self.api = api
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.run_id = uuid.uuid4().hex[:12]
+        self._rounds = 0
+
+    def _next_round(self):
+        """Número da próxima rodada de cancelamento (compõe o customerRef)"""
+        self._rounds += 1
+        return self._rounds
+
+    def fetch_orders(self):
+        """Todas as ordens ainda executáveis (todas as páginas)"""
+        orders = []
+        for page in self.api.iter_current_orders(order_projection='EXECUTABLE'):
+            orders.extend(page)
+        return orders
+
+    @staticmethod
+    def group_by_market(orders):
+        """market_id -> lista de bet_ids"""
+        bets_by_market = {}
+        for order in orders:
+            market_id = order.get('marketId')
+            bet_id = order.get('betId')
+            if market_id and bet_id:
+                bets_by_market.setdefault(market_id, []).append(bet_id)
+        return bets_by_market
+
+    def cancel_all_markets(self, orders=None):
+        """
+        Um único cancelOrders sem mercado (cancela tudo na conta)
+
+        Args:
+            orders: Ordens já conhecidas, só para identificar os mercados no relatório (opcional)
+
+        Returns:
+            list: (market_id, bet_id, erro ou None) de cada ordem relatada pela API
+        """
+        market_by_bet = {str(order.get('betId')): order.get('marketId') for order in orders or []}
+        result = self.api.cancel_orders(
+            market_id=None,
+            customer_ref=f"cancel_all_{self.run_id}_{self._next_round()}"
+        )
+        if not result or result.get('status') not in ('SUCCESS', 'PROCESSED_WITH_ERRORS'):
+            error_code = (result or {}).get('errorCode', 'Resposta inesperada da API')
+            raise RuntimeError(f"Falha no cancelamento geral: {error_code}")
+
+        reports = result.get('instructionReports')
+        if not reports:
+            # Sem relatório por ordem: a varredura de verificação confirma o que sobrou
+            return [(market_id, bet_id, None) for bet_id, market_id in market_by_bet.items()]
+        outcomes = []
+        for report in reports:
+            bet_id = str((report.get('instruction') or {}).get('betId', 'N/A'))
+            outcomes.append((market_by_bet.get(bet_id), bet_id, self._report_error(report)))
+        return outcomes
+
+    def cancel_by_market(self, bets_by_market):
+        """
+        Cancela as ordens de cada mercado, mercados em paralelo
+
+        Returns:
+            list: (market_id, bet_id, erro ou None) de cada ordem
+        """
+        if not bets_by_market:
+            return []
+        return asyncio.run(self._cancel_by_market(bets_by_market))
+
+    async def _cancel_by_market(self, bets_by_market):
+        async_api = AsyncBetfairAPI(self.api, max_concurrency=self.max_concurrency)
+        limiter = AsyncRateLimiter(self.rate_per_second)
+        round_number = self._next_round()
+
+        calls = []
+        for market_id, bet_ids in bets_by_market.items():
+            for start in range(0, len(bet_ids), CANCEL_MAX_INSTRUCTIONS):
+                calls.append((market_id, bet_ids[start:start + CANCEL_MAX_INSTRUCTIONS], len(calls)))
+
+        async def cancel(market_id, bet_ids, index):
+            await limiter.wait()
+            return await async_api.cancel_orders(
+                market_id=market_id,
+                bet_ids=bet_ids,
+                # customerRef único por chamada (a Betfair deduplica pela referência)
+                customer_ref=f"cancel_{self.run_id}_{round_number}_{index}"
+            )
+
+        results = await asyncio.gather(*(cancel(*call) for call in calls), return_exceptions=True)
+
+        outcomes = []
+        for (market_id, bet_ids, _), result in zip(calls, results):
+            if isinstance(result, Exception):
+                outcomes.extend((market_id, bet_id, f"Erro ao cancelar: {result}") for bet_id in bet_ids)
+                continue
+
+            reports = (result or {}).get('instructionReports')
+            if not reports:
+                error_code = (result or {}).get('errorCode', 'Resposta inesperada da API')
+                outcomes.extend((market_id, bet_id, error_code) for bet_id in bet_ids)
+                continue
+
+            for i, report in enumerate(reports):
+                bet_id = (report.get('instruction') or {}).get('betId') or (bet_ids[i] if i < len(bet_ids) else 'N/A')
+                outcomes.append((market_id, bet_id, self._report_error(report)))
+
+        return outcomes
+
+    @staticmethod
+    def _report_error(report):
+        """Mensagem de erro de um instructionReport (None se SUCCESS)"""
+        if report.get('status') == 'SUCCESS':
+            return None
+        return f"{report.get('errorCode', 'N/A')}: {report.get('errorMessage', 'N/A')}"
+
+    def verify(self, rounds=CANCEL_VERIFY_ROUNDS):
+        """
+        Varredura final: lista as ordens que ainda estão executáveis e as cancela de novo
+
+        Returns:
+            list: Ordens que continuam executáveis após as rodadas
+        """
+        remaining = self.fetch_orders()
+        for _ in range(rounds):
+            if not remaining:
+                break
+            self.cancel_by_market(self.group_by_market(remaining))
+            remaining = self.fetch_orders()
+        return remaining
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Cancela todas as apostas ativas na Betfair')
+    parser.add_argument('--cancel-all', action='store_true',
+                        help='Enviar um único cancelOrders sem mercado (todas as ordens da conta)')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("CANCELANDO TODAS AS APOSTAS ATIVAS")
     print("=" * 60)
@@ -22,94 +216,60 @@ def main():
             return
         print("✓ Login realizado com sucesso\n")
 
-        print("Buscando apostas ativas...")
-        orders = api.list_current_orders()
-
-        if not orders:
-            print("ℹ️ Nenhuma resposta da API")
-            return
+        engine = MassCancel(api)
 
-        current_orders = orders.get('currentOrders', [])
-        more_available = orders.get('moreAvailable', False)
+        if args.cancel_all:
+            # Kill switch: cancela antes de listar (cada segundo conta); a listagem
+            # vem depois, na verificação, só para o relatório e a varredura
+            print("🛑 Cancelando todas as ordens da conta (sem mercado)...\n")
+            outcomes = engine.cancel_all_markets()
+        else:
+            print("Buscando apostas ativas...")
+            current_orders = engine.fetch_orders()
 
-        if not current_orders:
-            print("ℹ️ Nenhuma aposta ativa encontrada")
-            return
+            if not current_orders:
+                print("ℹ️ Nenhuma aposta ativa encontrada")
+                return
 
-        print(f"✓ Encontradas {len(current_orders)} apostas ativas")
-        if more_available:
-            print("⚠️ Há mais apostas disponíveis")
-        print()
+            print(f"✓ Encontradas {len(current_orders)} apostas ativas\n")
 
-        # Agrupar por market_id para cancelar em lote
-        bets_by_market = {}
-        for order in current_orders:
-            market_id = order.get('marketId')
-            bet_id = order.get('betId')
-            status = order.get('status', 'N/A')
-            
-            if market_id and bet_id:
-                if market_id not in bets_by_market:
-                    bets_by_market[market_id] = []
-                bets_by_market[market_id].append({
-                    'bet_id': bet_id,
-                    'status': status,
-                    'order': order
-                })
+            bets_by_market = engine.group_by_market(current_orders)
+            print(f"📊 Apostas agrupadas em {len(bets_by_market)} mercados diferentes\n")
 
-        print(f"📊 Apostas agrupadas em {len(bets_by_market)} mercados diferentes\n")
+            print(f"🛑 Cancelando em {len(bets_by_market)} mercados em paralelo...\n")
+            outcomes = engine.cancel_by_market(bets_by_market)
 
         total_canceled = 0
         total_failed = 0
+        for market_id, bet_id, error in outcomes:
+            if error is None:
+                print(f"   ✅ Cancelada: Mercado {market_id} | Bet ID {bet_id}")
+                total_canceled += 1
+            else:
+                print(f"   ❌ Falha: Mercado {market_id} | Bet ID {bet_id} - {error}")
+                total_failed += 1
+        print()
 
-        # Cancelar apostas por mercado
-        for market_id, bets in bets_by_market.items():
-            print(f"📌 Mercado: {market_id}")
-            print(f"   Apostas neste mercado: {len(bets)}")
-            
-            bet_ids = [b['bet_id'] for b in bets]
-            
-            try:
-                result = api.cancel_orders(
-                    market_id=market_id,
-                    bet_ids=bet_ids,
-                    customer_ref=f"cancel_all_{int(datetime.now().timestamp())}"
-                )
-                
-                if result and 'instructionReports' in result:
-                    for i, report in enumerate(result['instructionReports']):
-                        bet_id = bet_ids[i] if i < len(bet_ids) else 'N/A'
-                        status = report.get('status', 'N/A')
-                        
-                        if status == 'SUCCESS':
-                            print(f"   ✅ Cancelada: Bet ID {bet_id}")
-                            total_canceled += 1
-                        else:
-                            error_code = report.get('errorCode', 'N/A')
-                            error_message = report.get('errorMessage', 'N/A')
-                            print(f"   ❌ Falha: Bet ID {bet_id} - {error_code}: {error_message}")
-                            total_failed += 1
-                else:
-                    print(f"   ⚠️ Resposta inesperada da API")
-                    total_failed += len(bet_ids)
-                    
-            except Exception as e:
-                print(f"   ❌ Erro ao cancelar: {e}")
-                total_failed += len(bet_ids)
-            
-            print()
+        print("🔍 Verificando ordens restantes...")
+        remaining = engine.verify()
+        if remaining:
+            print(f"⚠️ {len(remaining)} apostas continuam ativas após a verificação")
+        else:
+            print("✓ Nenhuma aposta executável restante")
+        print()
 
         print("=" * 60)
         print("RESUMO")
         print("=" * 60)
         print(f"✅ Canceladas com sucesso: {total_canceled}")
         print(f"❌ Falhas: {total_failed}")
-        print(f"📊 Total processadas: {len(current_orders)}")
+        print(f"📊 Total processadas: {len(outcomes)}")
+        print(f"🔍 Restantes após verificação: {len(remaining)}")
         print()
 
         if total_canceled > 0:
             print("✓ Algumas apostas foram canceladas com sucesso!")
-        if total_failed > 0:
+        if total_failed > 0 or remaining:
             print("⚠️ Algumas apostas não puderam ser canceladas")
             print("   (Pode ser que já tenham sido executadas ou o mercado esteja fechado)")
 
@@ -1,116 +1,295 @@
 #!/usr/bin/env python3
 """
-Script para verificar apostas finalizadas e buscar dados da API de atividade da Betfair
+Script para verificar apostas finalizadas e buscar os dados de liquidação na Betfair
 Atualiza placar, resultado (ganhou/perdeu) e lucro/prejuízo das apostas
 """
 
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
 from betfair_api import BetfairAPI
 from database import BetDatabase
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Marca d'água da sincronização de ordens liquidadas (data de liquidação mais recente já gravada)
+CLEARED_ORDERS_WATERMARK_KEY = 'cleared_orders_settled_date'
 
-def check_and_update_settled_bets():
-    """Verifica e atualiza apostas com dados da API de atividade"""
-    try:
-        db = BetDatabase()
-        api = BetfairAPI()
-        
-        if not api.login():
-            logger.error("Falha no login da API")
-            return
-        
-        # Buscar apostas ativas ou fechadas recentemente (últimas 48 horas)
-        from_date = datetime.now() - timedelta(hours=48)
-        bets = db.get_bets_by_date_range(
-            from_date.strftime('%Y-%m-%d'),
-            datetime.now().strftime('%Y-%m-%d')
-        )
-        
-        logger.info(f"Verificando {len(bets)} apostas...")
-        
-        updated_count = 0
+# Primeira sincronização: a listClearedOrders só guarda os últimos 90 dias
+CLEARED_ORDERS_INITIAL_DAYS = 90
+
+
+class ClearedOrdersSync:
+    """
+    Sincronização incremental de apostas liquidadas via listClearedOrders
+
+    Cada execução busca apenas as ordens liquidadas a partir da marca d'água
+    salva no banco (sync_state), percorre todas as páginas (até 1000 ordens
+    cada) e grava gross_profit, net_profit e settled_date em lote. O custo é
+    proporcional às liquidações novas, não ao tamanho do histórico.
+    
+    No nível da aposta a Betfair só informa o lucro bruto: a comissão vem do
+    resumo por mercado e é rateada entre as apostas vencedoras do mercado
+    (net_profit fica NULL enquanto a comissão do mercado não é conhecida).
+    Todas as apostas de um mercado têm a mesma data de liquidação, então
+    chegam juntas na mesma execução.
+    """
+
+    def __init__(self, api: BetfairAPI, db: BetDatabase, page_size: int = 1000):
+        """
+        Args:
+            api: Cliente Betfair autenticado
+            db: Banco de dados de apostas
+            page_size: Ordens por página (máximo 1000)
+        """
+        self.api = api
+        self.db = db
+        self.page_size = page_size
+
+    def watermark(self) -> str:
+        """Data de liquidação a partir da qual buscar (ISO 8601, UTC)"""
+        watermark = self.db.get_sync_state(CLEARED_ORDERS_WATERMARK_KEY)
+        if watermark:
+            return watermark
+        start = datetime.now(timezone.utc) - timedelta(days=CLEARED_ORDERS_INITIAL_DAYS)
+        return start.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+    def run(self) -> Dict:
+        """Busca e grava as ordens liquidadas desde a marca d'água; retorna um resumo"""
+        settled_from = self.watermark()
+        latest = settled_from
+        fetched = 0
+        updated = 0
+        failed_pages = 0
+
+        # O "from" é inclusivo: ordens no instante da marca d'água voltam e são regravadas (idempotente)
+        pages = list(self.api.iter_cleared_orders(settled_from=settled_from, record_count=self.page_size))
+        all_orders = [order for orders in pages for order in orders]
+        commissions = self.api.get_market_commissions(
+            {order.get('marketId') for order in all_orders}
+        ) if all_orders else {}
+        shares = BetfairAPI.apportion_commission(all_orders, commissions)
         
-        for bet in bets:
-            bet_id = bet['bet_id']
-            market_id = bet['market_id']
-            
-            # Buscar dados do mercado para verificar status e placar
-            try:
-                market_result = api.get_market_result(market_id)
-                
-                if market_result:
-                    # Atualizar status do mercado
-                    market_status = market_result.get('market_status')
-                    if market_status:
-                        db.update_bet_game_info(
-                            bet_id,
-                            market_status=market_status
-                        )
-                    
-                    # Se o mercado está fechado, tentar determinar resultado
-                    if market_status == 'CLOSED':
-                        runners = market_result.get('runners', [])
-                        for runner in runners:
-                            if str(runner.get('selection_id')) == str(bet['selection_id']):
-                                runner_status = runner.get('status', '')
-                                result = runner.get('result', '')
-                                
-                                # Atualizar status do runner
-                                db.update_bet_game_info(
-                                    bet_id,
-                                    runner_status=runner_status
-                                )
-                                
-                                # Se a aposta ainda está ACTIVE mas o mercado fechou, atualizar status
-                                if bet['status'] == 'ACTIVE':
-                                    if result == 'WIN':
-                                        # Verificar se é BACK ou LAY
-                                        if bet['side'] == 'BACK':
-                                            new_status = 'CLOSED_PROFIT'
-                                        else:  # LAY
-                                            new_status = 'CLOSED_LOSS'
-                                    elif result == 'LOSE':
-                                        if bet['side'] == 'BACK':
-                                            new_status = 'CLOSED_LOSS'
-                                        else:  # LAY
-                                            new_status = 'CLOSED_PROFIT'
-                                    else:
-                                        new_status = 'CLOSED_TIMEOUT'
-                                    
-                                    if new_status:
-                                        db.update_bet(bet_id, {
-                                            'status': new_status,
-                                            'close_time': datetime.now().isoformat(),
-                                            'close_reason': f'Mercado fechado - Runner: {result}'
-                                        })
-                                        updated_count += 1
-                                        logger.info(f"✓ Atualizada aposta {bet_id[:12]}... - Status: {new_status}")
-                
-                # Tentar buscar dados da API de atividade (settled bets)
-                # Nota: Esta API pode requerer autenticação via cookies de sessão web
-                settled_data = api.get_settled_bets(bet_ids=[bet_id])
-                
-                if settled_data and 'bets' in settled_data:
-                    for settled_bet in settled_data['bets']:
-                        if settled_bet.get('betId') == bet_id or settled_bet.get('betId') == f"1:{bet_id}":
-                            # Atualizar com dados da API de atividade
-                            db.update_bet_settled_data(bet_id, settled_bet)
-                            updated_count += 1
-                            logger.info(f"✓ Atualizada aposta {bet_id[:12]}... com dados da API de atividade")
-                            break
-                
-            except Exception as e:
-                logger.warning(f"Erro ao verificar aposta {bet_id[:12]}...: {e}")
+        for orders in pages:
+            fetched += len(orders)
+            page_updated = self.db.update_settled_bets([
+                BetfairAPI.cleared_order_to_settled_bet(order, shares.get(order.get('betId')))
+                for order in orders
+            ])
+            if page_updated is None:
+                failed_pages += 1
                 continue
-        
+            updated += page_updated
+            latest = max([latest] + [order['settledDate'] for order in orders if order.get('settledDate')])
+
+        # Avança só quando todas as páginas foram gravadas (inclusive as que estão na
+        # fila do escritor em segundo plano): uma falha repete a janela na próxima execução
+        if failed_pages or not self.db.flush():
+            logger.warning(f"⚠️ Falha ao gravar ordens liquidadas - marca d'água mantida em {settled_from}")
+            return {'cleared': fetched, 'cleared_updated': updated, 'watermark': settled_from}
+
+        if latest != settled_from:
+            self.db.set_sync_state(CLEARED_ORDERS_WATERMARK_KEY, latest)
+
+        logger.info(f"✓ {fetched} ordens liquidadas desde {settled_from} ({updated} apostas atualizadas)")
+        return {'cleared': fetched, 'cleared_updated': updated, 'watermark': latest}
+
+
+class SettlementReconciler:
+    """
+    Reconcilia em lote as apostas ainda não liquidadas
+
+    Em vez de consultar mercado e liquidação aposta por aposta:
+    - busca apenas apostas sem settled_date, agrupadas por mercado;
+    - busca o book de todos os mercados ainda não fechados de uma vez
+      (list_market_books: blocos dentro do limite de data weight, em batch);
+    - busca os dados de liquidação (listClearedOrders) das apostas de mercados
+      fechados, em páginas;
+    - grava todas as alterações em uma única transação.
+    """
+
+    def __init__(self, api: BetfairAPI, db: BetDatabase, lookback_hours: int = 48,
+                 settled_page_size: int = 100):
+        """
+        Args:
+            api: Cliente Betfair autenticado
+            db: Banco de dados de apostas
+            lookback_hours: Janela de apostas verificadas
+            settled_page_size: Apostas por consulta de liquidação
+        """
+        self.api = api
+        self.db = db
+        self.lookback_hours = lookback_hours
+        self.settled_page_size = settled_page_size
+
+    def run(self) -> Dict:
+        """Reconcilia as apostas não liquidadas da janela; retorna um resumo"""
+        from_date = datetime.now() - timedelta(hours=self.lookback_hours)
+        bets = self.db.get_unsettled_bets(from_date.strftime('%Y-%m-%d'))
+        logger.info(f"Verificando {len(bets)} apostas não liquidadas...")
+
+        updates = self.reconcile(bets)
+        updated_count = self.db.update_bets(updates)
+
+        summary = {
+            'checked': len(bets),
+            'markets': len({bet['market_id'] for bet in bets}),
+            'updated': updated_count,
+            'settled': sum(1 for fields in updates.values() if fields.get('settled_date')),
+        }
         logger.info(f"✓ Verificação concluída. {updated_count} apostas atualizadas.")
-        
+        return summary
+
+    def reconcile(self, bets: List[Dict]) -> Dict[str, Dict]:
+        """
+        Calcula as alterações de um conjunto de apostas (sem gravar)
+
+        Returns:
+            dict: bet_id -> campos a atualizar
+        """
+        bets_by_market: Dict[str, List[Dict]] = {}
+        for bet in bets:
+            bets_by_market.setdefault(bet['market_id'], []).append(bet)
+
+        # Mercados já conhecidos como fechados não precisam de book novo
+        open_markets = [
+            market_id for market_id, market_bets in bets_by_market.items()
+            if any(bet.get('market_status') != 'CLOSED' or bet['status'] == 'ACTIVE' for bet in market_bets)
+        ]
+        books = self.api.list_market_books(open_markets) if open_markets else {}
+        logger.info(f"{len(books)} books de {len(bets_by_market)} mercados")
+
+        updates: Dict[str, Dict] = {}
+        closed_bets: List[Dict] = []
+
+        for market_id, market_bets in bets_by_market.items():
+            book = books.get(market_id)
+            market_status = book.get('status') if book else None
+            runners = {}
+            if book:
+                for runner in book.get('runners', []):
+                    runners[str(runner.get('selectionId', runner.get('id')))] = runner
+
+            for bet in market_bets:
+                fields = {}
+                status = market_status or bet.get('market_status')
+                if market_status and market_status != bet.get('market_status'):
+                    fields['market_status'] = market_status
+
+                runner = runners.get(str(bet['selection_id']))
+                if status == 'CLOSED' and runner:
+                    runner_status = runner.get('status', '')
+                    if runner_status and runner_status != bet.get('runner_status'):
+                        fields['runner_status'] = runner_status
+
+                    # Se a aposta ainda está ACTIVE mas o mercado fechou, atualizar status
+                    if bet['status'] == 'ACTIVE':
+                        fields.update(self._closed_market_fields(bet, runner_status))
+                        logger.info(f"✓ Aposta {bet['bet_id'][:12]}... - Status: {fields['status']}")
+
+                if status == 'CLOSED':
+                    closed_bets.append(bet)
+                if fields:
+                    updates[bet['bet_id']] = fields
+
+        # Lucro/prejuízo das ordens liquidadas (só existe para mercados fechados)
+        settled = self.fetch_settled([bet['bet_id'] for bet in closed_bets])
+        for bet in closed_bets:
+            settled_bet = settled.get(bet['bet_id'])
+            if settled_bet:
+                fields = BetDatabase.settled_update_fields(settled_bet, bet.get('stake'))
+                updates.setdefault(bet['bet_id'], {}).update(fields)
+
+        return updates
+
+    @staticmethod
+    def _closed_market_fields(bet: Dict, runner_status: str) -> Dict:
+        """Status final de uma aposta ACTIVE cujo mercado fechou"""
+        if runner_status == 'WINNER':
+            result = 'WIN'
+            new_status = 'CLOSED_PROFIT' if bet['side'] == 'BACK' else 'CLOSED_LOSS'
+        elif runner_status == 'LOSER':
+            result = 'LOSE'
+            new_status = 'CLOSED_LOSS' if bet['side'] == 'BACK' else 'CLOSED_PROFIT'
+        else:
+            result = 'PLACE'
+            new_status = 'CLOSED_TIMEOUT'
+
+        return {
+            'status': new_status,
+            'close_time': datetime.now().isoformat(),
+            'close_reason': f'Mercado fechado - Runner: {result}',
+        }
+
+    def fetch_settled(self, bet_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Busca os dados de liquidação de várias apostas, página por página
+
+        Returns:
+            dict: bet_id -> aposta liquidada
+        """
+        wanted = set(bet_ids)
+        settled = {}
+        if not wanted:
+            return settled
+
+        ids = list(wanted)
+        for start in range(0, len(ids), self.settled_page_size):
+            chunk = ids[start:start + self.settled_page_size]
+            page_index = 0
+            while True:
+                data = self.api.get_settled_bets(bet_ids=chunk, page_index=page_index,
+                                                 page_size=self.settled_page_size)
+                page = (data or {}).get('bets') or []
+                for settled_bet in page:
+                    # A API pode retornar com ou sem prefixo "1:"
+                    bet_id = str(settled_bet.get('betId', '')).split(':')[-1]
+                    if bet_id in wanted:
+                        settled[bet_id] = settled_bet
+
+                more = (data or {}).get('moreAvailable', len(page) >= self.settled_page_size)
+                if not page or not more:
+                    break
+                page_index += 1
+
+        return settled
+
+
+def check_and_update_settled_bets(api: BetfairAPI = None, db: BetDatabase = None,
+                                  progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    Sincroniza as ordens liquidadas e reconcilia as apostas ainda pendentes
+
+    Args:
+        api: Cliente Betfair autenticado (None = criar e fazer login)
+        db: Banco de dados (None = banco padrão)
+        progress: Função chamada com uma mensagem a cada etapa (opcional)
+
+    Returns:
+        dict: Resumo da verificação (vazio em caso de erro)
+    """
+    progress = progress or (lambda message: None)
+    try:
+        db = db or BetDatabase()
+        if api is None:
+            progress('Fazendo login na Betfair')
+            api = BetfairAPI()
+            if not api.login():
+                logger.error("Falha no login da API")
+                return {}
+
+        # Primeiro as liquidações novas (tiram as apostas da lista de pendentes),
+        # depois o status dos mercados das que restaram
+        progress('Sincronizando ordens liquidadas')
+        summary = ClearedOrdersSync(api, db).run()
+        progress(f"{summary['cleared']} ordens liquidadas; verificando mercados das apostas pendentes")
+        summary.update(SettlementReconciler(api, db).run())
+        return summary
+
     except Exception as e:
         logger.error(f"Erro ao verificar apostas finalizadas: {e}")
+        return {}
 
 
 if __name__ == '__main__':
@@ -11,6 +11,9 @@ import os
 from datetime import datetime, timedelta
 from pathlib import Path
 import re
+from log_reader import find_log_file, tail_lines
+from heartbeat import is_alive, read_heartbeat
+from event_log import EventLogReader
 
 # Configurar cache para forçar atualização
 if 'force_refresh' not in st.session_state:
@@ -136,22 +139,20 @@ st.markdown("""
 # Funções auxiliares
 def read_log_file():
     """Lê o arquivo de log do bot"""
-    possible_paths = [
-        Path("logs/bot.log"),
-        Path("/app/logs/bot.log"),
-        Path("./logs/bot.log"),
-    ]
-    
-    for log_file in possible_paths:
-        if log_file.exists():
-            try:
-                with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-                return lines[-200:]  # Últimas 200 linhas
-            except Exception as e:
-                continue
-    
-    return []
+    log_file = find_log_file()
+    if log_file is None:
+        return []
+    try:
+        return tail_lines(log_file, 200)  # Últimas 200 linhas
+    except Exception as e:
+        return []
+
+@st.cache_resource
+def get_event_reader():
+    """Leitor do log de eventos do bot (mantido entre execuções do script)"""
+    return EventLogReader()
+
+event_reader = get_event_reader()
 
 def read_active_bets_file():
     """Lê o arquivo de apostas ativas"""
@@ -380,7 +381,12 @@ def parse_logs(logs):
     return stats, account_balance
 
 def check_bot_status():
-    """Verifica se o bot está rodando"""
+    """Verifica se o bot está rodando (pelo heartbeat gravado a cada ciclo)"""
+    heartbeat = read_heartbeat()
+    if heartbeat is not None:
+        return is_alive(heartbeat)
+    
+    # Bot sem heartbeat (versão antiga): verificar o horário das últimas linhas do log
     logs = read_log_file()
     if not logs:
         return False
@@ -421,6 +427,15 @@ with st.sidebar:
     else:
         st.error("🔴 **Bot Offline**")
     
+    heartbeat = read_heartbeat()
+    if heartbeat:
+        st.caption(
+            f"Ciclo #{heartbeat.get('cycle', 0)} há {heartbeat['age']:.0f}s · "
+            f"{heartbeat.get('cycle_duration', 0):.1f}s · {heartbeat.get('api_calls', 0)} chamadas à API"
+        )
+        if heartbeat.get('last_error'):
+            st.caption(f"⚠️ Último erro ({heartbeat.get('last_error_time')}): {heartbeat['last_error']}")
+    
     st.markdown("---")
     
     # Controles
@@ -500,7 +515,11 @@ st.markdown("---")
 # ==================== DADOS ====================
 # Carregar dados sem cache para garantir atualização
 logs = read_log_file()
-stats, account_balance = parse_logs(logs)
+if event_reader.exists():
+    stats, account_balance = event_reader.bot_stats()
+else:
+    # Bot sem log de eventos (versão antiga): extrair do log de texto
+    stats, account_balance = parse_logs(logs)
 active_bets_json = read_active_bets_file()
 betfair_orders = read_betfair_orders_file()
 
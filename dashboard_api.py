@@ -4,41 +4,220 @@ API Backend para o Dashboard HTML
 Fornece endpoints para buscar dados sem recarregar a página
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
+from collections import OrderedDict
+from functools import wraps
+import gzip
+import hashlib
 import json
+import logging
 import os
-import re
+import queue
+import threading
+import time
+import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
 from betfair_api import BetfairAPI
-from database import BetDatabase
+from database import BetDatabase, CLOSED_STATUSES
+from log_reader import LogWatcher
+from heartbeat import is_alive, read_heartbeat
+from event_log import EVENT_TYPES, EventLogReader
 from configparser import ConfigParser
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 CORS(app)  # Permitir requisições do frontend
 
 # Inicializar banco de dados
 db = BetDatabase()
 
-def read_log_file():
-    """Lê o arquivo de log do bot"""
-    possible_paths = [
-        Path("logs/bot.log"),
-        Path("/app/logs/bot.log"),
-        Path("./logs/bot.log"),
-    ]
+# Log do bot acompanhado de forma incremental (offset + inode)
+_log_watcher = LogWatcher(max_lines=200)
+
+# Eventos tipados do bot (logs/bot_events.jsonl), lidos de forma incremental
+_event_reader = EventLogReader()
+
+# Cliente Betfair compartilhado por todas as requisições (um login por processo;
+# o BetfairAPI refaz o login sozinho quando recebe INVALID_SESSION)
+LOGIN_RETRY_SECONDS = 30
+_api = None
+_api_lock = threading.Lock()
+_api_last_failure = 0.0
+
+# Saldo da conta em cache: uma busca à Betfair a cada FUNDS_CACHE_TTL segundos,
+# compartilhada entre requisições simultâneas
+FUNDS_CACHE_TTL = 5.0
+_funds_lock = threading.Lock()
+_funds_cache = {'funds': None, 'fetched_at': None}
+
+# Feed ao vivo (/api/stream): um único produtor lê o log de alterações do banco
+# e distribui os deltas para todas as abas conectadas
+STREAM_POLL_INTERVAL = 1.0
+STREAM_KEEPALIVE_SECONDS = 15.0
+STREAM_STATUS_INTERVAL = 30.0
+STREAM_QUEUE_SIZE = 100
+
+# Cache de respostas dos endpoints de leitura, versionado pelo contador de
+# alterações do banco (PRAGMA data_version)
+RESPONSE_CACHE_SIZE = 64
+GZIP_MIN_SIZE = 1024
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+# Tarefas longas (verificação de liquidação, cashout) rodam em um pool de workers
+# do próprio processo; o POST devolve o id do job na hora
+JOB_WORKERS = 2
+JOB_QUEUE_SIZE = 100
+JOB_RETENTION_SECONDS = 600
+JOB_MAX_FINISHED = 200
+
+def get_api():
+    """Retorna o cliente Betfair autenticado do processo (None se o login falhar)"""
+    global _api, _api_last_failure
     
-    for log_file in possible_paths:
-        if log_file.exists():
-            try:
-                with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-                return lines[-200:]
-            except:
-                continue
+    if _api is not None:
+        return _api
+    
+    with _api_lock:
+        if _api is not None:
+            return _api
+        
+        # Após uma falha, não tentar logar a cada poll do dashboard
+        if time.monotonic() - _api_last_failure < LOGIN_RETRY_SECONDS:
+            return None
+        
+        api = BetfairAPI()
+        if not api.login():
+            _api_last_failure = time.monotonic()
+            return None
+        
+        _api = api
+        return _api
+
+def get_account_funds_cached():
+    """
+    Fundos da conta com cache curto e single-flight
     
-    return []
+    Se o cache expirou, apenas uma requisição busca na API; as que chegam
+    enquanto isso esperam e reaproveitam o resultado.
+    """
+    def fresh():
+        fetched_at = _funds_cache['fetched_at']
+        return fetched_at is not None and time.monotonic() - fetched_at < FUNDS_CACHE_TTL
+    
+    if fresh():
+        return _funds_cache['funds']
+    
+    with _funds_lock:
+        if fresh():
+            return _funds_cache['funds']
+        
+        funds = None
+        try:
+            api = get_api()
+            if api is not None:
+                funds = api.get_account_funds()
+        except Exception:
+            funds = None
+        
+        # Falhas também ficam em cache pelo TTL (evita rajadas contra a API)
+        _funds_cache['funds'] = funds
+        _funds_cache['fetched_at'] = time.monotonic()
+        
+        if funds:
+            # Salvar no banco para histórico apenas quando o saldo mudar (cada
+            # linha nova altera a versão do banco e invalida o cache de respostas)
+            balance = (
+                float(funds.get('availableToBetBalance', 0)),
+                float(funds.get('totalBalance', 0)),
+                abs(float(funds.get('exposure', 0)))
+            )
+            if balance != _funds_cache.get('saved'):
+                db.save_balance(*balance)
+                _funds_cache['saved'] = balance
+        return funds
+
+def cached_response(version_extra=None):
+    """
+    Cache de respostas JSON com ETag e GET condicional
+    
+    A chave é o endpoint com seus parâmetros; a versão é o contador de
+    alterações do banco mais a data atual (janelas relativas como "últimos 30
+    dias") e o que version_extra() retornar. Se o ETag do cliente bate, responde
+    304 sem montar o JSON; se outro cliente já montou esta versão, reaproveita o
+    corpo (e a versão gzip, para respostas grandes).
+    
+    Args:
+        version_extra: Função opcional com estado que não está no banco
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # version_extra primeiro: pode gravar no banco (ex.: saldo novo)
+            extra = version_extra() if version_extra else None
+            data_version = db.get_data_version()
+            if data_version is None:
+                return view(*args, **kwargs)
+            
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            version = (data_version, datetime.now().date().isoformat(), extra)
+            etag = hashlib.sha1(repr((key, version)).encode('utf-8')).hexdigest()[:20]
+            
+            if request.if_none_match.contains_weak(etag):
+                return not_modified(etag)
+            
+            with _response_cache_lock:
+                entry = _response_cache.get(key)
+                if entry is not None:
+                    _response_cache.move_to_end(key)
+            
+            if entry is None or entry['etag'] != etag:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                
+                body = response.get_data()
+                entry = {
+                    'etag': etag,
+                    'body': body,
+                    'gzip': gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None,
+                    'mimetype': response.mimetype,
+                }
+                with _response_cache_lock:
+                    _response_cache[key] = entry
+                    _response_cache.move_to_end(key)
+                    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                        _response_cache.popitem(last=False)
+            
+            if entry['gzip'] is not None and 'gzip' in request.accept_encodings:
+                response = app.response_class(entry['gzip'], mimetype=entry['mimetype'])
+                response.headers['Content-Encoding'] = 'gzip'
+            else:
+                response = app.response_class(entry['body'], mimetype=entry['mimetype'])
+            response.headers['Vary'] = 'Accept-Encoding'
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def not_modified(etag):
+    """Resposta 304 Not Modified para o ETag informado"""
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def read_log_file():
+    """Lê as últimas 200 linhas do log do bot (incremental, sem reler o arquivo)"""
+    try:
+        return _log_watcher.read()
+    except Exception:
+        return []
 
 def read_betfair_orders_file():
     """Lê o arquivo de ordens da Betfair"""
@@ -59,102 +238,21 @@ def read_betfair_orders_file():
     
     return {}
 
-def parse_logs(logs):
-    """Extrai informações dos logs"""
-    stats = {
-        'total_bets': 0,
-        'profit_bets': 0,
-        'loss_bets': 0,
-        'total_profit': 0.0,
-        'soccer_bets': 0,
-        'hockey_bets': 0,
-        'tennis_bets': 0,
-        'active_bets': 0,
-    }
-    
-    account_balance = {
-        'available': None,
-        'total': None,
-        'exposure': None,
-    }
-    
-    for line in logs:
-        if 'Total de apostas:' in line:
-            match = re.search(r'Total de apostas: (\d+)', line)
-            if match:
-                stats['total_bets'] = int(match.group(1))
-        
-        if 'Apostas com lucro:' in line:
-            match = re.search(r'Apostas com lucro: (\d+)', line)
-            if match:
-                stats['profit_bets'] = int(match.group(1))
-        
-        if 'Apostas com perda:' in line:
-            match = re.search(r'Apostas com perda: (\d+)', line)
-            if match:
-                stats['loss_bets'] = int(match.group(1))
-        
-        if 'Lucro total:' in line:
-            match = re.search(r'Lucro total: R\$ ([\d.]+)', line)
-            if match:
-                stats['total_profit'] = float(match.group(1))
-        
-        if 'Apostas ativas:' in line:
-            match = re.search(r'Apostas ativas: (\d+)', line)
-            if match:
-                stats['active_bets'] = int(match.group(1))
-        
-        if 'Futebol:' in line and 'Hóquei:' in line and 'Tênis:' in line:
-            match = re.search(r'Futebol: (\d+) \| Hóquei: (\d+) \| Tênis: (\d+)', line)
-            if match:
-                stats['soccer_bets'] = int(match.group(1))
-                stats['hockey_bets'] = int(match.group(2))
-                stats['tennis_bets'] = int(match.group(3))
-        
-        # Buscar saldo em diferentes formatos
-        if 'Saldo disponível:' in line or 'availableToBetBalance' in line or 'Saldo extraído' in line or "'available':" in line:
-            match = re.search(r'Saldo disponível: R\$ ([\d.]+)', line)
-            if match:
-                account_balance['available'] = float(match.group(1))
-            else:
-                match = re.search(r"'available':\s*([\d.]+)", line)
-                if match:
-                    account_balance['available'] = float(match.group(1))
-                else:
-                    match = re.search(r'availableToBetBalance[:\s\'"]+([\d.]+)', line)
-                    if match:
-                        account_balance['available'] = float(match.group(1))
-        
-        if 'Saldo total:' in line or "'total':" in line or 'totalBalance' in line:
-            match = re.search(r'Saldo total: R\$ ([\d.]+)', line)
-            if match:
-                account_balance['total'] = float(match.group(1))
-            else:
-                match = re.search(r"'total':\s*([\d.]+)", line)
-                if match:
-                    account_balance['total'] = float(match.group(1))
-                else:
-                    match = re.search(r'totalBalance[:\s]+([\d.]+)', line)
-                    if match:
-                        account_balance['total'] = float(match.group(1))
-        
-        if 'Exposição:' in line or "'exposure':" in line or 'exposure' in line.lower():
-            match = re.search(r'Exposição: R\$ ([\d.]+)', line)
-            if match:
-                account_balance['exposure'] = abs(float(match.group(1)))
-            else:
-                match = re.search(r"'exposure':\s*(-?[\d.]+)", line)
-                if match:
-                    account_balance['exposure'] = abs(float(match.group(1)))
-                else:
-                    match = re.search(r'exposure[:\s]+(-?[\d.]+)', line)
-                    if match:
-                        account_balance['exposure'] = abs(float(match.group(1)))
-    
-    return stats, account_balance
+def get_bot_stats():
+    """Estatísticas e saldo reportados pelo bot (log estruturado de eventos)"""
+    return _event_reader.bot_stats()
 
 def check_bot_status():
-    """Verifica se o bot está rodando"""
+    """Verifica se o bot está rodando (pelo heartbeat gravado a cada ciclo)"""
+    heartbeat = read_heartbeat()
+    if heartbeat is not None:
+        return is_alive(heartbeat)
+    
+    # Bot sem heartbeat (versão antiga): verificar o horário das últimas linhas do log
+    return check_bot_status_from_log()
+
+def check_bot_status_from_log():
+    """Verifica se o bot está rodando pelo horário das últimas linhas do log"""
     logs = read_log_file()
     if not logs:
         return False
@@ -175,142 +273,566 @@ def check_bot_status():
     
     return False
 
+def get_balance(refresh=True):
+    """
+    Saldo da conta para o dashboard
+    
+    Args:
+        refresh: Tentar buscar o saldo atualizado da API (cache compartilhado)
+    """
+    # Buscar saldo mais recente do banco
+    balance_data = db.get_latest_balance()
+    account_balance = {
+        'available': balance_data['available'] if balance_data else None,
+        'total': balance_data['total'] if balance_data else None,
+        'exposure': balance_data['exposure'] if balance_data else None,
+    }
+    
+    if refresh:
+        # Tentar buscar saldo atualizado da API se possível
+        try:
+            funds = get_account_funds_cached()
+            if funds:
+                account_balance['available'] = float(funds.get('availableToBetBalance', 0))
+                account_balance['total'] = float(funds.get('totalBalance', 0))
+                account_balance['exposure'] = abs(float(funds.get('exposure', 0)))
+        except Exception:
+            pass
+    
+    return account_balance
+
+def format_bet(bet_db):
+    """Converte uma aposta do banco para o formato da API do dashboard"""
+    return {
+        'bet_id': bet_db['bet_id'],
+        'market_id': bet_db['market_id'],
+        'event_id': bet_db['event_id'],
+        'event_name': bet_db['event_name'],
+        'selection_id': bet_db['selection_id'],
+        'side': bet_db['side'],
+        'price': bet_db['entry_price'],
+        'size': bet_db['stake'],
+        'status': bet_db['status'],
+        'placed_date': bet_db['entry_time'],
+        'placedDate': bet_db['entry_time'],
+        'sport': bet_db['sport'],
+        'strategy': bet_db['strategy'],
+        'current_price': bet_db.get('current_price'),
+        'profit_loss': bet_db.get('profit_loss'),
+        'close_reason': bet_db.get('close_reason'),
+        'close_time': bet_db.get('close_time'),
+        'take_profit_pct': bet_db.get('take_profit_pct'),
+        'stop_loss_pct': bet_db.get('stop_loss_pct'),
+        'game_score': bet_db.get('game_score'),
+        'market_status': bet_db.get('market_status'),
+        'runner_status': bet_db.get('runner_status'),
+        'gross_profit': bet_db.get('gross_profit'),
+        'net_profit': bet_db.get('net_profit'),
+    }
+
+def build_dashboard_data():
+    """Monta os dados completos do dashboard (estatísticas, saldo e apostas)"""
+    # Buscar estatísticas do banco de dados
+    stats = db.get_statistics()
+    
+    # Saldo (API com cache compartilhado, ou o último salvo no banco)
+    account_balance = get_balance()
+    
+    # Buscar apostas do banco de dados
+    # Buscar apostas ativas (últimas 24 horas - já filtrado no método)
+    active_bets_db = db.get_active_bets()
+    
+    # Buscar apostas fechadas dos últimos 2 dias apenas
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=2)
+    closed_bets_db = db.get_bets_by_date_range(
+        start_date.strftime('%Y-%m-%d'),
+        end_date.strftime('%Y-%m-%d'),
+        statuses=CLOSED_STATUSES
+    )
+    
+    # Combinar todas as apostas
+    all_bets_db = active_bets_db + closed_bets_db
+    
+    # Converter apostas do banco para o formato da API
+    bets = []
+    active_bets = []
+    history_bets = []
+    
+    for bet_db in all_bets_db:
+        bet_data = format_bet(bet_db)
+        
+        bets.append(bet_data)
+        
+        # Classificar entre ativa e histórico
+        # ATIVAS: status = ACTIVE E das últimas 24 horas (já filtrado no get_active_bets)
+        # HISTÓRICO: todas as outras (CLOSED_PROFIT, CLOSED_LOSS, CLOSED_TIMEOUT, etc)
+        if bet_db['status'] == 'ACTIVE':
+            # Verificar se é das últimas 24 horas (segurança extra)
+            agora = datetime.now()
+            vinte_quatro_horas_atras = agora - timedelta(hours=24)
+            
+            # Parse da data de entrada
+            try:
+                entry_time_str = bet_db['entry_time']
+                if 'T' in entry_time_str:
+                    entry_datetime = datetime.fromisoformat(entry_time_str.replace('Z', '+00:00'))
+                    # Remover timezone para comparação
+                    if entry_datetime.tzinfo:
+                        entry_datetime = entry_datetime.replace(tzinfo=None)
+                else:
+                    entry_datetime = datetime.strptime(entry_time_str, '%Y-%m-%d %H:%M:%S')
+            except:
+                # Se falhar o parse, usar data atual como fallback
+                entry_datetime = agora
+            
+            # Só adicionar se for das últimas 24 horas
+            if entry_datetime >= vinte_quatro_horas_atras:
+                active_bets.append(bet_data)
+            # Se não tem nome válido, não adiciona em active_bets (fica apenas em bets para histórico)
+        else:
+            history_bets.append(bet_data)
+    
+    return {
+        'success': True,
+        'stats': stats,
+        'balance': account_balance,
+        'bets': bets,
+        'bets_active': active_bets,
+        'bets_history': history_bets,
+        'bot_status': check_bot_status()
+    }
+
+def dashboard_data_version():
+    """Estado de /api/data que não está no banco (saldo da API e status do bot)"""
+    # Atualiza o saldo em cache (grava no banco só se mudou, alterando a versão)
+    get_account_funds_cached()
+    return check_bot_status()
+
 @app.route('/api/data', methods=['GET'])
+@cached_response(dashboard_data_version)
 def get_data():
     """Endpoint para buscar todos os dados do banco de dados"""
     try:
-        # Buscar estatísticas do banco de dados
-        stats = db.get_statistics()
-        
-        # Buscar saldo mais recente do banco
-        balance_data = db.get_latest_balance()
-        account_balance = {
-            'available': balance_data['available'] if balance_data else None,
-            'total': balance_data['total'] if balance_data else None,
-            'exposure': balance_data['exposure'] if balance_data else None,
-        }
+        return jsonify(build_dashboard_data())
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+class LiveFeed:
+    """
+    Produtor compartilhado do feed ao vivo do dashboard
+    
+    Uma thread lê periodicamente a tabela bet_events (escrita por triggers a cada
+    aposta aberta/atualizada/fechada e a cada saldo salvo) e publica um delta por
+    ciclo para todos os assinantes. O custo por ciclo depende apenas do número de
+    alterações, não do número de abas abertas.
+    """
+    
+    def __init__(self, poll_interval=STREAM_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_event_id = None
+        self._bot_status = None
+        self._bot_status_checked = 0.0
+    
+    def subscribe(self):
+        """Registra um assinante e retorna sua fila de mensagens"""
+        subscriber = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                # A cada (re)início do produtor: quem assina agora recebe um snapshot
+                # novo, então os eventos de quando não havia assinantes são descartados
+                self._last_event_id = db.get_last_bet_event_id()
+                self._thread = threading.Thread(target=self._run, name='dashboard-live-feed', daemon=True)
+                self._thread.start()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        """Remove um assinante (o produtor para quando não há mais nenhum)"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def _publish(self, event, data):
+        """Entrega a mensagem a todos os assinantes; quem está atrasado é desconectado"""
+        message = (event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
         
-        # Tentar buscar saldo atualizado da API se possível
-        api = None
-        try:
-            api = BetfairAPI()
-            if api.login():
-                funds = api.get_account_funds()
-                if funds:
-                    account_balance['available'] = float(funds.get('availableToBetBalance', 0))
-                    account_balance['total'] = float(funds.get('totalBalance', 0))
-                    account_balance['exposure'] = abs(float(funds.get('exposure', 0)))
-                    # Salvar no banco para histórico
-                    db.save_balance(
-                        account_balance['available'],
-                        account_balance['total'],
-                        account_balance['exposure']
-                    )
-        except Exception:
-            pass
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Cliente lento: forçar reconexão (ele recebe um snapshot novo)
+                self.unsubscribe(subscriber)
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(('resync', {}))
+                except (queue.Empty, queue.Full):
+                    pass
+    
+    def _run(self):
+        """Loop do produtor"""
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error(f"Erro no feed ao vivo: {e}")
+            
+            time.sleep(self.poll_interval)
+    
+    def _poll(self):
+        """Lê as alterações novas do banco e publica um delta"""
+        events = db.get_bet_events(after_id=self._last_event_id)
+        
+        if events and events[0]['id'] > self._last_event_id + 1:
+            # Eventos foram descartados do log antes de serem lidos: os clientes
+            # precisam de um snapshot completo
+            self._last_event_id = events[-1]['id']
+            self._publish('resync', {})
+            return
+        
+        if events:
+            self._last_event_id = events[-1]['id']
+            self._publish('delta', self._build_delta(events))
+        
+        # O status do bot não vem do banco: verificar com menos frequência
+        now = time.monotonic()
+        if now - self._bot_status_checked >= STREAM_STATUS_INTERVAL:
+            self._bot_status_checked = now
+            bot_status = check_bot_status()
+            if bot_status != self._bot_status:
+                self._bot_status = bot_status
+                self._publish('bot_status', {'bot_status': bot_status})
+    
+    def _build_delta(self, events):
+        """Agrupa os eventos de um ciclo em um delta (uma linha por aposta alterada)"""
+        event_types = {}  # bet_id -> tipos de evento do ciclo
+        balance_changed = False
+        
+        for event in events:
+            if event['event_type'] == 'balance':
+                balance_changed = True
+            else:
+                event_types.setdefault(event['bet_id'], set()).add(event['event_type'])
         
-        # Buscar apostas do banco de dados
-        # Buscar apostas ativas (últimas 24 horas - já filtrado no método)
-        active_bets_db = db.get_active_bets()
+        # Estado atual das apostas alteradas em uma única consulta
+        bets = {bet['bet_id']: format_bet(bet) for bet in db.get_bets(list(event_types))}
         
-        # Buscar apostas fechadas dos últimos 2 dias apenas
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=2)
-        closed_bets_db = db.get_bets_by_date_range(
-            start_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d')
-        )
-        # Filtrar apenas as fechadas
-        closed_bets_db = [b for b in closed_bets_db if b['status'] != 'ACTIVE']
-        
-        # Combinar todas as apostas
-        all_bets_db = active_bets_db + closed_bets_db
-        
-        # Converter apostas do banco para o formato da API
-        bets = []
-        active_bets = []
-        history_bets = []
-        
-        for bet_db in all_bets_db:
-            bet_data = {
-                'bet_id': bet_db['bet_id'],
-                'market_id': bet_db['market_id'],
-                'event_id': bet_db['event_id'],
-                'event_name': bet_db['event_name'],
-                'selection_id': bet_db['selection_id'],
-                'side': bet_db['side'],
-                'price': bet_db['entry_price'],
-                'size': bet_db['stake'],
-                'status': bet_db['status'],
-                'placed_date': bet_db['entry_time'],
-                'placedDate': bet_db['entry_time'],
-                'sport': bet_db['sport'],
-                'strategy': bet_db['strategy'],
-                'current_price': bet_db.get('current_price'),
-                'profit_loss': bet_db.get('profit_loss'),
-                'close_reason': bet_db.get('close_reason'),
-                'close_time': bet_db.get('close_time'),
-                'take_profit_pct': bet_db.get('take_profit_pct'),
-                'stop_loss_pct': bet_db.get('stop_loss_pct'),
-                'game_score': bet_db.get('game_score'),
-                'market_status': bet_db.get('market_status'),
-                'runner_status': bet_db.get('runner_status'),
-                'gross_profit': bet_db.get('gross_profit'),
-                'net_profit': bet_db.get('net_profit'),
-            }
-            
-            bets.append(bet_data)
+        delta = {
+            'last_event_id': self._last_event_id,
+            'opened': [],
+            'updated': [],
+            'closed': [],
+            'removed': [],
+        }
+        for bet_id, types in event_types.items():
+            if bet_id not in bets:
+                # Removida do banco (ou removida e não recriada no mesmo ciclo)
+                delta['removed'].append(bet_id)
+            elif 'bet_opened' in types:
+                delta['opened'].append(bets[bet_id])
+            elif 'bet_closed' in types:
+                delta['closed'].append(bets[bet_id])
+            else:
+                delta['updated'].append(bets[bet_id])
+        
+        if event_types:
+            # Estatísticas materializadas (leitura barata)
+            delta['stats'] = db.get_statistics()
+        if balance_changed:
+            delta['balance'] = get_balance(refresh=False)
+        
+        return delta
+
+live_feed = LiveFeed()
+
+def format_sse(event, data, event_id=None):
+    """Formata uma mensagem Server-Sent Events"""
+    message = ''
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    message += f'event: {event}\ndata: {json.dumps(data)}\n\n'
+    return message
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Feed ao vivo (SSE): snapshot inicial seguido apenas de deltas"""
+    # Assinar antes do snapshot: deltas publicados enquanto ele é montado são
+    # reaplicados pelo cliente (trazem a linha completa da aposta)
+    subscriber = live_feed.subscribe()
+    
+    def generate():
+        try:
+            snapshot = build_dashboard_data()
+            yield format_sse('snapshot', snapshot)
             
-            # Classificar entre ativa e histórico
-            # ATIVAS: status = ACTIVE E das últimas 24 horas (já filtrado no get_active_bets)
-            # HISTÓRICO: todas as outras (CLOSED_PROFIT, CLOSED_LOSS, CLOSED_TIMEOUT, etc)
-            if bet_db['status'] == 'ACTIVE':
-                # Verificar se é das últimas 24 horas (segurança extra)
-                agora = datetime.now()
-                vinte_quatro_horas_atras = agora - timedelta(hours=24)
-                
-                # Parse da data de entrada
+            while True:
                 try:
-                    entry_time_str = bet_db['entry_time']
-                    if 'T' in entry_time_str:
-                        entry_datetime = datetime.fromisoformat(entry_time_str.replace('Z', '+00:00'))
-                        # Remover timezone para comparação
-                        if entry_datetime.tzinfo:
-                            entry_datetime = entry_datetime.replace(tzinfo=None)
-                    else:
-                        entry_datetime = datetime.strptime(entry_time_str, '%Y-%m-%d %H:%M:%S')
-                except:
-                    # Se falhar o parse, usar data atual como fallback
-                    entry_datetime = agora
+                    event, data = subscriber.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    # Comentário SSE para manter a conexão aberta em proxies
+                    yield ': keepalive\n\n'
+                    continue
                 
-                # Só adicionar se for das últimas 24 horas
-                if entry_datetime >= vinte_quatro_horas_atras:
-                    active_bets.append(bet_data)
-                # Se não tem nome válido, não adiciona em active_bets (fica apenas em bets para histórico)
-            else:
-                history_bets.append(bet_data)
-        
+                yield format_sse(event, data, data.get('last_event_id'))
+                if event == 'resync':
+                    return
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+class Job:
+    """Tarefa em segundo plano: estado, mensagens de progresso e resultado"""
+
+    def __init__(self, runner, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.progress = []
+        self.result = None
+        self.http_status = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Incrementado a cada mudança (acorda quem acompanha o job)
+        self.version = 0
+        self._runner = runner
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def report(self, message):
+        """Registra uma mensagem de progresso"""
+        self._runner._update(self, progress=message)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': list(self.progress),
+            'result': self.result,
+            'http_status': self.http_status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class JobRunner:
+    """
+    Fila de jobs em processo com um pool fixo de workers
+
+    Tarefas que chamam a Betfair (logins, catálogos, books, ordens) e gravam no
+    banco saem da thread da requisição: o endpoint enfileira e responde 202 com
+    o id do job. Jobs com a mesma chave (ex.: dois "verificar todas" ao mesmo
+    tempo) são deduplicados enquanto o primeiro estiver na fila ou rodando.
+
+    A função de cada job recebe o Job (para job.report) e retorna o corpo JSON
+    e o status HTTP, como uma view do Flask.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()  # job_id -> Job, do mais antigo para o mais novo
+        self._active = {}  # chave -> Job na fila ou rodando
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def submit(self, kind, key, func, *args):
+        """
+        Enfileira um job (ou reaproveita o job ativo com a mesma chave)
+
+        Returns:
+            tuple: (job, created) - created=False quando foi deduplicado
+
+        Raises:
+            queue.Full: Fila cheia
+        """
+        with self._cond:
+            job = self._active.get(key)
+            if job is not None:
+                return job, False
+
+            self._prune()
+            job = Job(self, kind, key)
+            self._queue.put_nowait((job, func, args))
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._start_workers()
+            return job, True
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Jobs conhecidos, do mais novo para o mais antigo"""
+        with self._cond:
+            self._prune()
+            return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def wait(self, job, version, timeout):
+        """
+        Espera o job mudar desde a versão informada
+
+        Returns:
+            tuple: (versão atual, estado do job nessa versão)
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: job.version != version, timeout)
+            return job.version, job.to_dict()
+
+    def _update(self, job, **changes):
+        """Aplica alterações ao job e acorda quem o acompanha"""
+        with self._cond:
+            message = changes.pop('progress', None)
+            if message is not None:
+                job.progress.append({'ts': time.time(), 'message': message})
+            for name, value in changes.items():
+                setattr(job, name, value)
+            if job.finished:
+                self._active.pop(job.key, None)
+            job.version += 1
+            self._cond.notify_all()
+
+    def _start_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'dashboard-job-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        """Loop de um worker"""
+        while True:
+            job, func, args = self._queue.get()
+            self._update(job, status='running', started_at=time.time())
+            try:
+                result = func(job, *args)
+                payload, http_status = result if isinstance(result, tuple) else (result, 200)
+            except Exception as e:
+                payload, http_status = {'success': False, 'error': str(e)}, 500
+
+            self._update(
+                job,
+                result=payload,
+                http_status=http_status,
+                status='done' if http_status < 400 else 'failed',
+                finished_at=time.time(),
+            )
+
+    def _prune(self):
+        """Descarta jobs terminados antigos (ou além do limite)"""
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - JOB_MAX_FINISHED
+        for job in finished:
+            if job.finished_at < cutoff or excess > 0:
+                del self._jobs[job.id]
+                excess -= 1
+
+job_runner = JobRunner()
+
+def submit_job(kind, key, func, *args):
+    """Enfileira um job e responde 202 com o id e as URLs de acompanhamento"""
+    try:
+        job, created = job_runner.submit(kind, key, func, *args)
+    except queue.Full:
         return jsonify({
-            'success': True,
-            'stats': stats,
-            'balance': account_balance,
-            'bets': bets,
-            'bets_active': active_bets,
-            'bets_history': history_bets,
-            'bot_status': check_bot_status()
-        })
-    except Exception as e:
+            'success': False,
+            'error': 'Fila de tarefas cheia, tente novamente em instantes'
+        }), 503
+
+    response = jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'deduplicated': not created,
+        'status_url': f'/api/jobs/{job.id}',
+        'stream_url': f'/api/jobs/{job.id}/stream',
+    })
+    response.status_code = 202
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Jobs em andamento e terminados recentemente"""
+    return jsonify({'success': True, 'jobs': job_runner.list()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado de um job (status, progresso e, ao terminar, o resultado)"""
+    job = job_runner.get(job_id)
+    if job is None:
         return jsonify({
             'success': False,
-            'error': str(e)
-        }), 500
+            'error': 'Job não encontrado'
+        }), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """Progresso de um job (SSE): 'status', 'progress' e um 'done' final com o resultado"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job não encontrado'
+        }), 404
+
+    def generate():
+        version = None
+        status = None
+        sent_progress = 0
+        while True:
+            current, state = job_runner.wait(job, version, STREAM_KEEPALIVE_SECONDS)
+            if current == version:
+                # Comentário SSE para manter a conexão aberta em proxies
+                yield ': keepalive\n\n'
+                continue
+            version = current
+
+            if state['status'] != status:
+                status = state['status']
+                yield format_sse('status', {'status': status}, version)
+            for entry in state['progress'][sent_progress:]:
+                yield format_sse('progress', entry, version)
+            sent_progress = len(state['progress'])
+
+            if state['status'] in ('done', 'failed'):
+                yield format_sse('done', state, version)
+                return
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
 
 @app.route('/api/market/<market_id>', methods=['GET'])
 def get_market_info(market_id):
     """Endpoint para buscar informações de um mercado específico"""
     try:
-        api = BetfairAPI()
-        if not api.login():
+        api = get_api()
+        if api is None:
             return jsonify({'success': False, 'error': 'Falha no login'}), 500
         
         filter_dict = {
@@ -348,6 +870,7 @@ def get_market_info(market_id):
         }), 500
 
 @app.route('/api/stats/history', methods=['GET'])
+@cached_response()
 def get_stats_history():
     """Endpoint para buscar histórico de estatísticas diárias"""
     try:
@@ -365,6 +888,7 @@ def get_stats_history():
         }), 500
 
 @app.route('/api/bets/history', methods=['GET'])
+@cached_response()
 def get_bets_history():
     """Endpoint para buscar histórico completo de apostas"""
     try:
@@ -420,113 +944,118 @@ def get_bet_details(bet_id):
             'error': str(e)
         }), 500
 
+def run_check_bet_settled(job, bet_id):
+    """Job: atualiza uma aposta com o status do mercado e os dados de liquidação"""
+    job.report('Fazendo login na Betfair')
+    api = get_api()
+    if api is None:
+        return {
+            'success': False,
+            'error': 'Falha no login da API'
+        }, 500
+    
+    bet = db.get_bet(bet_id)
+    if not bet:
+        return {
+            'success': False,
+            'error': 'Aposta não encontrada'
+        }, 404
+    
+    # Mesmo caminho da verificação em lote (book do mercado + dados de liquidação)
+    from check_settled_bets import SettlementReconciler
+    
+    job.report('Buscando mercado e dados de liquidação')
+    update_data = SettlementReconciler(api, db).reconcile([bet]).get(bet_id, {})
+    if update_data:
+        db.update_bet(bet_id, update_data)
+    
+    # Buscar aposta atualizada
+    updated_bet = db.get_bet(bet_id)
+    
+    return {
+        'success': True,
+        'bet': updated_bet,
+        'updates': update_data
+    }, 200
+
 @app.route('/api/bet/<bet_id>/check-settled', methods=['POST'])
 def check_bet_settled(bet_id):
-    """Endpoint para verificar e atualizar uma aposta com dados da API de atividade"""
-    try:
-        from check_settled_bets import check_and_update_settled_bets
-        from betfair_api import BetfairAPI
-        
-        api = BetfairAPI()
-        if not api.login():
-            return jsonify({
-                'success': False,
-                'error': 'Falha no login da API'
-            }), 500
-        
-        bet = db.get_bet(bet_id)
-        if not bet:
-            return jsonify({
-                'success': False,
-                'error': 'Aposta não encontrada'
-            }), 404
-        
-        # Buscar dados do mercado
-        market_result = api.get_market_result(bet['market_id'])
-        
-        update_data = {}
-        
-        if market_result:
-            # Atualizar status do mercado
-            market_status = market_result.get('market_status')
-            if market_status:
-                db.update_bet_game_info(bet_id, market_status=market_status)
-                update_data['market_status'] = market_status
-            
-            # Buscar informações do runner
-            runners = market_result.get('runners', [])
-            for runner in runners:
-                if str(runner.get('selection_id')) == str(bet['selection_id']):
-                    runner_status = runner.get('status', '')
-                    result = runner.get('result', '')
-                    
-                    if runner_status:
-                        db.update_bet_game_info(bet_id, runner_status=runner_status)
-                        update_data['runner_status'] = runner_status
-                    
-                    if result:
-                        update_data['result'] = result
-                    
-                    break
-        
-        # Tentar buscar dados da API de atividade
-        settled_data = api.get_settled_bets(bet_ids=[bet_id])
-        
-        if settled_data and 'bets' in settled_data:
-            for settled_bet in settled_data['bets']:
-                settled_bet_id = settled_bet.get('betId', '')
-                # A API pode retornar com ou sem prefixo "1:"
-                if settled_bet_id == bet_id or settled_bet_id == f"1:{bet_id}" or settled_bet_id.endswith(bet_id):
-                    db.update_bet_settled_data(bet_id, settled_bet)
-                    update_data['gross_profit'] = settled_bet.get('grossProfit')
-                    update_data['net_profit'] = settled_bet.get('netProfit')
-                    break
-        
-        # Buscar aposta atualizada
-        updated_bet = db.get_bet(bet_id)
-        
-        return jsonify({
-            'success': True,
-            'bet': updated_bet,
-            'updates': update_data
-        })
-        
-    except Exception as e:
-        return jsonify({
+    """Endpoint para verificar uma aposta (em segundo plano; retorna o id do job)"""
+    return submit_job('check-settled', ('check-settled', bet_id), run_check_bet_settled, bet_id)
+
+def run_check_all_settled(job):
+    """Job: verifica e atualiza todas as apostas recentes"""
+    from check_settled_bets import check_and_update_settled_bets
+    
+    job.report('Fazendo login na Betfair')
+    api = get_api()
+    if api is None:
+        return {
             'success': False,
-            'error': str(e)
-        }), 500
+            'error': 'Falha no login da API'
+        }, 500
+    
+    summary = check_and_update_settled_bets(api, db, progress=job.report)
+    
+    return {
+        'success': True,
+        'message': 'Verificação concluída',
+        'summary': summary
+    }, 200
 
 @app.route('/api/bets/check-all-settled', methods=['POST'])
 def check_all_settled_bets():
-    """Endpoint para verificar e atualizar todas as apostas recentes"""
+    """Endpoint para verificar todas as apostas recentes (em segundo plano; retorna o id do job)"""
+    return submit_job('check-all-settled', ('check-all-settled',), run_check_all_settled)
+
+@app.route('/api/balance/history', methods=['GET'])
+@cached_response()
+def get_balance_history():
+    """Endpoint para buscar histórico de saldo"""
     try:
-        from check_settled_bets import check_and_update_settled_bets
-        
-        check_and_update_settled_bets()
+        # Por enquanto retorna apenas o último saldo
+        # Futuramente pode retornar histórico completo
+        latest = db.get_latest_balance()
         
         return jsonify({
             'success': True,
-            'message': 'Verificação concluída'
+            'balance': latest if latest else {}
         })
-        
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
-@app.route('/api/balance/history', methods=['GET'])
-def get_balance_history():
-    """Endpoint para buscar histórico de saldo"""
+@app.route('/api/bot/heartbeat', methods=['GET'])
+def get_bot_heartbeat():
+    """Endpoint com o último heartbeat do bot (ciclo, duração, chamadas à API, último erro)"""
+    heartbeat = read_heartbeat()
+    return jsonify({
+        'success': True,
+        'online': is_alive(heartbeat),
+        'heartbeat': heartbeat
+    })
+
+@app.route('/api/bot/events', methods=['GET'])
+def get_bot_events():
+    """Endpoint com estatísticas do bot e seus eventos recentes por tipo"""
     try:
-        # Por enquanto retorna apenas o último saldo
-        # Futuramente pode retornar histórico completo
-        latest = db.get_latest_balance()
+        limit = int(request.args.get('limit', 50))
+        event_type = request.args.get('type')
+        if event_type and event_type not in EVENT_TYPES:
+            return jsonify({
+                'success': False,
+                'error': f'Tipo de evento inválido: {event_type}'
+            }), 400
         
+        stats, balance = get_bot_stats()
+        event_types = [event_type] if event_type else EVENT_TYPES
         return jsonify({
             'success': True,
-            'balance': latest if latest else {}
+            'stats': stats,
+            'balance': balance,
+            'events': {t: _event_reader.recent(t, limit) for t in event_types}
         })
     except Exception as e:
         return jsonify({
@@ -826,161 +1355,162 @@ def save_config():
             'message': f'Erro ao salvar configurações: {str(e)}'
         }), 500
 
-@app.route('/api/bet/<bet_id>/cashout', methods=['POST'])
-def cashout_bet(bet_id):
-    """Faz cashout de uma aposta específica (fecha a posição fazendo hedge)"""
-    try:
-        # Buscar informações da aposta
-        orders = BetfairAPI().list_current_orders()
-        if not orders:
-            return jsonify({
-                'success': False,
-                'message': 'Não foi possível buscar apostas ativas'
-            }), 500
-        
-        current_orders = orders.get('currentOrders', [])
-        bet_order = None
-        
-        for order in current_orders:
-            if str(order.get('betId')) == str(bet_id):
-                bet_order = order
-                break
-        
-        if not bet_order:
-            return jsonify({
-                'success': False,
-                'message': 'Aposta não encontrada ou já foi fechada'
-            }), 404
-        
-        market_id = bet_order.get('marketId')
-        selection_id = bet_order.get('selectionId')
-        side = bet_order.get('side')  # 'BACK' ou 'LAY'
-        size_matched = bet_order.get('sizeMatched', 0)
-        price_size = bet_order.get('priceSize', {})
-        original_price = price_size.get('price', 0)
-        original_stake = size_matched
-        
-        if size_matched == 0:
-            return jsonify({
-                'success': False,
-                'message': 'Aposta não foi executada ainda'
-            }), 400
-        
-        # Buscar odds atuais do mercado
-        api = BetfairAPI()
-        if not api.login():
-            return jsonify({
-                'success': False,
-                'message': 'Erro ao fazer login na Betfair'
-            }), 500
-        
-        market_book = api.list_market_book(
-            market_ids=[market_id],
-            price_projection={'priceData': ['EX_BEST_OFFERS']}
-        )
-        
-        if not market_book:
-            return jsonify({
-                'success': False,
-                'message': 'Não foi possível obter dados do mercado'
-            }), 500
-        
-        market = market_book[0]
-        runners = market.get('runners', [])
-        
-        # Encontrar o runner correto
-        target_runner = None
-        for runner in runners:
-            runner_id = runner.get('id') or runner.get('selectionId')
-            if str(runner_id) == str(selection_id):
-                target_runner = runner
-                break
-        
-        if not target_runner:
-            return jsonify({
+def run_cashout(job, bet_id):
+    """Job: faz cashout de uma aposta (fecha a posição fazendo hedge)"""
+    job.report('Fazendo login na Betfair')
+    api = get_api()
+    if api is None:
+        return {
+            'success': False,
+            'message': 'Erro ao fazer login na Betfair'
+        }, 500
+    
+    # Buscar informações da aposta
+    job.report('Buscando a aposta nas ordens abertas')
+    orders = api.list_current_orders()
+    if not orders:
+        return {
+            'success': False,
+            'message': 'Não foi possível buscar apostas ativas'
+        }, 500
+    
+    current_orders = orders.get('currentOrders', [])
+    bet_order = None
+    
+    for order in current_orders:
+        if str(order.get('betId')) == str(bet_id):
+            bet_order = order
+            break
+    
+    if not bet_order:
+        return {
+            'success': False,
+            'message': 'Aposta não encontrada ou já foi fechada'
+        }, 404
+    
+    market_id = bet_order.get('marketId')
+    selection_id = bet_order.get('selectionId')
+    side = bet_order.get('side')  # 'BACK' ou 'LAY'
+    size_matched = bet_order.get('sizeMatched', 0)
+    price_size = bet_order.get('priceSize', {})
+    original_price = price_size.get('price', 0)
+    original_stake = size_matched
+    
+    if size_matched == 0:
+        return {
+            'success': False,
+            'message': 'Aposta não foi executada ainda'
+        }, 400
+    
+    # Buscar odds atuais do mercado
+    job.report('Buscando odds atuais do mercado')
+    market_book = api.list_market_book(
+        market_ids=[market_id],
+        price_projection={'priceData': ['EX_BEST_OFFERS']}
+    )
+    
+    if not market_book:
+        return {
+            'success': False,
+            'message': 'Não foi possível obter dados do mercado'
+        }, 500
+    
+    market = market_book[0]
+    runners = market.get('runners', [])
+    
+    # Encontrar o runner correto
+    target_runner = None
+    for runner in runners:
+        runner_id = runner.get('id') or runner.get('selectionId')
+        if str(runner_id) == str(selection_id):
+            target_runner = runner
+            break
+    
+    if not target_runner:
+        return {
+            'success': False,
+            'message': 'Runner não encontrado no mercado'
+        }, 404
+    
+    # Determinar lado oposto e calcular stake do hedge
+    if side == 'BACK':
+        # Para fechar BACK, fazemos LAY
+        hedge_side = 'LAY'
+        available_to_lay = target_runner.get('ex', {}).get('availableToLay', [])
+        if not available_to_lay:
+            return {
                 'success': False,
-                'message': 'Runner não encontrado no mercado'
-            }), 404
-        
-        # Determinar lado oposto e calcular stake do hedge
-        if side == 'BACK':
-            # Para fechar BACK, fazemos LAY
-            hedge_side = 'LAY'
-            available_to_lay = target_runner.get('ex', {}).get('availableToLay', [])
-            if not available_to_lay:
-                return jsonify({
-                    'success': False,
-                    'message': 'Não há liquidez disponível para fazer LAY'
-                }), 400
-            hedge_price = available_to_lay[0].get('price', 0)
-            # Cálculo: hedge_stake = (back_stake * back_price) / lay_price
-            hedge_stake = (original_stake * original_price) / hedge_price
-        else:  # side == 'LAY'
-            # Para fechar LAY, fazemos BACK
-            hedge_side = 'BACK'
-            available_to_back = target_runner.get('ex', {}).get('availableToBack', [])
-            if not available_to_back:
-                return jsonify({
-                    'success': False,
-                    'message': 'Não há liquidez disponível para fazer BACK'
-                }), 400
-            hedge_price = available_to_back[0].get('price', 0)
-            # Cálculo: hedge_stake = lay_stake / back_price
-            hedge_stake = original_stake / hedge_price
-        
-        if hedge_price <= 1.0 or hedge_stake <= 0:
-            return jsonify({
+                'message': 'Não há liquidez disponível para fazer LAY'
+            }, 400
+        hedge_price = available_to_lay[0].get('price', 0)
+        # Cálculo: hedge_stake = (back_stake * back_price) / lay_price
+        hedge_stake = (original_stake * original_price) / hedge_price
+    else:  # side == 'LAY'
+        # Para fechar LAY, fazemos BACK
+        hedge_side = 'BACK'
+        available_to_back = target_runner.get('ex', {}).get('availableToBack', [])
+        if not available_to_back:
+            return {
                 'success': False,
-                'message': 'Preço ou stake inválido para hedge'
-            }), 400
-        
-        # Fazer a aposta de hedge
-        instruction = {
-            'instructionType': 'PLACE',
-            'selectionId': int(selection_id),
-            'handicap': 0.0,
-            'side': hedge_side,
-            'orderType': 'LIMIT',
-            'limitOrder': {
-                'size': round(hedge_stake, 2),
-                'price': round(hedge_price, 2),
-                'persistenceType': 'LAPSE'
-            }
+                'message': 'Não há liquidez disponível para fazer BACK'
+            }, 400
+        hedge_price = available_to_back[0].get('price', 0)
+        # Cálculo: hedge_stake = lay_stake / back_price
+        hedge_stake = original_stake / hedge_price
+    
+    if hedge_price <= 1.0 or hedge_stake <= 0:
+        return {
+            'success': False,
+            'message': 'Preço ou stake inválido para hedge'
+        }, 400
+    
+    # Fazer a aposta de hedge
+    instruction = {
+        'instructionType': 'PLACE',
+        'selectionId': int(selection_id),
+        'handicap': 0.0,
+        'side': hedge_side,
+        'orderType': 'LIMIT',
+        'limitOrder': {
+            'size': round(hedge_stake, 2),
+            'price': round(hedge_price, 2),
+            'persistenceType': 'LAPSE'
         }
-        
-        result = api.place_orders(
-            market_id=str(market_id),
-            instructions=[instruction],
-            customer_ref=f"cashout_{bet_id}_{int(datetime.now().timestamp())}"
-        )
-        
-        if result and 'instructionReports' in result:
-            report = result['instructionReports'][0]
-            if report.get('status') == 'SUCCESS':
-                hedge_bet_id = report.get('betId')
-                return jsonify({
-                    'success': True,
-                    'message': f'Cash Out realizado com sucesso! Bet ID: {hedge_bet_id}',
-                    'hedge_bet_id': hedge_bet_id
-                })
-            else:
-                error_code = report.get('errorCode', 'UNKNOWN')
-                error_message = report.get('errorMessage', 'Erro desconhecido')
-                return jsonify({
-                    'success': False,
-                    'message': f'Erro ao fazer cashout: {error_code} - {error_message}'
-                }), 400
+    }
+    
+    job.report(f'Enviando {hedge_side} de {round(hedge_stake, 2)} @ {round(hedge_price, 2)}')
+    result = api.place_orders(
+        market_id=str(market_id),
+        instructions=[instruction],
+        customer_ref=f"cashout_{bet_id}_{int(datetime.now().timestamp())}"
+    )
+    
+    if result and 'instructionReports' in result:
+        report = result['instructionReports'][0]
+        if report.get('status') == 'SUCCESS':
+            hedge_bet_id = report.get('betId')
+            return {
+                'success': True,
+                'message': f'Cash Out realizado com sucesso! Bet ID: {hedge_bet_id}',
+                'hedge_bet_id': hedge_bet_id
+            }, 200
         else:
-            return jsonify({
+            error_code = report.get('errorCode', 'UNKNOWN')
+            error_message = report.get('errorMessage', 'Erro desconhecido')
+            return {
                 'success': False,
-                'message': 'Resposta inesperada da API'
-            }), 500
-            
-    except Exception as e:
-        return jsonify({
+                'message': f'Erro ao fazer cashout: {error_code} - {error_message}'
+            }, 400
+    else:
+        return {
             'success': False,
-            'message': f'Erro ao fazer cashout: {str(e)}'
-        }), 500
+            'message': 'Resposta inesperada da API'
+        }, 500
+
+@app.route('/api/bet/<bet_id>/cashout', methods=['POST'])
+def cashout_bet(bet_id):
+    """Faz cashout de uma aposta específica (em segundo plano; retorna o id do job)"""
+    return submit_job('cashout', ('cashout', bet_id), run_cashout, bet_id)
 
 @app.route('/')
 def index():
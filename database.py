@@ -6,6 +6,8 @@ Gerencia apostas e resultados usando SQLite
 
 import sqlite3
 import json
+import queue
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
@@ -13,14 +15,426 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Valores canônicos de bets.status e bets.sport (nomes de BetStatus/SportType do bot)
+BET_STATUSES = ('PENDING', 'ACTIVE', 'CLOSED_PROFIT', 'CLOSED_LOSS', 'CLOSED_TIMEOUT')
+CLOSED_STATUSES = ('CLOSED_PROFIT', 'CLOSED_LOSS', 'CLOSED_TIMEOUT')
+SPORTS = ('SOCCER', 'ICE_HOCKEY', 'TENNIS')
+
+# Versão do esquema gravada em PRAGMA user_version (ver _run_migrations)
+SCHEMA_VERSION = 1
+
+_CLOSED_SQL = ", ".join(f"'{status}'" for status in CLOSED_STATUSES)
+
+# Contribuição de cada aposta para as colunas de daily_stats ({r} = prefixo da linha: NEW., OLD. ou vazio).
+# Usada pelos triggers (deltas incrementais) e pela reconstrução completa, que assim sempre concordam.
+DAILY_STATS_COLUMNS = (
+    ('total_bets', "1"),
+    ('profit_bets', "CASE WHEN {r}status = 'CLOSED_PROFIT' THEN 1 ELSE 0 END"),
+    ('loss_bets', "CASE WHEN {r}status = 'CLOSED_LOSS' THEN 1 ELSE 0 END"),
+    ('total_profit', f"CASE WHEN {{r}}status IN ({_CLOSED_SQL}) "
+                     "THEN COALESCE({r}profit_loss * {r}stake / 100, 0) ELSE 0 END"),
+    ('soccer_bets', "CASE WHEN {r}sport = 'SOCCER' THEN 1 ELSE 0 END"),
+    ('hockey_bets', "CASE WHEN {r}sport = 'ICE_HOCKEY' THEN 1 ELSE 0 END"),
+    ('tennis_bets', "CASE WHEN {r}sport = 'TENNIS' THEN 1 ELSE 0 END"),
+)
+
+# Tamanho máximo do log de alterações bet_events (eventos mais antigos são descartados)
+CHANGE_LOG_MAX_EVENTS = 10000
+
+# Colunas de bets cuja alteração gera um evento no log de alterações
+CHANGE_LOG_COLUMNS = ('status', 'current_price', 'profit_loss', 'close_reason', 'close_time',
+                      'game_score', 'market_status', 'runner_status', 'gross_profit', 'net_profit')
+
+# Colunas de bets que alteram daily_stats (o trigger de UPDATE só dispara para elas)
+DAILY_STATS_SOURCE_COLUMNS = ('entry_time', 'status', 'sport', 'stake', 'profit_loss')
+
+
+def normalize_status(status: Optional[str]) -> Optional[str]:
+    """Converte um status livre ('closed_profit', 'BetStatus.ACTIVE'...) para o valor canônico"""
+    if status is None:
+        return None
+    return str(status).split('.')[-1].strip().upper()
+
+
+def normalize_sport(sport: Optional[str]) -> Optional[str]:
+    """Converte um esporte livre ('Soccer', 'SportType.ICE_HOCKEY', 'Ice Hockey'...) para o valor canônico"""
+    if sport is None:
+        return None
+    sport = str(sport).split('.')[-1].strip().upper().replace(' ', '_')
+    if sport == 'HOCKEY':
+        return 'ICE_HOCKEY'
+    return sport
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão persistente do pool do BetDatabase
+    
+    close() devolve a conexão ao pool em vez de fechá-la. Uma transação não
+    confirmada é descartada (rollback), como aconteceria em um close real.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = None
+        self.busy_timeout = None
+        self.checked_out = False
+    
+    def close(self):
+        if not self.checked_out:
+            return
+        self.checked_out = False
+        
+        try:
+            if self.in_transaction:
+                self.rollback()
+        except sqlite3.Error:
+            self.discard()
+            return
+        
+        if self.release:
+            self.release(self)
+        else:
+            self.discard()
+    
+    def discard(self):
+        """Fecha a conexão de fato"""
+        super().close()
+
+
+class _FlushBarrier:
+    """Marcador na fila do escritor: sinaliza quando tudo antes dele foi gravado"""
+    
+    def __init__(self, durable: bool = False):
+        self.durable = durable
+        self.done = threading.Event()
+        self.success = True
+    
+    def wait(self, timeout: Optional[float] = None) -> Optional[bool]:
+        """Espera a barreira; retorna o resultado da gravação ou None se ainda não foi gravada"""
+        if not self.done.wait(timeout):
+            return None
+        return self.success
+
+
+class DatabaseWriter:
+    """
+    Escritor em segundo plano (write-behind) do BetDatabase
+    
+    Uma única thread consome uma fila limitada de escritas e grava cada lote
+    em uma transação (BEGIN IMMEDIATE ... COMMIT), com um SAVEPOINT por escrita
+    para que uma falha isolada (ex: aposta duplicada) não descarte o lote.
+    Locks do SQLite são tratados com retry nesta thread - quem enfileira
+    só espera quando a fila está cheia.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, db: 'BetDatabase', queue_size: int = 1000, flush_interval: float = 0.5,
+                 max_batch: int = 500, max_retries: int = 5):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stop_sent = False
+        # Gravação síncrona do pendente quando a thread do escritor não está rodando
+        self._sync_lock = threading.Lock()
+        # Alguma escrita falhou desde a última barreira (a próxima barreira reporta a falha)
+        self._failed_since_flush = False
+        
+        # Contadores
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+    
+    @property
+    def pending(self) -> int:
+        """Escritas (e barreiras) aguardando na fila"""
+        return self._queue.qsize()
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+    
+    @property
+    def running(self) -> bool:
+        """A thread do escritor está consumindo a fila"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def submit(self, name: str, func, *args) -> bool:
+        """
+        Enfileira uma escrita: func(cursor, *args) será executada na thread do escritor
+        
+        Com a fila cheia, bloqueia até o escritor abrir espaço (contrapressão:
+        as escritas são sempre gravadas na ordem em que foram enviadas). Se a
+        thread do escritor não estiver rodando, grava o que está na fila e esta
+        escrita de forma síncrona, também em ordem.
+        """
+        item = (name, func, args)
+        waited = False
+        while self.running:
+            try:
+                self._queue.put(item, timeout=1.0)
+                return True
+            except queue.Full:
+                if not waited:
+                    logger.warning(f"Fila do escritor cheia - '{name}' aguardando espaço")
+                    waited = True
+        
+        logger.warning(f"Escritor do banco parado - gravando '{name}' de forma síncrona")
+        return self._write_pending(item)
+    
+    def _write_pending(self, item=None) -> bool:
+        """Grava de forma síncrona o que ficou na fila e, por último, item (mantém a ordem)"""
+        with self._sync_lock:
+            batch = []
+            barriers = []
+            while True:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(pending, _FlushBarrier):
+                    barriers.append(pending)
+                elif pending is not self._STOP:
+                    batch.append(pending)
+            if item is not None:
+                batch.append(item)
+            
+            success = self._write_batch(batch, durable=any(b.durable for b in barriers)) if batch else True
+            if barriers:
+                success = success and not self._failed_since_flush
+                self._failed_since_flush = False
+            for barrier in barriers:
+                barrier.success = success
+                barrier.done.set()
+            return success
+    
+    def flush(self, timeout: Optional[float] = None, durable: bool = False) -> bool:
+        """
+        Barreira de flush: grava imediatamente o que está na fila e espera
+        
+        Args:
+            timeout: Tempo máximo de espera
+            durable: Usar synchronous=FULL (fsync) no commit do lote da barreira
+            
+        Returns:
+            bool: True se tudo foi gravado sem erro desde a barreira anterior
+        """
+        if not self.running:
+            # Escritor parado: gravar aqui o que ficou na fila
+            success = self._write_pending()
+            success = success and not self._failed_since_flush
+            self._failed_since_flush = False
+            return success
+        
+        barrier = _FlushBarrier(durable)
+        try:
+            self._queue.put(barrier, timeout=timeout)
+        except queue.Full:
+            return False
+        return bool(barrier.wait(timeout))
+    
+    def request_flush(self, durable: bool = False) -> Optional[_FlushBarrier]:
+        """
+        Antecipa o flush sem bloquear
+        
+        Returns:
+            A barreira enfileirada (barrier.wait() informa o resultado) ou None
+            com a fila cheia - nesse caso o escritor já está gravando lotes completos
+        """
+        barrier = _FlushBarrier(durable)
+        try:
+            self._queue.put_nowait(barrier)
+        except queue.Full:
+            return None
+        return barrier
+    
+    def stop(self, timeout: float = 10.0) -> bool:
+        """
+        Grava o que estiver pendente e encerra a thread (espera no máximo timeout segundos no total)
+        
+        Enquanto a thread não termina, novas escritas continuam indo para a fila
+        (nunca são gravadas em paralelo com ela). O que chegar depois do sinal
+        de parada fica na fila e é gravado pela próxima escrita ou flush().
+        
+        Returns:
+            bool: True se a thread terminou (False = ainda gravando; chamar de novo depois)
+        """
+        import time
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        if not self._stop_sent:
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+                self._stop_sent = True
+            except queue.Full:
+                pass
+        if self._stop_sent:
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            logger.warning(f"Escritor do banco não terminou em {timeout}s ({self.pending} escritas pendentes)")
+            return False
+        self._thread = None
+        self._stop_sent = False
+        return True
+    
+    def _run(self):
+        import time
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            
+            # Agrupar o que chegar até o fim do intervalo de flush (ou até uma barreira)
+            batch = []
+            barriers = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                if isinstance(item, _FlushBarrier):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+                if barriers or len(batch) >= self.max_batch:
+                    # Barreira: gravar já, levando junto o que já está na fila
+                    try:
+                        while len(batch) < self.max_batch:
+                            extra = self._queue.get_nowait()
+                            if extra is self._STOP:
+                                stopping = True
+                                break
+                            if isinstance(extra, _FlushBarrier):
+                                barriers.append(extra)
+                            else:
+                                batch.append(extra)
+                    except queue.Empty:
+                        pass
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            success = self._write_batch(batch, durable=any(b.durable for b in barriers)) if batch else True
+            if barriers:
+                success = success and not self._failed_since_flush
+                self._failed_since_flush = False
+            for barrier in barriers:
+                barrier.success = success
+                barrier.done.set()
+    
+    def _write_batch(self, batch: List, durable: bool) -> bool:
+        """Grava o lote em uma transação, com retry em caso de lock"""
+        import time
+        retry_delay = 0.1
+        
+        for attempt in range(self.max_retries):
+            conn = self.db._get_connection(timeout=5.0)
+            try:
+                if durable:
+                    conn.execute('PRAGMA synchronous=FULL')
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                failed = 0
+                for name, func, args in batch:
+                    cursor.execute('SAVEPOINT write_op')
+                    try:
+                        func(cursor, *args)
+                        cursor.execute('RELEASE write_op')
+                    except sqlite3.IntegrityError as e:
+                        cursor.execute('ROLLBACK TO write_op')
+                        cursor.execute('RELEASE write_op')
+                        failed += 1
+                        logger.warning(f"Escrita '{name}' ignorada (registro duplicado/inválido): {e}")
+                    except sqlite3.OperationalError:
+                        raise
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO write_op')
+                        cursor.execute('RELEASE write_op')
+                        failed += 1
+                        logger.error(f"Erro na escrita '{name}': {e}")
+                conn.commit()
+                
+                self.batches += 1
+                self.written += len(batch) - failed
+                self.failed += failed
+                if failed:
+                    self._failed_since_flush = True
+                logger.debug(f"Lote de {len(batch)} escrita(s) gravado no banco")
+                return True
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if 'locked' in str(e).lower() and attempt < self.max_retries - 1:
+                    wait_time = retry_delay * (2 ** attempt)
+                    logger.debug(f"Banco travado no escritor, tentando novamente em {wait_time:.2f}s...")
+                    time.sleep(wait_time)
+                    continue
+                self.failed += len(batch)
+                self._failed_since_flush = True
+                logger.error(f"Erro ao gravar lote de {len(batch)} escrita(s): {e}")
+                return False
+            finally:
+                if durable:
+                    try:
+                        conn.execute('PRAGMA synchronous=NORMAL')
+                    except sqlite3.Error:
+                        pass
+                conn.close()
+        
+        return False
+
 
 class BetDatabase:
     """Gerencia o banco de dados de apostas"""
     
-    def __init__(self, db_path: str = 'data/bets.db'):
-        """Inicializa conexão com o banco de dados"""
+    # Pragmas aplicados uma única vez, na abertura de cada conexão
+    CONNECTION_PRAGMAS = (
+        ('journal_mode', 'WAL'),       # Leituras concorrentes durante escritas
+        ('synchronous', 'NORMAL'),     # Seguro com WAL; fsync apenas nos checkpoints
+        ('cache_size', -16000),        # 16 MB de cache de páginas (valor negativo = KiB)
+        ('mmap_size', 134217728),      # 128 MB de leitura via memória mapeada
+        ('temp_store', 'MEMORY'),      # Tabelas temporárias (ORDER BY, GROUP BY) em memória
+    )
+    
+    # Statements preparados mantidos em cache por conexão
+    STATEMENT_CACHE_SIZE = 256
+    
+    def __init__(self, db_path: str = 'data/bets.db', pool_size: int = 4):
+        """Inicializa conexão com o banco de dados
+        
+        Args:
+            db_path: Caminho do arquivo SQLite
+            pool_size: Máximo de conexões ociosas mantidas abertas para reutilização
+        """
         self.db_path = db_path
         
+        # Pool de conexões persistentes (LIFO: reutiliza a conexão mais recente)
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._pool_lock = threading.Lock()
+        self.connections_opened = 0
+        
+        # Escritor em segundo plano (write-behind) - desativado até start_writer()
+        self._writer = None
+        
+        # Apostas enfileiradas ainda não confirmadas: bet_id -> [bet_data, barreira, tentativas]
+        self._pending_inserts: Dict[str, list] = {}
+        self._pending_inserts_lock = threading.Lock()
+        
+        # Conexão dedicada ao contador de alterações (PRAGMA data_version)
+        self._version_conn = None
+        self._version_lock = threading.Lock()
+        
         # Criar diretório se não existir
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         
@@ -28,19 +442,199 @@ class BetDatabase:
         self._create_tables()
         logger.info(f"Banco de dados inicializado: {db_path}")
     
-    def _get_connection(self, timeout: float = 10.0):
-        """Obtém uma conexão com o banco de dados com timeout e WAL mode"""
-        conn = sqlite3.connect(self.db_path, timeout=timeout)
+    def _open_connection(self, timeout: float) -> PooledConnection:
+        """Abre uma nova conexão e aplica os pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=timeout,
+            factory=PooledConnection,
+            cached_statements=self.STATEMENT_CACHE_SIZE,
+            # A conexão pode voltar ao pool e ser usada por outra thread (nunca por duas ao mesmo tempo)
+            check_same_thread=False
+        )
         conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
+        conn.busy_timeout = timeout
+        conn.release = self._release_connection
+        
+        for name, value in self.CONNECTION_PRAGMAS:
+            try:
+                conn.execute(f'PRAGMA {name}={value}')
+            except Exception as e:
+                logger.debug(f"Não foi possível aplicar PRAGMA {name}={value}: {e}")
         
-        # Habilitar WAL mode para permitir leituras concorrentes
+        with self._pool_lock:
+            self.connections_opened += 1
+        return conn
+    
+    def _get_connection(self, timeout: float = 10.0):
+        """Obtém uma conexão persistente do pool (ou abre uma nova)
+        
+        Chamar conn.close() devolve a conexão ao pool.
+        """
         try:
-            conn.execute('PRAGMA journal_mode=WAL')
-        except Exception as e:
-            logger.debug(f"Não foi possível habilitar WAL mode: {e}")
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_connection(timeout)
         
+        # Ajustar o timeout de lock apenas quando muda
+        if conn.busy_timeout != timeout:
+            conn.execute(f'PRAGMA busy_timeout={int(timeout * 1000)}')
+            conn.busy_timeout = timeout
+        
+        conn.checked_out = True
         return conn
     
+    def _release_connection(self, conn: PooledConnection):
+        """Devolve a conexão ao pool (fecha se o pool estiver cheio)"""
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.discard()
+    
+    def get_data_version(self) -> Optional[int]:
+        """
+        Contador de alterações do banco
+        
+        PRAGMA data_version muda sempre que outra conexão (de qualquer processo,
+        inclusive do pool deste objeto) confirma uma escrita. Só é comparável
+        entre leituras da mesma conexão, por isso usa uma conexão dedicada que
+        nunca escreve. Retorna None se não for possível ler.
+        """
+        with self._version_lock:
+            try:
+                if self._version_conn is None:
+                    self._version_conn = self._open_connection(timeout=5.0)
+                return self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+            except Exception as e:
+                logger.error(f"Erro ao ler versão do banco: {e}")
+                if self._version_conn is not None:
+                    self._version_conn.discard()
+                    self._version_conn = None
+                return None
+    
+    def start_writer(self, queue_size: int = 1000, flush_interval: float = 0.5, max_batch: int = 500):
+        """
+        Ativa o escritor em segundo plano (write-behind)
+        
+        A partir daqui insert_bet, update_bet, close_bet, save_balance,
+        rebuild_daily_stats e rebuild_bet_stats apenas enfileiram a escrita e retornam True; uma
+        thread grava a fila em uma transação por flush. Leituras podem não
+        ver escritas ainda pendentes - use flush() quando precisar delas.
+        
+        Args:
+            queue_size: Máximo de escritas pendentes (fila limitada)
+            flush_interval: Tempo máximo (s) que uma escrita espera na fila
+            max_batch: Máximo de escritas por transação
+        """
+        if self._writer is None:
+            self._writer = DatabaseWriter(self, queue_size, flush_interval, max_batch)
+            self._writer.start()
+            logger.info(f"Escritor em segundo plano do banco ativado (fila {queue_size}, flush {flush_interval}s)")
+        return self._writer
+    
+    def flush(self, timeout: Optional[float] = None, durable: bool = False) -> bool:
+        """
+        Barreira: espera as escritas enfileiradas até agora serem gravadas
+        
+        Args:
+            timeout: Tempo máximo de espera (None = sem limite)
+            durable: Gravar com fsync (synchronous=FULL) na transação da barreira
+            
+        Returns:
+            bool: True se tudo foi gravado sem erro desde a barreira anterior
+                (sempre True sem escritor em segundo plano)
+        """
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout=timeout, durable=durable)
+    
+    def confirm_inserts(self, timeout: float = 5.0, max_attempts: int = 3) -> List[str]:
+        """
+        Confirma as apostas enfileiradas por insert_bet (com o escritor em segundo plano)
+        
+        Espera a barreira de cada aposta pendente. Se a barreira reportar falha,
+        confere no banco se a aposta foi gravada e reenfileira as que faltam.
+        Apostas cuja barreira ainda não foi gravada continuam pendentes para a
+        próxima chamada. Deve ser chamado fora do caminho crítico (fim do ciclo).
+        
+        Args:
+            timeout: Tempo máximo de espera pelas barreiras
+            max_attempts: Tentativas de gravação antes de desistir de uma aposta
+            
+        Returns:
+            list: bet_ids que não foram gravados após max_attempts (removidos das pendentes)
+        """
+        import time
+        with self._pending_inserts_lock:
+            pending = list(self._pending_inserts.items())
+        if not pending:
+            return []
+        
+        deadline = time.monotonic() + timeout
+        unconfirmed = []
+        for bet_id, (bet_data, barrier, attempts) in pending:
+            if barrier is None:
+                # Fila cheia quando a aposta entrou: pedir uma barreira agora
+                barrier = self._writer.request_flush(durable=True) if self._writer is not None else None
+                with self._pending_inserts_lock:
+                    if bet_id in self._pending_inserts:
+                        self._pending_inserts[bet_id][1] = barrier
+                if barrier is None:
+                    continue
+            result = barrier.wait(max(0.0, deadline - time.monotonic()))
+            if result is None:
+                continue
+            if result is False:
+                unconfirmed.append((bet_id, bet_data, attempts))
+            else:
+                with self._pending_inserts_lock:
+                    self._pending_inserts.pop(bet_id, None)
+        
+        if not unconfirmed:
+            return []
+        
+        # A barreira reporta qualquer falha desde a anterior: conferir aposta a aposta
+        stored = {bet['bet_id'] for bet in self.get_bets([bet_id for bet_id, _, _ in unconfirmed])}
+        lost = []
+        for bet_id, bet_data, attempts in unconfirmed:
+            with self._pending_inserts_lock:
+                self._pending_inserts.pop(bet_id, None)
+            if bet_id in stored:
+                continue
+            if attempts >= max_attempts:
+                logger.error(f"Aposta {bet_id} não foi gravada no banco após {attempts} tentativa(s)")
+                lost.append(bet_id)
+                continue
+            logger.warning(f"Aposta {bet_id} não foi gravada pelo escritor - reenfileirando (tentativa {attempts + 1})")
+            self._queue_insert(bet_data, attempts + 1)
+        return lost
+    
+    def close(self, timeout: float = 10.0):
+        """Para o escritor em segundo plano (gravando o pendente) e fecha as conexões ociosas do pool
+        e a conexão de get_data_version()
+        
+        Se o escritor não terminar em timeout segundos, ele e as conexões são
+        mantidos (close() pode ser chamado de novo depois).
+        """
+        if self._writer is not None:
+            if not self._writer.stop(timeout):
+                logger.warning("Banco não fechado: escritor em segundo plano ainda gravando")
+                return
+            # Escritas enfileiradas depois do sinal de parada
+            self._writer.flush()
+            self._writer = None
+        
+        while True:
+            try:
+                self._pool.get_nowait().discard()
+            except queue.Empty:
+                break
+        
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.discard()
+                self._version_conn = None
+    
     def _create_tables(self):
         """Cria as tabelas do banco de dados"""
         conn = self._get_connection(timeout=30.0)  # Timeout maior para criação de tabelas
@@ -90,6 +684,38 @@ class BetDatabase:
             )
         """)
         
+        # Contadores materializados por esporte e status (base de get_statistics)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bet_stats (
+                sport TEXT NOT NULL,
+                status TEXT NOT NULL,
+                bet_count INTEGER DEFAULT 0,
+                total_stake REAL DEFAULT 0.0,
+                total_profit REAL DEFAULT 0.0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (sport, status)
+            )
+        """)
+        
+        # Log de alterações (apostas abertas/atualizadas/fechadas, saldo) lido pelo feed ao vivo
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bet_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_type TEXT NOT NULL,
+                bet_id TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Estado de sincronizações incrementais (ex.: marca d'água de listClearedOrders)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
         # Tabela de saldo da conta (histórico)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS balance_history (
@@ -101,10 +727,23 @@ class BetDatabase:
             )
         """)
         
+        # Adicionar novos campos se não existirem (migração)
+        self._add_new_columns_if_needed(cursor)
+        
+        # Migrações de dados versionadas (antes dos triggers de estatísticas)
+        self._run_migrations(cursor)
+        
         # Índices para melhorar performance
+        # (status, entry_time): apostas ativas recentes e histórico por status, já ordenados
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_bets_status 
-            ON bets(status)
+            CREATE INDEX IF NOT EXISTS idx_bets_status_entry_time 
+            ON bets(status, entry_time)
+        """)
+        
+        # (market_id, status): aposta ativa / liquidação por mercado
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_bets_market_status 
+            ON bets(market_id, status)
         """)
         
         cursor.execute("""
@@ -117,13 +756,21 @@ class BetDatabase:
             ON bets(entry_time)
         """)
         
+        # entry_date: consultas por dia/intervalo de datas
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_bets_entry_date 
+            ON bets(entry_date, entry_time)
+        """)
+        
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_daily_stats_date 
             ON daily_stats(date)
         """)
         
-        # Adicionar novos campos se não existirem (migração)
-        self._add_new_columns_if_needed(cursor)
+        # Manutenção incremental de daily_stats e bet_stats
+        self._create_daily_stats_triggers(cursor)
+        self._create_bet_stats_triggers(cursor)
+        self._create_change_log_triggers(cursor)
         
         conn.commit()
         conn.close()
@@ -132,8 +779,8 @@ class BetDatabase:
     def _add_new_columns_if_needed(self, cursor):
         """Adiciona novos campos à tabela bets se não existirem"""
         try:
-            # Verificar quais colunas já existem
-            cursor.execute("PRAGMA table_info(bets)")
+            # Verificar quais colunas já existem (table_xinfo inclui colunas geradas)
+            cursor.execute("PRAGMA table_xinfo(bets)")
             existing_columns = [row[1] for row in cursor.fetchall()]
             
             # Campos a adicionar
@@ -143,7 +790,9 @@ class BetDatabase:
                 'runner_status': 'TEXT',
                 'gross_profit': 'REAL',
                 'net_profit': 'REAL',
-                'settled_date': 'TIMESTAMP'
+                'settled_date': 'TIMESTAMP',
+                # Dia da entrada, indexável (substitui DATE(entry_time) nas consultas)
+                'entry_date': 'TEXT GENERATED ALWAYS AS (DATE(entry_time)) VIRTUAL'
             }
             
             for column_name, column_type in new_columns.items():
@@ -156,8 +805,261 @@ class BetDatabase:
         except Exception as e:
             logger.error(f"Erro ao verificar/adicionar colunas: {e}")
     
+    def _run_migrations(self, cursor):
+        """Aplica as migrações de dados pendentes, controladas por PRAGMA user_version"""
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        
+        try:
+            if version < 1:
+                self._migrate_normalize_enums(cursor)
+            
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            logger.info(f"Esquema do banco migrado da versão {version} para {SCHEMA_VERSION}")
+        except Exception as e:
+            logger.error(f"Erro ao migrar esquema do banco (versão {version}): {e}")
+    
+    def _migrate_normalize_enums(self, cursor):
+        """Migração 1: status e sport para os valores canônicos, índice de status substituído"""
+        # Os triggers de estatísticas comparam valores canônicos: serão recriados
+        # (com reconstrução das tabelas) logo após a migração
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_bets_%'")
+        for (trigger_name,) in cursor.fetchall():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        
+        for column, normalize in (('status', normalize_status), ('sport', normalize_sport)):
+            cursor.execute(f"SELECT DISTINCT {column} FROM bets")
+            for (value,) in cursor.fetchall():
+                canonical = normalize(value)
+                if canonical != value:
+                    cursor.execute(f"UPDATE bets SET {column} = ? WHERE {column} = ?", (canonical, value))
+                    logger.info(f"bets.{column}: '{value}' normalizado para '{canonical}' ({cursor.rowcount} apostas)")
+        
+        # Coberto por idx_bets_status_entry_time
+        cursor.execute("DROP INDEX IF EXISTS idx_bets_status")
+    
+    def _daily_stats_delta_sql(self, row: str, sign: str) -> str:
+        """Instruções do trigger que somam (+) ou subtraem (-) a contribuição de NEW/OLD no dia da aposta"""
+        prefix = f"{row}."
+        assignments = ",\n                ".join(
+            f"{column} = {column} {sign} ({expression.format(r=prefix)})"
+            for column, expression in DAILY_STATS_COLUMNS
+        )
+        statements = []
+        if sign == '+':
+            # OR IGNORE também descarta data inválida (DATE() nulo)
+            statements.append(f"INSERT OR IGNORE INTO daily_stats (date) VALUES (DATE({row}.entry_time));")
+        statements.append(f"""UPDATE daily_stats SET
+                {assignments},
+                updated_at = CURRENT_TIMESTAMP
+            WHERE date = DATE({row}.entry_time);""")
+        return "\n            ".join(statements)
+    
+    def _create_daily_stats_triggers(self, cursor):
+        """
+        Cria os triggers que mantêm daily_stats por deltas, na mesma transação da escrita em bets
+        
+        Na primeira criação, reconstrói daily_stats a partir de bets (base para os deltas).
+        """
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) FROM sqlite_master
+                WHERE type = 'trigger' AND name LIKE 'trg_bets_daily_stats_%'
+            """)
+            if cursor.fetchone()[0] == 3:
+                return
+            
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_daily_stats_insert
+                AFTER INSERT ON bets
+                BEGIN
+                    {self._daily_stats_delta_sql('NEW', '+')}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_daily_stats_update
+                AFTER UPDATE OF {', '.join(DAILY_STATS_SOURCE_COLUMNS)} ON bets
+                BEGIN
+                    {self._daily_stats_delta_sql('OLD', '-')}
+                    {self._daily_stats_delta_sql('NEW', '+')}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_daily_stats_delete
+                AFTER DELETE ON bets
+                BEGIN
+                    {self._daily_stats_delta_sql('OLD', '-')}
+                END
+            """)
+            
+            self._rebuild_daily_stats_sql(cursor)
+            logger.info("Triggers de estatísticas diárias criados e daily_stats reconstruída")
+        except Exception as e:
+            logger.error(f"Erro ao criar triggers de estatísticas diárias: {e}")
+    
+    def _bet_stats_delta_sql(self, row: str, sign: str) -> str:
+        """Instruções do trigger que somam (+) ou subtraem (-) NEW/OLD no contador (esporte, status)"""
+        key = f"sport = COALESCE({row}.sport, '') AND status = COALESCE({row}.status, '')"
+        statements = []
+        if sign == '+':
+            statements.append(f"""INSERT OR IGNORE INTO bet_stats (sport, status)
+                VALUES (COALESCE({row}.sport, ''), COALESCE({row}.status, ''));""")
+        statements.append(f"""UPDATE bet_stats SET
+                bet_count = bet_count {sign} 1,
+                total_stake = total_stake {sign} COALESCE({row}.stake, 0),
+                total_profit = total_profit {sign} COALESCE({row}.profit_loss * {row}.stake / 100, 0),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE {key};""")
+        if sign == '-':
+            statements.append(f"DELETE FROM bet_stats WHERE {key} AND bet_count <= 0;")
+        return "\n            ".join(statements)
+    
+    def _create_bet_stats_triggers(self, cursor):
+        """
+        Cria os triggers que mantêm bet_stats por deltas, na mesma transação da escrita em bets
+        
+        Na primeira criação, reconstrói bet_stats a partir de bets (base para os deltas).
+        """
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) FROM sqlite_master
+                WHERE type = 'trigger' AND name LIKE 'trg_bets_bet_stats_%'
+            """)
+            if cursor.fetchone()[0] == 3:
+                return
+            
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_bet_stats_insert
+                AFTER INSERT ON bets
+                BEGIN
+                    {self._bet_stats_delta_sql('NEW', '+')}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_bet_stats_update
+                AFTER UPDATE OF sport, status, stake, profit_loss ON bets
+                BEGIN
+                    {self._bet_stats_delta_sql('OLD', '-')}
+                    {self._bet_stats_delta_sql('NEW', '+')}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_bet_stats_delete
+                AFTER DELETE ON bets
+                BEGIN
+                    {self._bet_stats_delta_sql('OLD', '-')}
+                END
+            """)
+            
+            self._rebuild_bet_stats_sql(cursor)
+            logger.info("Triggers de estatísticas gerais criados e bet_stats reconstruída")
+        except Exception as e:
+            logger.error(f"Erro ao criar triggers de estatísticas gerais: {e}")
+    
+    def _create_change_log_triggers(self, cursor):
+        """Cria os triggers que registram em bet_events cada alteração de apostas e de saldo"""
+        changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in CHANGE_LOG_COLUMNS)
+        # Mantém apenas os últimos CHANGE_LOG_MAX_EVENTS eventos (remoção por faixa da chave primária)
+        prune = f"DELETE FROM bet_events WHERE id <= last_insert_rowid() - {CHANGE_LOG_MAX_EVENTS};"
+        
+        try:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_events_insert
+                AFTER INSERT ON bets
+                BEGIN
+                    INSERT INTO bet_events (event_type, bet_id) VALUES ('bet_opened', NEW.bet_id);
+                    {prune}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_events_update
+                AFTER UPDATE OF {', '.join(CHANGE_LOG_COLUMNS)} ON bets
+                WHEN {changed}
+                BEGIN
+                    INSERT INTO bet_events (event_type, bet_id) VALUES (
+                        CASE WHEN OLD.status IS NOT NEW.status AND NEW.status != 'ACTIVE'
+                             THEN 'bet_closed' ELSE 'bet_updated' END,
+                        NEW.bet_id
+                    );
+                    {prune}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_bets_events_delete
+                AFTER DELETE ON bets
+                BEGIN
+                    INSERT INTO bet_events (event_type, bet_id) VALUES ('bet_removed', OLD.bet_id);
+                    {prune}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_balance_events_insert
+                AFTER INSERT ON balance_history
+                BEGIN
+                    INSERT INTO bet_events (event_type) VALUES ('balance');
+                    {prune}
+                END
+            """)
+        except Exception as e:
+            logger.error(f"Erro ao criar triggers do log de alterações: {e}")
+    
+    def _insert_bet_sql(self, cursor, bet_data: Dict):
+        """INSERT da aposta (sem commit - usado pelo caminho síncrono e pelo escritor em segundo plano)"""
+        cursor.execute("""
+            INSERT INTO bets (
+                bet_id, market_id, event_id, event_name, sport, strategy,
+                side, selection_id, entry_price, entry_time, stake, liability,
+                take_profit_pct, stop_loss_pct, status, current_price,
+                profit_loss, close_reason, close_time
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            bet_data['bet_id'],
+            bet_data['market_id'],
+            bet_data.get('event_id'),
+            bet_data.get('event_name'),
+            normalize_sport(bet_data['sport']),
+            bet_data['strategy'],
+            bet_data['side'],
+            bet_data['selection_id'],
+            bet_data['entry_price'],
+            bet_data['entry_time'],
+            bet_data['stake'],
+            bet_data.get('liability', 0),
+            bet_data['take_profit_pct'],
+            bet_data['stop_loss_pct'],
+            normalize_status(bet_data['status']),
+            bet_data.get('current_price'),
+            bet_data.get('profit_loss'),
+            bet_data.get('close_reason'),
+            bet_data.get('close_time')
+        ))
+    
+    def _queue_insert(self, bet_data: Dict, attempts: int = 1) -> bool:
+        """Enfileira a aposta no escritor e registra a barreira para confirm_inserts()"""
+        running = self._writer.running
+        queued = self._writer.submit('insert_bet', self._insert_bet_sql, bet_data)
+        if not running:
+            # Gravada de forma síncrona por submit: o resultado já é definitivo
+            return queued
+        
+        # Aposta nova é registro crítico: pedir gravação imediata com fsync (sem esperar)
+        barrier = self._writer.request_flush(durable=True)
+        with self._pending_inserts_lock:
+            self._pending_inserts[bet_data['bet_id']] = [bet_data, barrier, attempts]
+        return queued
+    
     def insert_bet(self, bet_data: Dict) -> bool:
-        """Insere uma nova aposta no banco de dados com retry em caso de lock"""
+        """Insere uma nova aposta no banco de dados com retry em caso de lock
+        
+        Com o escritor em segundo plano ativo, a aposta é enfileirada e gravada
+        de forma durável na próxima transação do escritor, sem bloquear quem chamou;
+        confirm_inserts() confirma a gravação (e reenfileira se falhar).
+        """
+        if self._writer is not None:
+            return self._queue_insert(bet_data)
+        
         import time
         max_retries = 5
         retry_delay = 0.1  # 100ms
@@ -167,34 +1069,7 @@ class BetDatabase:
                 conn = self._get_connection(timeout=5.0)
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    INSERT INTO bets (
-                        bet_id, market_id, event_id, event_name, sport, strategy,
-                        side, selection_id, entry_price, entry_time, stake, liability,
-                        take_profit_pct, stop_loss_pct, status, current_price,
-                        profit_loss, close_reason, close_time
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    bet_data['bet_id'],
-                    bet_data['market_id'],
-                    bet_data.get('event_id'),
-                    bet_data.get('event_name'),
-                    bet_data['sport'],
-                    bet_data['strategy'],
-                    bet_data['side'],
-                    bet_data['selection_id'],
-                    bet_data['entry_price'],
-                    bet_data['entry_time'],
-                    bet_data['stake'],
-                    bet_data.get('liability', 0),
-                    bet_data['take_profit_pct'],
-                    bet_data['stop_loss_pct'],
-                    bet_data['status'],
-                    bet_data.get('current_price'),
-                    bet_data.get('profit_loss'),
-                    bet_data.get('close_reason'),
-                    bet_data.get('close_time')
-                ))
+                self._insert_bet_sql(cursor, bet_data)
                 
                 conn.commit()
                 conn.close()
@@ -224,8 +1099,35 @@ class BetDatabase:
         
         return False
     
+    def _update_bet_sql(self, cursor, bet_id: str, update_data: Dict) -> int:
+        """UPDATE da aposta (sem commit); retorna o número de linhas afetadas"""
+        # Construir query dinamicamente baseado nos campos a atualizar
+        fields = []
+        values = []
+        for key, value in update_data.items():
+            if key == 'status':
+                value = normalize_status(value)
+            elif key == 'sport':
+                value = normalize_sport(value)
+            fields.append(f"{key} = ?")
+            values.append(value)
+        
+        # Adicionar timestamp de atualização
+        fields.append("updated_at = CURRENT_TIMESTAMP")
+        values.append(bet_id)
+        
+        query = f"UPDATE bets SET {', '.join(fields)} WHERE bet_id = ?"
+        cursor.execute(query, values)
+        return cursor.rowcount
+    
     def update_bet(self, bet_id: str, update_data: Dict) -> bool:
-        """Atualiza uma aposta existente com retry em caso de lock"""
+        """Atualiza uma aposta existente com retry em caso de lock
+        
+        Com o escritor em segundo plano ativo, a atualização é apenas enfileirada.
+        """
+        if self._writer is not None:
+            return self._writer.submit('update_bet', self._update_bet_sql, bet_id, update_data)
+        
         import time
         max_retries = 5
         retry_delay = 0.1  # 100ms
@@ -235,22 +1137,9 @@ class BetDatabase:
                 conn = self._get_connection(timeout=5.0)
                 cursor = conn.cursor()
                 
-                # Construir query dinamicamente baseado nos campos a atualizar
-                fields = []
-                values = []
-                for key, value in update_data.items():
-                    fields.append(f"{key} = ?")
-                    values.append(value)
-                
-                # Adicionar timestamp de atualização
-                fields.append("updated_at = CURRENT_TIMESTAMP")
-                values.append(bet_id)
-                
-                query = f"UPDATE bets SET {', '.join(fields)} WHERE bet_id = ?"
-                cursor.execute(query, values)
+                rows_affected = self._update_bet_sql(cursor, bet_id, update_data)
                 
                 conn.commit()
-                rows_affected = cursor.rowcount
                 conn.close()
                 
                 if rows_affected > 0:
@@ -279,6 +1168,65 @@ class BetDatabase:
         
         return False
     
+    def _update_bets_sql(self, cursor, updates: Dict[str, Dict]) -> int:
+        """UPDATE de várias apostas (sem commit); retorna o número de linhas afetadas"""
+        rows_affected = 0
+        for bet_id, update_data in updates.items():
+            if update_data:
+                rows_affected += self._update_bet_sql(cursor, bet_id, update_data)
+        return rows_affected
+    
+    def update_bets(self, updates: Dict[str, Dict]) -> int:
+        """
+        Atualiza várias apostas em uma única transação
+        
+        Args:
+            updates: bet_id -> campos a atualizar
+            
+        Returns:
+            int: Apostas atualizadas (com o escritor em segundo plano, as enfileiradas)
+        """
+        updates = {bet_id: data for bet_id, data in updates.items() if data}
+        if not updates:
+            return 0
+        
+        if self._writer is not None:
+            return len(updates) if self._writer.submit('update_bets', self._update_bets_sql, updates) else 0
+        
+        import time
+        max_retries = 5
+        retry_delay = 0.1  # 100ms
+        
+        for attempt in range(max_retries):
+            try:
+                conn = self._get_connection(timeout=5.0)
+                cursor = conn.cursor()
+                
+                rows_affected = self._update_bets_sql(cursor, updates)
+                
+                conn.commit()
+                conn.close()
+                
+                logger.debug(f"{rows_affected} apostas atualizadas no banco")
+                return rows_affected
+            except sqlite3.OperationalError as e:
+                if 'conn' in locals():
+                    conn.close()
+                if 'locked' in str(e).lower() and attempt < max_retries - 1:
+                    wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
+                    logger.debug(f"Banco travado ao atualizar apostas, tentando novamente em {wait_time:.2f}s...")
+                    time.sleep(wait_time)
+                    continue
+                logger.error(f"Erro ao atualizar apostas no banco: {e}")
+                return 0
+            except Exception as e:
+                if 'conn' in locals():
+                    conn.close()
+                logger.error(f"Erro ao atualizar apostas no banco: {e}")
+                return 0
+        
+        return 0
+    
     def get_bet(self, bet_id: str) -> Optional[Dict]:
         """Obtém uma aposta específica"""
         try:
@@ -296,6 +1244,65 @@ class BetDatabase:
             logger.error(f"Erro ao buscar aposta no banco: {e}")
             return None
     
+    def get_bets(self, bet_ids: List[str]) -> List[Dict]:
+        """Obtém várias apostas pelo ID em uma única consulta"""
+        if not bet_ids:
+            return []
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            placeholders = ', '.join('?' for _ in bet_ids)
+            cursor.execute(f"SELECT * FROM bets WHERE bet_id IN ({placeholders})", list(bet_ids))
+            rows = cursor.fetchall()
+            conn.close()
+            
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Erro ao buscar apostas no banco: {e}")
+            return []
+    
+    def get_bet_events(self, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """
+        Lê o log de alterações a partir de um ID
+        
+        Args:
+            after_id: Retornar apenas eventos com id maior que este
+            limit: Máximo de eventos retornados
+        """
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT id, event_type, bet_id, created_at FROM bet_events
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (after_id, limit))
+            rows = cursor.fetchall()
+            conn.close()
+            
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Erro ao buscar log de alterações: {e}")
+            return []
+    
+    def get_last_bet_event_id(self) -> int:
+        """ID do evento mais recente do log de alterações (0 se vazio)"""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM bet_events")
+            last_id = cursor.fetchone()[0]
+            conn.close()
+            
+            return last_id
+        except Exception as e:
+            logger.error(f"Erro ao buscar log de alterações: {e}")
+            return 0
+    
     def get_active_bets(self) -> List[Dict]:
         """Obtém todas as apostas ativas das últimas 24 horas com retry em caso de lock"""
         import time
@@ -356,7 +1363,7 @@ class BetDatabase:
                 SELECT * FROM bets 
                 WHERE status = ? 
                 ORDER BY entry_time DESC
-            """, (status,))
+            """, (normalize_status(status),))
             
             rows = cursor.fetchall()
             conn.close()
@@ -366,17 +1373,36 @@ class BetDatabase:
             logger.error(f"Erro ao buscar apostas por status: {e}")
             return []
     
-    def get_bets_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
-        """Obtém apostas em um intervalo de datas"""
+    def get_bets_by_date_range(self, start_date: str, end_date: str,
+                               statuses: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Obtém apostas em um intervalo de datas
+        
+        Args:
+            start_date: Data inicial (YYYY-MM-DD)
+            end_date: Data final (YYYY-MM-DD), inclusiva
+            statuses: Restringir a estes status (None = todos)
+        """
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT * FROM bets 
-                WHERE DATE(entry_time) BETWEEN ? AND ?
-                ORDER BY entry_time DESC
-            """, (start_date, end_date))
+            if statuses:
+                # Usa idx_bets_status_entry_time: um intervalo de entry_time por status
+                statuses = [normalize_status(status) for status in statuses]
+                placeholders = ', '.join('?' for _ in statuses)
+                cursor.execute(f"""
+                    SELECT * FROM bets 
+                    WHERE status IN ({placeholders})
+                    AND entry_time >= ? AND entry_time < DATE(?, '+1 day')
+                    ORDER BY entry_time DESC
+                """, (*statuses, start_date, end_date))
+            else:
+                cursor.execute("""
+                    SELECT * FROM bets 
+                    WHERE entry_date BETWEEN ? AND ?
+                    ORDER BY entry_time DESC
+                """, (start_date, end_date))
             
             rows = cursor.fetchall()
             conn.close()
@@ -386,76 +1412,68 @@ class BetDatabase:
             logger.error(f"Erro ao buscar apostas por data: {e}")
             return []
     
+    def get_unsettled_bets(self, start_date: str) -> List[Dict]:
+        """
+        Obtém as apostas ainda sem liquidação (settled_date vazio) desde uma data
+        
+        Args:
+            start_date: Data inicial (YYYY-MM-DD)
+        """
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT * FROM bets
+                WHERE entry_date >= ? AND settled_date IS NULL
+                ORDER BY market_id
+            """, (start_date,))
+            rows = cursor.fetchall()
+            conn.close()
+            
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Erro ao buscar apostas não liquidadas: {e}")
+            return []
+    
     def get_today_bets(self) -> List[Dict]:
         """Obtém apostas de hoje"""
         today = datetime.now().strftime('%Y-%m-%d')
         return self.get_bets_by_date_range(today, today)
     
     def get_statistics(self) -> Dict:
-        """Obtém estatísticas gerais"""
+        """Obtém estatísticas gerais (lidas dos contadores materializados em bet_stats)"""
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Total de apostas
-            cursor.execute("SELECT COUNT(*) as total FROM bets")
-            total_bets = cursor.fetchone()['total']
-            
-            # Apostas ativas
-            cursor.execute("SELECT COUNT(*) as active FROM bets WHERE status = 'ACTIVE'")
-            active_bets = cursor.fetchone()['active']
-            
-            # Apostas com lucro
-            cursor.execute("""
-                SELECT COUNT(*) as profit FROM bets 
-                WHERE status IN ('CLOSED_PROFIT', 'closed_profit')
-            """)
-            profit_bets = cursor.fetchone()['profit']
-            
-            # Apostas com perda
-            cursor.execute("""
-                SELECT COUNT(*) as loss FROM bets 
-                WHERE status IN ('CLOSED_LOSS', 'closed_loss')
-            """)
-            loss_bets = cursor.fetchone()['loss']
-            
-            # Lucro total - calcular corretamente
-            # profit_loss já está em porcentagem, então: lucro = stake * (profit_loss / 100)
-            cursor.execute("""
-                SELECT COALESCE(SUM(
-                    CASE 
-                        WHEN profit_loss IS NOT NULL AND profit_loss != 0 
-                        THEN stake * (profit_loss / 100.0)
-                        ELSE 0
-                    END
-                ), 0) as total_profit 
-                FROM bets 
-                WHERE (status LIKE 'CLOSED%' OR status LIKE 'closed%')
-                AND profit_loss IS NOT NULL
-            """)
-            total_profit = cursor.fetchone()['total_profit']
-            
-            # Apostas por esporte
-            cursor.execute("""
+            # bet_stats tem uma linha por (esporte, status): o custo não depende do histórico
+            # profit_loss está em porcentagem, então o lucro é stake * (profit_loss / 100)
+            cursor.execute(f"""
                 SELECT 
-                    SUM(CASE WHEN sport LIKE '%SOCCER%' THEN 1 ELSE 0 END) as soccer,
-                    SUM(CASE WHEN sport LIKE '%HOCKEY%' THEN 1 ELSE 0 END) as hockey,
-                    SUM(CASE WHEN sport LIKE '%TENNIS%' THEN 1 ELSE 0 END) as tennis
-                FROM bets
+                    COALESCE(SUM(bet_count), 0) as total,
+                    COALESCE(SUM(CASE WHEN status = 'ACTIVE' THEN bet_count ELSE 0 END), 0) as active,
+                    COALESCE(SUM(CASE WHEN status = 'CLOSED_PROFIT' THEN bet_count ELSE 0 END), 0) as profit,
+                    COALESCE(SUM(CASE WHEN status = 'CLOSED_LOSS' THEN bet_count ELSE 0 END), 0) as loss,
+                    COALESCE(SUM(CASE WHEN status IN ({_CLOSED_SQL}) THEN total_profit ELSE 0 END), 0) as total_profit,
+                    COALESCE(SUM(CASE WHEN sport = 'SOCCER' THEN bet_count ELSE 0 END), 0) as soccer,
+                    COALESCE(SUM(CASE WHEN sport = 'ICE_HOCKEY' THEN bet_count ELSE 0 END), 0) as hockey,
+                    COALESCE(SUM(CASE WHEN sport = 'TENNIS' THEN bet_count ELSE 0 END), 0) as tennis
+                FROM bet_stats
             """)
-            sports = cursor.fetchone()
+            stats = cursor.fetchone()
             
             conn.close()
             
             return {
-                'total_bets': total_bets,
-                'active_bets': active_bets,
-                'profit_bets': profit_bets,
-                'loss_bets': loss_bets,
-                'total_profit': float(total_profit) if total_profit else 0.0,
-                'soccer_bets': sports['soccer'] or 0,
-                'hockey_bets': sports['hockey'] or 0,
-                'tennis_bets': sports['tennis'] or 0,
+                'total_bets': stats['total'],
+                'active_bets': stats['active'],
+                'profit_bets': stats['profit'],
+                'loss_bets': stats['loss'],
+                'total_profit': float(stats['total_profit']),
+                'soccer_bets': stats['soccer'],
+                'hockey_bets': stats['hockey'],
+                'tennis_bets': stats['tennis'],
             }
         except Exception as e:
             logger.error(f"Erro ao buscar estatísticas: {e}")
@@ -470,16 +1488,23 @@ class BetDatabase:
                 'tennis_bets': 0,
             }
     
+    def _save_balance_sql(self, cursor, available: float, total: float, exposure: float = 0):
+        """INSERT do snapshot de saldo (sem commit)"""
+        cursor.execute("""
+            INSERT INTO balance_history (available, total, exposure)
+            VALUES (?, ?, ?)
+        """, (available, total, exposure))
+    
     def save_balance(self, available: float, total: float, exposure: float = 0) -> bool:
-        """Salva snapshot do saldo da conta"""
+        """Salva snapshot do saldo da conta (enfileirado se o escritor em segundo plano estiver ativo)"""
+        if self._writer is not None:
+            return self._writer.submit('save_balance', self._save_balance_sql, available, total, exposure)
+        
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO balance_history (available, total, exposure)
-                VALUES (?, ?, ?)
-            """, (available, total, exposure))
+            self._save_balance_sql(cursor, available, total, exposure)
             
             conn.commit()
             conn.close()
@@ -511,66 +1536,141 @@ class BetDatabase:
             logger.error(f"Erro ao buscar último saldo: {e}")
             return None
     
-    def update_daily_stats(self, date: str = None) -> bool:
-        """Atualiza estatísticas diárias"""
+    def _rebuild_daily_stats_sql(self, cursor, date: Optional[str] = None):
+        """Recalcula daily_stats a partir de bets - todos os dias ou apenas um (sem commit)"""
+        columns = [column for column, _ in DAILY_STATS_COLUMNS]
+        aggregates = ", ".join(f"SUM({expression.format(r='')})" for _, expression in DAILY_STATS_COLUMNS)
+        
         if date is None:
-            date = datetime.now().strftime('%Y-%m-%d')
+            cursor.execute("DELETE FROM daily_stats")
+            date_filter, params = "", ()
+        else:
+            cursor.execute("DELETE FROM daily_stats WHERE date = ?", (date,))
+            date_filter, params = "AND entry_date = ?", (date,)
+        
+        cursor.execute(f"""
+            INSERT INTO daily_stats (date, {', '.join(columns)})
+            SELECT entry_date, {aggregates}
+            FROM bets
+            WHERE entry_date IS NOT NULL {date_filter}
+            GROUP BY entry_date
+        """, params)
+    
+    def rebuild_daily_stats(self, date: Optional[str] = None) -> bool:
+        """
+        Reconstrói daily_stats a partir da tabela bets (reparo)
+        
+        No dia a dia a tabela é mantida pelos triggers; use isto após
+        alterações manuais no banco ou para corrigir divergências.
+        
+        Args:
+            date: Dia (YYYY-MM-DD) a reconstruir (None = todos)
+        """
+        if self._writer is not None:
+            return self._writer.submit('rebuild_daily_stats', self._rebuild_daily_stats_sql, date)
         
         try:
-            conn = self._get_connection()
+            conn = self._get_connection(timeout=30.0)
             cursor = conn.cursor()
             
-            # Calcular estatísticas do dia
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_bets,
-                    SUM(CASE WHEN status IN ('CLOSED_PROFIT', 'closed_profit') THEN 1 ELSE 0 END) as profit_bets,
-                    SUM(CASE WHEN status IN ('CLOSED_LOSS', 'closed_loss') THEN 1 ELSE 0 END) as loss_bets,
-                    COALESCE(SUM(CASE WHEN status LIKE 'CLOSED%' OR status LIKE 'closed%' 
-                                      THEN profit_loss * stake / 100 ELSE 0 END), 0) as total_profit,
-                    SUM(CASE WHEN sport LIKE '%SOCCER%' THEN 1 ELSE 0 END) as soccer_bets,
-                    SUM(CASE WHEN sport LIKE '%HOCKEY%' THEN 1 ELSE 0 END) as hockey_bets,
-                    SUM(CASE WHEN sport LIKE '%TENNIS%' THEN 1 ELSE 0 END) as tennis_bets
-                FROM bets
-                WHERE DATE(entry_time) = ?
-            """, (date,))
+            self._rebuild_daily_stats_sql(cursor, date)
             
-            stats = cursor.fetchone()
+            conn.commit()
+            conn.close()
+            logger.info(f"Estatísticas diárias reconstruídas ({date or 'todos os dias'})")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir estatísticas diárias: {e}")
+            return False
+    
+    def _rebuild_bet_stats_sql(self, cursor):
+        """Recalcula bet_stats a partir de bets (sem commit)"""
+        cursor.execute("DELETE FROM bet_stats")
+        cursor.execute("""
+            INSERT INTO bet_stats (sport, status, bet_count, total_stake, total_profit)
+            SELECT COALESCE(sport, ''), COALESCE(status, ''), COUNT(*),
+                   COALESCE(SUM(stake), 0), COALESCE(SUM(profit_loss * stake / 100), 0)
+            FROM bets
+            GROUP BY COALESCE(sport, ''), COALESCE(status, '')
+        """)
+    
+    def rebuild_bet_stats(self) -> bool:
+        """Reconstrói os contadores de bet_stats a partir da tabela bets (reparo)"""
+        if self._writer is not None:
+            return self._writer.submit('rebuild_bet_stats', self._rebuild_bet_stats_sql)
+        
+        try:
+            conn = self._get_connection(timeout=30.0)
+            cursor = conn.cursor()
             
-            # Inserir ou atualizar
-            cursor.execute("""
-                INSERT INTO daily_stats (
-                    date, total_bets, profit_bets, loss_bets, total_profit,
-                    soccer_bets, hockey_bets, tennis_bets
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(date) DO UPDATE SET
-                    total_bets = excluded.total_bets,
-                    profit_bets = excluded.profit_bets,
-                    loss_bets = excluded.loss_bets,
-                    total_profit = excluded.total_profit,
-                    soccer_bets = excluded.soccer_bets,
-                    hockey_bets = excluded.hockey_bets,
-                    tennis_bets = excluded.tennis_bets,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (
-                date,
-                stats['total_bets'],
-                stats['profit_bets'],
-                stats['loss_bets'],
-                stats['total_profit'],
-                stats['soccer_bets'],
-                stats['hockey_bets'],
-                stats['tennis_bets']
-            ))
+            self._rebuild_bet_stats_sql(cursor)
             
             conn.commit()
             conn.close()
-            logger.debug(f"Estatísticas diárias atualizadas para {date}")
+            logger.info("Estatísticas gerais reconstruídas")
             return True
         except Exception as e:
-            logger.error(f"Erro ao atualizar estatísticas diárias: {e}")
+            logger.error(f"Erro ao reconstruir estatísticas gerais: {e}")
             return False
     
+    def check_bet_stats(self, repair: bool = False) -> List[Dict]:
+        """
+        Compara bet_stats com uma recontagem completa de bets
+        
+        Args:
+            repair: Reconstruir bet_stats se houver divergência
+        
+        Returns:
+            Lista de divergências (vazia se os contadores estão corretos)
+        """
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                WITH actual AS (
+                    SELECT COALESCE(sport, '') as sport, COALESCE(status, '') as status,
+                           COUNT(*) as bet_count,
+                           COALESCE(SUM(stake), 0) as total_stake,
+                           COALESCE(SUM(profit_loss * stake / 100), 0) as total_profit
+                    FROM bets
+                    GROUP BY 1, 2
+                ),
+                keys AS (
+                    SELECT sport, status FROM actual
+                    UNION
+                    SELECT sport, status FROM bet_stats
+                )
+                SELECT k.sport, k.status,
+                       COALESCE(m.bet_count, 0) as stored_count, COALESCE(a.bet_count, 0) as actual_count,
+                       COALESCE(m.total_stake, 0) as stored_stake, COALESCE(a.total_stake, 0) as actual_stake,
+                       COALESCE(m.total_profit, 0) as stored_profit, COALESCE(a.total_profit, 0) as actual_profit
+                FROM keys k
+                LEFT JOIN bet_stats m ON m.sport = k.sport AND m.status = k.status
+                LEFT JOIN actual a ON a.sport = k.sport AND a.status = k.status
+                WHERE COALESCE(m.bet_count, 0) != COALESCE(a.bet_count, 0)
+                   OR ABS(COALESCE(m.total_stake, 0) - COALESCE(a.total_stake, 0)) > 1e-6
+                   OR ABS(COALESCE(m.total_profit, 0) - COALESCE(a.total_profit, 0)) > 1e-6
+            """)
+            mismatches = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+        except Exception as e:
+            logger.error(f"Erro ao verificar estatísticas gerais: {e}")
+            return []
+        
+        if mismatches:
+            logger.warning(f"⚠️ bet_stats divergente em {len(mismatches)} grupo(s) (esporte, status)")
+            if repair:
+                self.rebuild_bet_stats()
+        
+        return mismatches
+    
+    def update_daily_stats(self, date: str = None) -> bool:
+        """Recalcula as estatísticas de um dia (reparo - daily_stats já é mantida pelos triggers)"""
+        if date is None:
+            date = datetime.now().strftime('%Y-%m-%d')
+        return self.rebuild_daily_stats(date)
+    
     def get_daily_stats(self, days: int = 30) -> List[Dict]:
         """Obtém estatísticas dos últimos N dias"""
         try:
@@ -593,50 +1693,61 @@ class BetDatabase:
     
     def close_bet(self, bet_id: str, status: str, profit_loss: float, 
                   close_reason: str, current_price: float) -> bool:
-        """Fecha uma aposta e atualiza estatísticas"""
+        """Fecha uma aposta (as estatísticas diárias são atualizadas pelo trigger)"""
         close_time = datetime.now().isoformat()
-        
-        success = self.update_bet(bet_id, {
+        update_data = {
             'status': status,
             'profit_loss': profit_loss,
             'close_reason': close_reason,
             'current_price': current_price,
             'close_time': close_time
-        })
+        }
         
-        if success:
-            # Atualizar estatísticas do dia
-            self.update_daily_stats()
+        # daily_stats é atualizada pelo trigger na mesma transação do UPDATE
+        return self.update_bet(bet_id, update_data)
+    
+    @staticmethod
+    def settled_update_fields(settled_data: Dict, stake: Optional[float] = None) -> Dict:
+        """
+        Campos de bets a partir dos dados de uma aposta liquidada
         
-        return success
+        Args:
+            settled_data: Aposta liquidada (grossProfit, netProfit, settledDate)
+            stake: Stake da aposta, para calcular o profit_loss percentual
+        """
+        update_fields = {}
+        
+        if 'grossProfit' in settled_data:
+            update_fields['gross_profit'] = float(settled_data['grossProfit']) if settled_data['grossProfit'] else None
+        if 'netProfit' in settled_data:
+            update_fields['net_profit'] = float(settled_data['netProfit']) if settled_data['netProfit'] else None
+        
+        # Se tem lucro/prejuízo, atualizar status e profit_loss
+        if 'grossProfit' in settled_data and settled_data['grossProfit']:
+            gross_profit = float(settled_data['grossProfit'])
+            if gross_profit > 0:
+                update_fields['status'] = 'CLOSED_PROFIT'
+            elif gross_profit < 0:
+                update_fields['status'] = 'CLOSED_LOSS'
+            
+            # Calcular profit_loss percentual se tiver stake
+            if stake:
+                update_fields['profit_loss'] = (gross_profit / stake) * 100
+        
+        if 'settledDate' in settled_data:
+            update_fields['settled_date'] = settled_data['settledDate']
+        
+        return update_fields
     
     def update_bet_settled_data(self, bet_id: str, settled_data: Dict) -> bool:
         """Atualiza uma aposta com dados da API de atividade (settled bets)"""
         try:
-            update_fields = {}
-            
-            if 'grossProfit' in settled_data:
-                update_fields['gross_profit'] = float(settled_data['grossProfit']) if settled_data['grossProfit'] else None
-            if 'netProfit' in settled_data:
-                update_fields['net_profit'] = float(settled_data['netProfit']) if settled_data['netProfit'] else None
-            
-            # Se tem lucro/prejuízo, atualizar status e profit_loss
+            stake = None
             if 'grossProfit' in settled_data and settled_data['grossProfit']:
-                gross_profit = float(settled_data['grossProfit'])
-                if gross_profit > 0:
-                    update_fields['status'] = 'CLOSED_PROFIT'
-                elif gross_profit < 0:
-                    update_fields['status'] = 'CLOSED_LOSS'
-                
-                # Calcular profit_loss percentual se tiver stake
                 bet = self.get_bet(bet_id)
-                if bet and bet.get('stake'):
-                    profit_loss_pct = (gross_profit / bet['stake']) * 100
-                    update_fields['profit_loss'] = profit_loss_pct
-            
-            if 'settledDate' in settled_data:
-                update_fields['settled_date'] = settled_data['settledDate']
+                stake = bet.get('stake') if bet else None
             
+            update_fields = self.settled_update_fields(settled_data, stake)
             if update_fields:
                 return self.update_bet(bet_id, update_fields)
             
@@ -645,6 +1756,144 @@ class BetDatabase:
             logger.error(f"Erro ao atualizar dados de aposta finalizada: {e}")
             return False
     
+    def update_settled_bets(self, settled_bets: List[Dict]) -> Optional[int]:
+        """
+        Grava em lote os dados de apostas liquidadas (gross_profit, net_profit, settled_date)
+        
+        Mesmas regras de update_bet_settled_data (status pelo sinal do lucro,
+        profit_loss percentual pelo stake da própria linha), em um único
+        executemany e uma única transação. Apostas que não estão no banco são
+        ignoradas.
+        
+        Args:
+            settled_bets: Apostas liquidadas (betId, grossProfit, netProfit, settledDate;
+                          netProfit None = comissão ainda desconhecida, gravado como NULL)
+            
+        Returns:
+            int: Apostas atualizadas (None em caso de erro - nada foi gravado)
+        """
+        rows = []
+        for settled in settled_bets:
+            bet_id = str(settled.get('betId', '')).split(':')[-1]
+            if not bet_id:
+                continue
+            gross = float(settled['grossProfit']) if settled.get('grossProfit') is not None else None
+            net = float(settled['netProfit']) if settled.get('netProfit') is not None else None
+            rows.append((gross, net, settled.get('settledDate'), gross, gross, gross, gross, bet_id))
+        if not rows:
+            return 0
+        
+        if self._writer is not None:
+            return len(rows) if self._writer.submit('update_settled_bets', self._update_settled_bets_sql, rows) else None
+        
+        try:
+            conn = self._get_connection(timeout=5.0)
+            cursor = conn.cursor()
+            updated = self._update_settled_bets_sql(cursor, rows)
+            conn.commit()
+            conn.close()
+            return updated
+        except Exception as e:
+            if 'conn' in locals():
+                conn.close()
+            logger.error(f"Erro ao gravar apostas liquidadas: {e}")
+            return None
+    
+    def _update_settled_bets_sql(self, cursor, rows: List[tuple]) -> int:
+        """UPDATE em lote das apostas liquidadas (sem commit); retorna as linhas afetadas"""
+        cursor.executemany("""
+            UPDATE bets SET
+                gross_profit = ?,
+                net_profit = ?,
+                settled_date = ?,
+                status = CASE WHEN ? > 0 THEN 'CLOSED_PROFIT'
+                              WHEN ? < 0 THEN 'CLOSED_LOSS'
+                              ELSE status END,
+                profit_loss = CASE WHEN ? IS NOT NULL AND stake > 0 THEN ? * 100.0 / stake
+                                   ELSE profit_loss END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE bet_id = ?
+        """, rows)
+        return cursor.rowcount
+    
+    def get_sync_state(self, key: str) -> Optional[str]:
+        """Lê um valor de estado de sincronização (None se não existir)"""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            conn.close()
+            return row['value'] if row else None
+        except Exception as e:
+            logger.error(f"Erro ao ler estado de sincronização: {e}")
+            return None
+    
+    def set_sync_state(self, key: str, value: str) -> bool:
+        """Grava um valor de estado de sincronização"""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO sync_state (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """, (key, value))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao gravar estado de sincronização: {e}")
+            return False
+    
+    def update_bet_prices(self, prices: List[tuple]) -> int:
+        """
+        Registra em lote o preço atual e o P&L (%) de várias apostas ativas
+        
+        Um único executemany por passada do monitoramento. Com o escritor em
+        segundo plano ativo, apenas enfileira; sem ele, uma tentativa só (sem
+        retry com espera): o preço é reenviado na próxima passada.
+        
+        Args:
+            prices: Tuplas (bet_id, current_price, profit_loss)
+            
+        Returns:
+            int: Apostas atualizadas (com o escritor: enfileiradas)
+        """
+        rows = [(current_price, profit_loss, bet_id) for bet_id, current_price, profit_loss in prices]
+        if not rows:
+            return 0
+        
+        if self._writer is not None:
+            return len(rows) if self._writer.submit('update_bet_prices', self._update_bet_prices_sql, rows) else 0
+        
+        try:
+            conn = self._get_connection(timeout=1.0)
+            try:
+                cursor = conn.cursor()
+                updated = self._update_bet_prices_sql(cursor, rows)
+                conn.commit()
+                return updated
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Preços de {len(rows)} apostas não gravados (próxima passada tenta de novo): {e}")
+            return 0
+    
+    def _update_bet_prices_sql(self, cursor, rows: List[tuple]) -> int:
+        """UPDATE em lote de current_price/profit_loss (sem commit); retorna as linhas afetadas"""
+        cursor.executemany("""
+            UPDATE bets SET current_price = ?, profit_loss = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE bet_id = ?
+        """, rows)
+        return cursor.rowcount
+    
+    def update_bet_price(self, bet_id: str, current_price: float, profit_loss: float) -> bool:
+        """Registra o preço atual e o P&L (%) de uma aposta ativa (gera evento para o feed ao vivo)"""
+        return self.update_bet(bet_id, {
+            'current_price': current_price,
+            'profit_loss': profit_loss,
+        })
+    
     def update_bet_game_info(self, bet_id: str, game_score: str = None, 
                              market_status: str = None, runner_status: str = None) -> bool:
         """Atualiza informações do jogo (placar, status) de uma aposta"""
@@ -41,5 +41,9 @@ echo "🤖 Iniciando bot de trading..."
 echo "=========================================="
 echo ""
 
-# Executar o bot
+# Executar o bot (BOT_ENGINE=async usa o motor asyncio com avaliação paralela de mercados)
+if [ "$BOT_ENGINE" = "async" ]; then
+    exec python async_bot.py
+fi
+
 exec python betfair_bot.py
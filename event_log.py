@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Log estruturado de eventos do bot (logs/bot_events.jsonl)
+
+Ao lado do log de texto, o bot grava um evento JSON por linha com tipo e
+campos fixos:
+
+    cycle       - fim de um ciclo (número, duração, chamadas à API, estatísticas)
+    bet_placed  - aposta colocada
+    bet_closed  - aposta fechada (status, P&L, motivo)
+    balance     - saldo da conta
+
+Os dashboards leem esses eventos com o EventLogReader, que acompanha o arquivo
+de forma incremental e indexa os eventos por tipo, em vez de aplicar regex ao
+texto do log (que quebra quando a redação das mensagens muda).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from log_reader import LogWatcher
+
+EVENT_LOG_FILE = Path('logs/bot_events.jsonl')
+
+# Ao passar deste tamanho o arquivo é rotacionado para bot_events.jsonl.1
+EVENT_LOG_MAX_BYTES = 20 * 1024 * 1024
+
+EVENT_TYPES = ('cycle', 'bet_placed', 'bet_closed', 'balance')
+
+
+class EventLogWriter:
+    """Grava eventos tipados, um JSON por linha"""
+
+    def __init__(self, path=EVENT_LOG_FILE, max_bytes: int = EVENT_LOG_MAX_BYTES):
+        """
+        Args:
+            path: Arquivo de eventos
+            max_bytes: Tamanho a partir do qual o arquivo é rotacionado
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def emit(self, event_type: str, **fields) -> bool:
+        """
+        Grava um evento
+
+        Args:
+            event_type: Um dos EVENT_TYPES
+            **fields: Campos do evento (precisam ser serializáveis em JSON)
+        """
+        event = {'type': event_type, 'ts': round(time.time(), 3)}
+        event.update(fields)
+        line = json.dumps(event, default=str, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                    os.replace(self.path, self.path.with_name(self.path.name + '.1'))
+                # Uma única escrita por linha: leitores nunca veem meio evento seguido de outro
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                return True
+            except OSError:
+                return False
+
+
+class EventLogReader:
+    """
+    Leitor incremental e indexado do log de eventos
+
+    Cada poll() lê apenas as linhas novas (via LogWatcher: offset + inode,
+    sobrevive à rotação) e atualiza um índice por tipo com os eventos mais
+    recentes. Na primeira leitura, só o fim do arquivo é lido.
+    """
+
+    def __init__(self, path=EVENT_LOG_FILE, max_events_per_type: int = 200):
+        """
+        Args:
+            path: Arquivo de eventos
+            max_events_per_type: Eventos recentes mantidos em memória por tipo
+        """
+        self.path = Path(path)
+        self.max_events_per_type = max_events_per_type
+        # Leitura inicial: eventos suficientes para preencher o índice de todos os tipos
+        self._watcher = LogWatcher(self.path, max_lines=max_events_per_type * len(EVENT_TYPES))
+        self._events: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Indica se o bot já gravou algum evento"""
+        return self.path.exists()
+
+    def poll(self) -> List[Dict]:
+        """Lê e indexa os eventos novos; retorna os eventos lidos"""
+        new_events = []
+        for line in self._watcher.poll():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict) and 'type' in event:
+                new_events.append(event)
+
+        with self._lock:
+            for event in new_events:
+                events = self._events.get(event['type'])
+                if events is None:
+                    events = self._events[event['type']] = deque(maxlen=self.max_events_per_type)
+                events.append(event)
+        return new_events
+
+    def latest(self, event_type: str) -> Optional[Dict]:
+        """Evento mais recente do tipo (None se não houver)"""
+        self.poll()
+        with self._lock:
+            events = self._events.get(event_type)
+            return events[-1] if events else None
+
+    def recent(self, event_type: str, limit: int = 50) -> List[Dict]:
+        """Eventos mais recentes do tipo, do mais novo para o mais antigo"""
+        self.poll()
+        with self._lock:
+            events = list(self._events.get(event_type, ()))
+        return events[::-1][:limit]
+
+    def bot_stats(self):
+        """
+        Estatísticas e saldo atuais do bot a partir dos eventos
+
+        Returns:
+            tuple: (stats, account_balance) no mesmo formato do antigo parse_logs
+        """
+        stats = {
+            'total_bets': 0,
+            'profit_bets': 0,
+            'loss_bets': 0,
+            'total_profit': 0.0,
+            'soccer_bets': 0,
+            'hockey_bets': 0,
+            'tennis_bets': 0,
+            'active_bets': 0,
+        }
+        account_balance = {
+            'available': None,
+            'total': None,
+            'exposure': None,
+        }
+
+        cycle = self.latest('cycle')
+        if cycle and cycle.get('stats'):
+            stats.update(cycle['stats'])
+
+        balance = self.latest('balance')
+        if balance:
+            account_balance['available'] = balance.get('available')
+            account_balance['total'] = balance.get('total')
+            account_balance['exposure'] = abs(balance.get('exposure') or 0)
+            account_balance['last_update'] = datetime_from_ts(balance.get('ts'))
+
+        return stats, account_balance
+
+
+def datetime_from_ts(ts) -> Optional[str]:
+    """Converte o 'ts' (epoch) de um evento para 'YYYY-MM-DD HH:MM:SS'"""
+    if ts is None:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
@@ -4,10 +4,14 @@ Script para fazer Cash Out (fechar posições) das apostas ativas
 Faz uma aposta oposta (hedge) para fechar cada posição
 """
 
-from betfair_api import BetfairAPI
+from betfair_api import AsyncBetfairAPI, BetfairAPI
+import asyncio
 import json
+import uuid
 from datetime import datetime
 
+# Mercados com ordens de hedge enviadas ao mesmo tempo
+CASHOUT_MAX_WORKERS = 8
 def calculate_hedge_stake(back_stake, back_price, lay_price):
     """
     Calcula o stake necessário para fazer hedge (fechar posição)
@@ -42,6 +46,234 @@ def calculate_lay_hedge_stake(lay_stake, lay_price, back_price):
     hedge_stake = lay_stake / back_price
     return round(hedge_stake, 2)
 
+def group_positions(current_orders):
+    """
+    Agrupa as ordens executadas em posições por mercado e seleção
+    
+    Returns:
+        dict: market_id -> {selection_id: posição}
+    """
+    positions_by_market = {}
+    for order in current_orders:
+        market_id = order.get('marketId')
+        selection_id = order.get('selectionId')
+        side = order.get('side')
+        status = order.get('status')
+        size_matched = order.get('sizeMatched', 0)
+        
+        # Só processar apostas executadas
+        if status != 'EXECUTION_COMPLETE' or size_matched == 0:
+            continue
+        
+        positions = positions_by_market.setdefault(market_id, {})
+        if selection_id not in positions:
+            positions[selection_id] = {
+                'market_id': market_id,
+                'selection_id': selection_id,
+                'back_stake': 0,
+                'back_price': 0,
+                'lay_stake': 0,
+                'lay_price': 0,
+                'orders': []
+            }
+        
+        pos = positions[selection_id]
+        pos['orders'].append(order)
+        
+        price = order.get('averagePriceMatched', order.get('priceSize', {}).get('price', 0))
+        if side == 'BACK':
+            pos['back_stake'] += size_matched
+            if pos['back_price'] == 0:
+                pos['back_price'] = price
+        elif side == 'LAY':
+            pos['lay_stake'] += size_matched
+            if pos['lay_price'] == 0:
+                pos['lay_price'] = price
+    
+    return positions_by_market
+
+def plan_hedge(position, runner):
+    """
+    Calcula o hedge que fecha uma posição com as odds atuais do runner
+    
+    Returns:
+        dict: {'side', 'price', 'stake', 'instruction'}
+    
+    Raises:
+        ValueError: Sem odds, preço inválido ou liquidez insuficiente
+    """
+    if position['back_stake'] > 0:
+        # Tem posição BACK, precisa fazer LAY para fechar
+        hedge_side = 'LAY'
+        offers = runner.get('ex', {}).get('availableToLay', [])
+    elif position['lay_stake'] > 0:
+        # Tem posição LAY, precisa fazer BACK para fechar
+        hedge_side = 'BACK'
+        offers = runner.get('ex', {}).get('availableToBack', [])
+    else:
+        raise ValueError("Posição sem stake executado")
+    
+    if not offers:
+        raise ValueError(f"Sem odds disponíveis para {hedge_side}")
+    
+    hedge_price = offers[0].get('price', 0)
+    available_size = offers[0].get('size', 0)
+    if hedge_price == 0:
+        raise ValueError(f"Preço {hedge_side} inválido")
+    
+    if hedge_side == 'LAY':
+        hedge_stake = calculate_hedge_stake(position['back_stake'], position['back_price'], hedge_price)
+    else:
+        hedge_stake = calculate_lay_hedge_stake(position['lay_stake'], position['lay_price'], hedge_price)
+    
+    if hedge_stake <= 0:
+        raise ValueError("Stake de hedge inválido")
+    if available_size < hedge_stake:
+        raise ValueError(f"Liquidez insuficiente: {available_size:.2f} < {hedge_stake:.2f}")
+    
+    return {
+        'side': hedge_side,
+        'price': hedge_price,
+        'stake': hedge_stake,
+        'instruction': {
+            'instructionType': 'PLACE',
+            'selectionId': int(position['selection_id']),
+            'handicap': 0.0,
+            'side': hedge_side,
+            'orderType': 'LIMIT',
+            'limitOrder': {
+                'size': hedge_stake,
+                'price': hedge_price,
+                'persistenceType': 'LAPSE'
+            }
+        }
+    }
+
+class CashoutEngine:
+    """
+    Cash out em massa de todas as posições executadas
+    
+    - uma busca das ordens atuais (todas as páginas);
+    - uma busca dos books de todos os mercados (list_market_books: blocos
+      dentro do limite de data weight, em um único POST);
+    - cálculo de todos os hedges em uma passada;
+    - um placeOrders por mercado com todas as instruções do mercado, com até
+      max_workers mercados enviados ao mesmo tempo.
+    
+    Cada placeOrders usa um customerRef único na execução (id da execução +
+    rodada + índice do mercado): a Betfair deduplica pela referência.
+    """
+    
+    def __init__(self, api, max_workers=CASHOUT_MAX_WORKERS):
+        """
+        Args:
+            api: Cliente BetfairAPI autenticado
+            max_workers: Mercados processados simultaneamente
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.run_id = uuid.uuid4().hex[:12]
+        self._rounds = 0
+    
+    def fetch_orders(self):
+        """Todas as ordens atuais (todas as páginas de listCurrentOrders)"""
+        orders = []
+        for page in self.api.iter_current_orders():
+            orders.extend(page)
+        return orders
+    
+    def plan(self, positions_by_market):
+        """
+        Busca os books e calcula os hedges de todas as posições
+        
+        Returns:
+            tuple: (planos por mercado {market_id: [(posição, hedge)]}, falhas [(posição, motivo)])
+        """
+        books = self.api.list_market_books(
+            list(positions_by_market),
+            price_projection={'priceData': ['EX_BEST_OFFERS']}
+        )
+        
+        plans = {}
+        failures = []
+        for market_id, positions in positions_by_market.items():
+            market = books.get(market_id)
+            for position in positions.values():
+                if not market:
+                    failures.append((position, "Não foi possível obter odds atuais do mercado"))
+                    continue
+                if market.get('status') != 'OPEN':
+                    failures.append((position, f"Mercado não está aberto (status: {market.get('status')})"))
+                    continue
+                
+                runner = None
+                for r in market.get('runners', []):
+                    r_id = r.get('id') or r.get('selectionId')
+                    if str(r_id) == str(position['selection_id']):
+                        runner = r
+                        break
+                if not runner:
+                    failures.append((position, "Runner não encontrado no mercado"))
+                    continue
+                
+                try:
+                    hedge = plan_hedge(position, runner)
+                except ValueError as e:
+                    failures.append((position, str(e)))
+                    continue
+                plans.setdefault(market_id, []).append((position, hedge))
+        
+        return plans, failures
+    
+    def execute(self, plans):
+        """
+        Envia os hedges: um placeOrders por mercado, mercados em paralelo
+        
+        Returns:
+            list: (posição, hedge, bet_id ou None, erro ou None) de cada instrução
+        """
+        if not plans:
+            return []
+        return asyncio.run(self._execute(plans))
+    
+    async def _execute(self, plans):
+        async_api = AsyncBetfairAPI(self.api, max_concurrency=self.max_workers)
+        market_ids = list(plans)
+        self._rounds += 1
+        results = await asyncio.gather(*(
+            async_api.place_orders(
+                market_id=market_id,
+                instructions=[hedge['instruction'] for _, hedge in plans[market_id]],
+                # customerRef único por chamada (a Betfair deduplica pela referência)
+                customer_ref=f"cashout_{self.run_id}_{self._rounds}_{index}"
+            )
+            for index, market_id in enumerate(market_ids)
+        ), return_exceptions=True)
+        
+        outcomes = []
+        for market_id, result in zip(market_ids, results):
+            entries = plans[market_id]
+            if isinstance(result, Exception):
+                outcomes.extend((position, hedge, None, f"Erro ao fazer hedge: {result}") for position, hedge in entries)
+                continue
+            
+            reports = (result or {}).get('instructionReports')
+            if not reports:
+                error_code = (result or {}).get('errorCode', 'Resposta inesperada da API')
+                outcomes.extend((position, hedge, None, error_code) for position, hedge in entries)
+                continue
+            
+            # Os relatórios vêm na mesma ordem das instruções
+            for (position, hedge), report in zip(entries, reports):
+                if report.get('status') == 'SUCCESS':
+                    outcomes.append((position, hedge, report.get('betId', 'N/A'), None))
+                else:
+                    error_code = report.get('errorCode', 'N/A')
+                    error_message = report.get('errorMessage', 'N/A')
+                    outcomes.append((position, hedge, None, f"{error_code} - {error_message}"))
+        
+        return outcomes
+
 def main():
     print("=" * 60)
     print("CASH OUT - FECHAR POSIÇÕES")
@@ -57,14 +289,10 @@ def main():
             return
         print("✓ Login realizado com sucesso\n")
 
-        print("Buscando apostas ativas...")
-        orders = api.list_current_orders()
-
-        if not orders:
-            print("ℹ️ Nenhuma resposta da API")
-            return
+        engine = CashoutEngine(api)
 
-        current_orders = orders.get('currentOrders', [])
+        print("Buscando apostas ativas...")
+        current_orders = engine.fetch_orders()
 
         if not current_orders:
             print("ℹ️ Nenhuma aposta ativa encontrada")
@@ -72,212 +300,48 @@ def main():
 
         print(f"✓ Encontradas {len(current_orders)} apostas ativas\n")
 
-        # Agrupar por market_id e selection_id
-        positions_by_market = {}
-        for order in current_orders:
-            market_id = order.get('marketId')
-            selection_id = order.get('selectionId')
-            side = order.get('side')
-            status = order.get('status')
-            size_matched = order.get('sizeMatched', 0)
-            
-            # Só processar apostas executadas
-            if status != 'EXECUTION_COMPLETE' or size_matched == 0:
-                continue
-            
-            key = f"{market_id}_{selection_id}"
-            if key not in positions_by_market:
-                positions_by_market[key] = {
-                    'market_id': market_id,
-                    'selection_id': selection_id,
-                    'back_stake': 0,
-                    'back_price': 0,
-                    'lay_stake': 0,
-                    'lay_price': 0,
-                    'orders': []
-                }
-            
-            pos = positions_by_market[key]
-            pos['orders'].append(order)
-            
-            if side == 'BACK':
-                price = order.get('averagePriceMatched', order.get('priceSize', {}).get('price', 0))
-                pos['back_stake'] += size_matched
-                if pos['back_price'] == 0:
-                    pos['back_price'] = price
-            elif side == 'LAY':
-                price = order.get('averagePriceMatched', order.get('priceSize', {}).get('price', 0))
-                pos['lay_stake'] += size_matched
-                if pos['lay_price'] == 0:
-                    pos['lay_price'] = price
+        positions_by_market = group_positions(current_orders)
 
         if not positions_by_market:
             print("ℹ️ Nenhuma posição executada encontrada para fazer cashout")
             return
 
-        print(f"📊 Encontradas {len(positions_by_market)} posições únicas\n")
+        total_positions = sum(len(positions) for positions in positions_by_market.values())
+        print(f"📊 Encontradas {total_positions} posições únicas em {len(positions_by_market)} mercados\n")
 
-        total_cashout = 0
-        total_failed = 0
+        # Odds de todos os mercados de uma vez e todos os hedges calculados antes de enviar
+        plans, failures = engine.plan(positions_by_market)
 
-        # Fazer cashout de cada posição
-        for key, position in positions_by_market.items():
-            market_id = position['market_id']
-            selection_id = position['selection_id']
-            
-            print(f"📌 Market: {market_id} | Selection: {selection_id}")
-            
-            # Obter odds atuais do mercado
-            try:
-                market_book = api.list_market_book(
-                    market_ids=[market_id],
-                    price_projection={'priceData': ['EX_BEST_OFFERS']}
-                )
-                
-                if not market_book:
-                    print(f"   ⚠️ Não foi possível obter odds atuais do mercado")
-                    total_failed += 1
-                    continue
-                
-                market = market_book[0]
-                if market.get('status') != 'OPEN':
-                    print(f"   ⚠️ Mercado não está aberto (status: {market.get('status')})")
-                    total_failed += 1
-                    continue
-                
-                # Encontrar runner
-                runners = market.get('runners', [])
-                runner = None
-                for r in runners:
-                    r_id = r.get('id') or r.get('selectionId')
-                    if str(r_id) == str(selection_id):
-                        runner = r
-                        break
-                
-                if not runner:
-                    print(f"   ⚠️ Runner não encontrado no mercado")
-                    total_failed += 1
-                    continue
-                
-                # Determinar qual hedge fazer
-                hedge_side = None
-                hedge_stake = 0
-                hedge_price = 0
-                
-                if position['back_stake'] > 0:
-                    # Tem posição BACK, precisa fazer LAY para fechar
-                    available_to_lay = runner.get('ex', {}).get('availableToLay', [])
-                    if not available_to_lay:
-                        print(f"   ⚠️ Sem odds disponíveis para LAY")
-                        total_failed += 1
-                        continue
-                    
-                    lay_price = available_to_lay[0].get('price', 0)
-                    available_size = available_to_lay[0].get('size', 0)
-                    
-                    if lay_price == 0:
-                        print(f"   ⚠️ Preço LAY inválido")
-                        total_failed += 1
-                        continue
-                    
-                    hedge_side = 'LAY'
-                    hedge_price = lay_price
-                    hedge_stake = calculate_hedge_stake(
-                        position['back_stake'],
-                        position['back_price'],
-                        lay_price
-                    )
-                    
+        for position, reason in failures:
+            print(f"📌 Market: {position['market_id']} | Selection: {position['selection_id']}")
+            print(f"   ⚠️ {reason}")
+            print()
+
+        for market_id, entries in plans.items():
+            for position, hedge in entries:
+                print(f"📌 Market: {market_id} | Selection: {position['selection_id']}")
+                if hedge['side'] == 'LAY':
                     print(f"   📊 Posição BACK: R$ {position['back_stake']:.2f} @ {position['back_price']:.2f}")
-                    print(f"   💰 Hedge LAY necessário: R$ {hedge_stake:.2f} @ {lay_price:.2f}")
-                    
-                    if available_size < hedge_stake:
-                        print(f"   ⚠️ Liquidez insuficiente: {available_size:.2f} < {hedge_stake:.2f}")
-                        total_failed += 1
-                        continue
-                
-                elif position['lay_stake'] > 0:
-                    # Tem posição LAY, precisa fazer BACK para fechar
-                    available_to_back = runner.get('ex', {}).get('availableToBack', [])
-                    if not available_to_back:
-                        print(f"   ⚠️ Sem odds disponíveis para BACK")
-                        total_failed += 1
-                        continue
-                    
-                    back_price = available_to_back[0].get('price', 0)
-                    available_size = available_to_back[0].get('size', 0)
-                    
-                    if back_price == 0:
-                        print(f"   ⚠️ Preço BACK inválido")
-                        total_failed += 1
-                        continue
-                    
-                    hedge_side = 'BACK'
-                    hedge_price = back_price
-                    hedge_stake = calculate_lay_hedge_stake(
-                        position['lay_stake'],
-                        position['lay_price'],
-                        back_price
-                    )
-                    
+                else:
                     print(f"   📊 Posição LAY: R$ {position['lay_stake']:.2f} @ {position['lay_price']:.2f}")
-                    print(f"   💰 Hedge BACK necessário: R$ {hedge_stake:.2f} @ {back_price:.2f}")
-                    
-                    if available_size < hedge_stake:
-                        print(f"   ⚠️ Liquidez insuficiente: {available_size:.2f} < {hedge_stake:.2f}")
-                        total_failed += 1
-                        continue
-                
-                if hedge_side and hedge_stake > 0:
-                    # Fazer a aposta de hedge
-                    print(f"   🔄 Fazendo hedge ({hedge_side})...")
-                    
-                    try:
-                        instruction = {
-                            'instructionType': 'PLACE',
-                            'selectionId': int(selection_id),
-                            'handicap': 0.0,
-                            'side': hedge_side,
-                            'orderType': 'LIMIT',
-                            'limitOrder': {
-                                'size': hedge_stake,
-                                'price': hedge_price,
-                                'persistenceType': 'LAPSE'
-                            }
-                        }
-                        
-                        result = api.place_orders(
-                            market_id=market_id,
-                            instructions=[instruction],
-                            customer_ref=f"cashout_{int(datetime.now().timestamp())}"
-                        )
-                        
-                        if result and 'instructionReports' in result:
-                            report = result['instructionReports'][0]
-                            if report.get('status') == 'SUCCESS':
-                                bet_id = report.get('betId', 'N/A')
-                                print(f"   ✅ Cash Out realizado! Bet ID: {bet_id}")
-                                total_cashout += 1
-                            else:
-                                error_code = report.get('errorCode', 'N/A')
-                                error_message = report.get('errorMessage', 'N/A')
-                                print(f"   ❌ Falha: {error_code} - {error_message}")
-                                total_failed += 1
-                        else:
-                            print(f"   ❌ Resposta inesperada da API")
-                            total_failed += 1
-                            
-                    except Exception as e:
-                        print(f"   ❌ Erro ao fazer hedge: {e}")
-                        total_failed += 1
-                
+                print(f"   💰 Hedge {hedge['side']} necessário: R$ {hedge['stake']:.2f} @ {hedge['price']:.2f}")
                 print()
-                
-            except Exception as e:
-                print(f"   ❌ Erro ao processar: {e}")
+
+        if plans:
+            print(f"🔄 Fazendo hedge em {len(plans)} mercados...\n")
+
+        total_cashout = 0
+        total_failed = len(failures)
+
+        for position, hedge, bet_id, error in engine.execute(plans):
+            if bet_id:
+                print(f"   ✅ Cash Out realizado! {position['market_id']} | {position['selection_id']} - Bet ID: {bet_id}")
+                total_cashout += 1
+            else:
+                print(f"   ❌ Falha: {position['market_id']} | {position['selection_id']} - {error}")
                 total_failed += 1
-                print()
 
+        print()
         print("=" * 60)
         print("RESUMO")
         print("=" * 60)
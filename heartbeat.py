@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Heartbeat do bot (data/bot_heartbeat.json)
+
+O bot grava a cada ciclo um registro pequeno com o número do ciclo, duração,
+chamadas à API, último erro e horário. Os dashboards leem esse registro para
+saber se o bot está vivo, sem abrir nem interpretar o log.
+
+O arquivo fica fora do banco de dados de propósito: uma escrita por ciclo no
+SQLite mudaria o PRAGMA data_version e invalidaria o cache de respostas do
+dashboard mesmo sem nenhuma aposta alterada.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+HEARTBEAT_FILE = Path('data/bot_heartbeat.json')
+
+# Sem heartbeat há mais que isso, o bot é considerado parado
+HEARTBEAT_MAX_AGE = 300
+
+
+def write_heartbeat(record: Dict, path=HEARTBEAT_FILE) -> bool:
+    """
+    Grava o heartbeat de forma atômica (arquivo temporário + os.replace)
+
+    Leitores nunca veem um arquivo pela metade.
+    """
+    path = Path(path)
+    record = dict(record)
+    record.setdefault('timestamp', time.time())
+    record.setdefault('pid', os.getpid())
+
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return False
+
+
+def read_heartbeat(path=HEARTBEAT_FILE) -> Optional[Dict]:
+    """Lê o último heartbeat (None se não existir ou estiver ilegível)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(record, dict):
+        return None
+    record['age'] = time.time() - float(record.get('timestamp', 0))
+    return record
+
+
+def is_alive(record: Optional[Dict], max_age: float = HEARTBEAT_MAX_AGE) -> bool:
+    """Indica se o heartbeat é recente o suficiente para o bot estar rodando"""
+    return record is not None and record.get('age', max_age) < max_age
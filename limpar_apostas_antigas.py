@@ -34,7 +34,7 @@ def limpar_apostas_antigas():
         cursor.execute("""
             SELECT COUNT(*) as total
             FROM bets
-            WHERE DATE(entry_time) < ?
+            WHERE entry_date < ?
         """, (cutoff_date,))
         
         count_to_delete = cursor.fetchone()['total']
@@ -57,7 +57,7 @@ def limpar_apostas_antigas():
         # Remover apostas antigas
         cursor.execute("""
             DELETE FROM bets
-            WHERE DATE(entry_time) < ?
+            WHERE entry_date < ?
         """, (cutoff_date,))
         
         rows_deleted = cursor.rowcount
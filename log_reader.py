@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Leitura eficiente do log do bot (logs/bot.log)
+
+O log cresce sem limite; ler o arquivo inteiro para ficar só com as últimas
+linhas torna os dashboards mais lentos a cada dia. Aqui as últimas linhas são
+lidas de trás para frente em blocos, e o LogWatcher acompanha o arquivo pelo
+offset e inode, lendo apenas o que foi escrito desde a última leitura (e
+passando para o arquivo novo quando o log é rotacionado ou truncado).
+"""
+
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import List, Optional
+
+# Caminhos onde o log do bot pode estar (local e dentro do container)
+LOG_PATHS = (
+    Path("logs/bot.log"),
+    Path("/app/logs/bot.log"),
+    Path("./logs/bot.log"),
+)
+
+BLOCK_SIZE = 8192
+
+
+def find_log_file() -> Optional[Path]:
+    """Retorna o primeiro arquivo de log existente (None se nenhum)"""
+    for log_file in LOG_PATHS:
+        if log_file.exists():
+            return log_file
+    return None
+
+
+def tail_lines(path, n: int = 200, block_size: int = BLOCK_SIZE) -> List[str]:
+    """
+    Lê as últimas n linhas de um arquivo sem percorrê-lo inteiro
+
+    Lê blocos a partir do fim até encontrar n quebras de linha, então o custo
+    depende de n (e do tamanho das linhas), não do tamanho do arquivo.
+
+    Args:
+        path: Caminho do arquivo
+        n: Número de linhas
+        block_size: Tamanho de cada bloco lido
+
+    Returns:
+        Lista de linhas (com '\\n', como readlines())
+    """
+    if n <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        blocks = []
+        newlines = 0
+
+        # n linhas completas precisam de n+1 quebras (a última linha pode terminar em '\n')
+        while position > 0 and newlines <= n:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+
+    data = b''.join(reversed(blocks))
+    lines = data.decode('utf-8', errors='ignore').splitlines(keepends=True)
+    return lines[-n:]
+
+
+class LogWatcher:
+    """
+    Acompanha um arquivo de log de forma incremental
+
+    Guarda o inode e o offset já lido; cada poll() lê apenas os bytes novos.
+    Se o inode mudar (rotação) ou o arquivo ficar menor que o offset
+    (truncamento), recomeça a partir do fim do arquivo novo. Mantém em memória
+    as últimas max_lines linhas para leituras repetidas.
+    """
+
+    def __init__(self, path=None, max_lines: int = 200):
+        """
+        Args:
+            path: Arquivo a acompanhar (None = procurar em LOG_PATHS a cada leitura)
+            max_lines: Quantidade de linhas recentes mantidas em memória
+        """
+        self.path = Path(path) if path else None
+        self.max_lines = max_lines
+        self.lines = deque(maxlen=max_lines)
+        self._inode = None
+        self._offset = 0
+        self._partial = b''
+        self._lock = threading.Lock()
+
+    def _reset(self, log_file: Path, stat):
+        """Começa a acompanhar um arquivo (novo ou rotacionado) pelas últimas linhas"""
+        self.lines.clear()
+        self.lines.extend(tail_lines(log_file, self.max_lines))
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        self._partial = b''
+        # Uma última linha sem '\n' ainda pode ser completada
+        if self.lines and not self.lines[-1].endswith('\n'):
+            self._partial = self.lines.pop().encode('utf-8')
+
+    def poll(self) -> List[str]:
+        """
+        Lê as linhas novas desde a última chamada
+
+        Returns:
+            Linhas completas escritas desde a última leitura (na primeira
+            chamada, ou após rotação, as últimas max_lines linhas)
+        """
+        with self._lock:
+            log_file = self.path or find_log_file()
+            if log_file is None:
+                return []
+
+            try:
+                stat = log_file.stat()
+            except OSError:
+                return []
+
+            if self._inode != stat.st_ino or stat.st_size < self._offset:
+                self._reset(log_file, stat)
+                return list(self.lines)
+
+            if stat.st_size == self._offset:
+                return []
+
+            with open(log_file, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+            self._offset += len(data)
+
+            data = self._partial + data
+            complete, newline, self._partial = data.rpartition(b'\n')
+            if not newline:
+                return []
+
+            new_lines = (complete + b'\n').decode('utf-8', errors='ignore').splitlines(keepends=True)
+            self.lines.extend(new_lines)
+            return new_lines
+
+    def read(self) -> List[str]:
+        """Atualiza e retorna as últimas max_lines linhas do log"""
+        self.poll()
+        with self._lock:
+            return list(self.lines)
@@ -0,0 +1,93 @@
+"""Testes do cliente BetfairAPI"""
+
+import pytest
+
+from betfair_api import MAX_MARKET_BOOK_WEIGHT, market_book_weight
+
+
+@pytest.mark.parametrize('price_projection, weight', [
+    (None, 2),
+    ({'priceData': ['EX_BEST_OFFERS']}, 5),
+    ({'priceData': ['EX_BEST_OFFERS'], 'exBestOffersOverrides': {'bestPricesDepth': 3}}, 5),
+    # 5 * 4 / 3 = 6.67: arredonda para cima
+    ({'priceData': ['EX_BEST_OFFERS'], 'exBestOffersOverrides': {'bestPricesDepth': 4}}, 7),
+    ({'priceData': ['EX_BEST_OFFERS'], 'exBestOffersOverrides': {'bestPricesDepth': 10}}, 17),
+    ({'priceData': ['EX_BEST_OFFERS', 'EX_TRADED'], 'exBestOffersOverrides': {'bestPricesDepth': 4}}, 24),
+])
+def test_market_book_weight(price_projection, weight):
+    assert market_book_weight(price_projection) == weight
+
+
+def test_list_market_books_chunks_stay_under_weight_limit(make_simulator, monkeypatch):
+    from betfair_api import BetfairAPI
+
+    simulator = make_simulator(soccer_markets=60)
+    api = BetfairAPI('config.ini')
+    assert api.login()
+    chunks = []
+    make_batch_request = api._make_batch_request
+
+    def spy(calls, **kwargs):
+        chunks.extend(len(params['marketIds']) for _, params in calls)
+        return make_batch_request(calls, **kwargs)
+
+    monkeypatch.setattr(api, '_make_batch_request', spy)
+    price_projection = {'priceData': ['EX_BEST_OFFERS'], 'exBestOffersOverrides': {'bestPricesDepth': 4}}
+
+    try:
+        books = api.list_market_books(list(simulator.markets), price_projection=price_projection)
+    finally:
+        api.close()
+
+    assert sorted(books) == sorted(simulator.markets)
+    # Peso real de cada mercado na Exchange: 5 * 4 / 3
+    assert all(size * 5 * 4 / 3 <= MAX_MARKET_BOOK_WEIGHT for size in chunks)
+    assert chunks == [28, 28, 4]
+
+
+class ReorderedResponse:
+    """Resposta HTTP com os itens do batch em outra ordem (o JSON-RPC não garante a ordem)"""
+
+    def __init__(self, response, drop_id=None):
+        self._items = [item for item in reversed(response.json()) if item.get('id') != drop_id]
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._items
+
+
+def test_batch_maps_responses_by_id(simulator, api, monkeypatch):
+    post = api._post
+    monkeypatch.setattr(api, '_post', lambda *args: ReorderedResponse(post(*args), drop_id=4))
+    market_ids = list(simulator.markets)[:2]
+
+    with api.batch() as batch:
+        books = [batch.list_market_book(market_ids=[market_id]) for market_id in market_ids]
+        # Peso acima do limite: só esta chamada falha
+        too_much = batch.list_market_book(market_ids=market_ids * 101)
+        lost = batch.list_current_orders()
+
+    assert [book.result()[0]['marketId'] for book in books] == market_ids
+    with pytest.raises(Exception, match='TOO_MUCH_DATA'):
+        too_much.result()
+    with pytest.raises(Exception, match='Sem resposta'):
+        lost.result()
+
+
+def test_batch_relogs_in_once_on_invalid_session(simulator, api):
+    token = api.session_token
+    with simulator.lock:
+        simulator.sessions.clear()
+    simulator.reset_stats()
+
+    with api.batch() as batch:
+        book = batch.list_market_book(market_ids=[next(iter(simulator.markets))])
+        orders = batch.list_current_orders()
+
+    assert book.result()
+    assert 'currentOrders' in orders.result()
+    assert api.session_token != token
+    # O POST que falhou e o reenvio após o novo login
+    assert simulator.call_counts['listMarketBook'] == 2
@@ -0,0 +1,277 @@
+"""Testes do BetfairTradingBot: varredura do catálogo ao vivo e fechamento de apostas"""
+
+import logging
+from datetime import datetime
+
+import pytest
+
+from conftest import first_selection, place_order
+
+
+def soccer_scan(bot):
+    from betfair_bot import SportType
+
+    return bot._scan_live_catalogue(
+        [bot.get_sport_id(SportType.SOCCER)],
+        bot.get_market_type_codes(SportType.SOCCER)
+    )
+
+
+def live_market_ids(simulator):
+    with simulator.lock:
+        return {market.market_id for market in simulator._live_markets()}
+
+
+def test_scan_finds_every_market_beyond_one_page(make_simulator, make_bot):
+    simulator = make_simulator(soccer_markets=250)
+    bot = make_bot()
+    bot.discovery_page_size = 100
+    simulator.reset_stats()
+
+    markets = soccer_scan(bot)
+
+    assert {market['marketId'] for market in markets} == live_market_ids(simulator)
+    assert len(markets) == 250
+    # Uma listEvents e uma listMarketCatalogue por partição (< 100 mercados cada)
+    assert simulator.call_counts['listEvents'] == 1
+    assert simulator.call_counts['listMarketCatalogue'] == 3
+
+
+def test_scan_with_same_start_minute(make_simulator, make_bot):
+    # Todos os mercados começando no mesmo minuto: paginar pelo horário perderia mercados
+    simulator = make_simulator(soccer_markets=150)
+    with simulator.lock:
+        start_time = next(iter(simulator.markets.values())).start_time
+        for market in simulator.markets.values():
+            market.start_time = start_time
+    bot = make_bot()
+    bot.discovery_page_size = 40
+
+    markets = soccer_scan(bot)
+
+    assert {market['marketId'] for market in markets} == live_market_ids(simulator)
+
+
+def test_scan_warns_when_partitions_are_truncated(make_simulator, make_bot, caplog):
+    make_simulator(soccer_markets=250)
+    bot = make_bot()
+    bot.discovery_page_size = 100
+    bot.discovery_max_pages = 2
+
+    with caplog.at_level(logging.WARNING, logger='betfair_bot'):
+        markets = soccer_scan(bot)
+
+    assert 0 < len(markets) < 250
+    assert any('truncado' in record.getMessage() for record in caplog.records)
+
+
+def make_active_bet(bot_module, bet_id, market_id, selection_id, entry_price, side='BACK'):
+    return bot_module.ActiveBet(
+        bet_id=bet_id, market_id=market_id, event_id='1', sport=bot_module.SportType.SOCCER,
+        strategy='teste', side=side, selection_id=str(selection_id), entry_price=entry_price,
+        entry_time=datetime.now(), stake=2.0, liability=2.0, take_profit_pct=5, stop_loss_pct=5
+    )
+
+
+def market_book(bot, market_id):
+    return bot.api.list_market_book(
+        market_ids=[market_id], price_projection={'priceData': ['EX_BEST_OFFERS']}
+    )[0]
+
+
+def test_check_and_close_bet_reprices_open_bet(simulator, make_bot, monkeypatch):
+    import betfair_bot
+
+    bot = make_bot()
+    market_id = next(iter(simulator.markets))
+    selection_id = first_selection(simulator, market_id)
+    book = market_book(bot, market_id)
+    runner = next(r for r in book['runners'] if r['selectionId'] == selection_id)
+    current_price = runner['ex']['availableToBack'][0]['price']
+
+    prices = []
+    monkeypatch.setattr(bot.db, 'update_bet_price', lambda *args: prices.append(args) or True)
+    bet_id = place_order(bot.api, market_id, selection_id, 900)
+    bet = make_active_bet(betfair_bot, bet_id, market_id, selection_id, current_price)
+
+    assert bot.check_and_close_bet(bet, book) is False
+    assert bet.current_price == current_price
+    assert bet.status == betfair_bot.BetStatus.ACTIVE
+    assert prices == [(bet_id, current_price, bet.profit_loss)]
+
+    # Mesmo preço: nada a gravar
+    bot.check_and_close_bet(bet, book)
+    assert len(prices) == 1
+
+
+def test_check_and_close_bet_closes_on_take_profit_and_stop_loss(simulator, make_bot):
+    import betfair_bot
+
+    bot = make_bot()
+    market_ids = list(simulator.markets)[:2]
+    for market_id, entry_factor, expected in (
+        (market_ids[0], 2.0, betfair_bot.BetStatus.CLOSED_PROFIT),  # preço caiu pela metade
+        (market_ids[1], 0.5, betfair_bot.BetStatus.CLOSED_LOSS),    # preço dobrou
+    ):
+        selection_id = first_selection(simulator, market_id)
+        book = market_book(bot, market_id)
+        runner = next(r for r in book['runners'] if r['selectionId'] == selection_id)
+        current_price = runner['ex']['availableToBack'][0]['price']
+        bet_id = place_order(bot.api, market_id, selection_id, 900)
+        bet = make_active_bet(betfair_bot, bet_id, market_id, selection_id, current_price * entry_factor)
+
+        assert bot.check_and_close_bet(bet, book) is True
+        assert bet.status == expected
+        with simulator.lock:
+            assert simulator.orders[bet_id]['status'] == 'EXECUTION_COMPLETE'
+            assert simulator.orders[bet_id]['sizeCancelled'] == 2.0
+
+
+def test_monitor_records_prices_in_one_batch_and_throttles(simulator, make_bot, monkeypatch):
+    import betfair_bot
+
+    bot = make_bot()
+    batches = []
+    monkeypatch.setattr(bot.db, 'update_bet_prices', lambda prices: batches.append(list(prices)) or len(prices))
+    monkeypatch.setattr(bot.db, 'update_bet_price', lambda *args: pytest.fail('gravação por aposta'))
+
+    market_ids = list(simulator.markets)[:3]
+    for market_id in market_ids:
+        selection_id = first_selection(simulator, market_id)
+        bet_id = place_order(bot.api, market_id, selection_id, 900)
+        # Entrada no preço atual: sem take profit/stop loss
+        with simulator.lock:
+            entry_price = simulator.markets[market_id].runners[0]['price']
+        bet = make_active_bet(betfair_bot, bet_id, market_id, selection_id, entry_price)
+        bet.take_profit_pct = bet.stop_loss_pct = 1000
+        bot.active_bets[bet_id] = bet
+
+    bot.monitor_active_bets()
+    assert len(batches) == 1
+    assert sorted(row[0] for row in batches[0]) == sorted(bot.active_bets)
+
+    # Dentro do intervalo nada é regravado, mesmo que o preço mude
+    for bet in bot.active_bets.values():
+        bet.current_price = None
+    bot._recorded_prices = {bet_id: (0.0, recorded[1]) for bet_id, recorded in bot._recorded_prices.items()}
+    bot.monitor_active_bets()
+    assert len(batches) == 1
+
+    # Passado o intervalo, as apostas cujo preço gravado difere do atual
+    bot.price_update_interval = 0
+    bot.monitor_active_bets()
+    assert len(batches) == 2
+    assert sorted(row[0] for row in batches[1]) == sorted(bot.active_bets)
+
+
+def test_update_bet_prices_writes_one_batch(workdir):
+    from database import BetDatabase
+
+    db = BetDatabase(str(workdir / 'data' / 'prices.db'))
+    try:
+        for i in range(3):
+            assert db.insert_bet({
+                'bet_id': f'b{i}', 'market_id': '1.1', 'sport': 'SOCCER', 'strategy': 'teste',
+                'side': 'BACK', 'selection_id': '1', 'entry_price': 2.0,
+                'entry_time': datetime.now().isoformat(), 'stake': 2.0, 'take_profit_pct': 10,
+                'stop_loss_pct': 10, 'status': 'ACTIVE',
+            })
+
+        assert db.update_bet_prices([('b0', 1.9, 5.0), ('b1', 2.2, -10.0), ('nao-existe', 3.0, 1.0)]) == 2
+        assert (db.get_bet('b0')['current_price'], db.get_bet('b0')['profit_loss']) == (1.9, 5.0)
+        assert db.get_bet('b1')['current_price'] == 2.2
+        assert db.get_bet('b2')['current_price'] is None
+    finally:
+        db.close()
+
+
+def test_catalogue_cache_expires_and_evicts(monkeypatch):
+    import betfair_bot
+    from betfair_bot import MarketCatalogueCache
+
+    now = [1000.0]
+    monkeypatch.setattr(betfair_bot.time, 'monotonic', lambda: now[0])
+    cache = MarketCatalogueCache(ttl_seconds=10, max_size=2)
+    cache.put_many([{'marketId': '1.1'}, {'marketId': '1.2'}])
+
+    assert cache.get('1.1') == {'marketId': '1.1'}
+    # 1.2 é o menos usado e sai quando 1.3 entra
+    cache.put({'marketId': '1.3'})
+    assert '1.2' not in cache
+    assert len(cache) == 2
+
+    now[0] += 10
+    assert cache.get('1.1') is None
+    assert len(cache) == 1
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'hit_rate': 0.5}
+
+
+def test_catalogue_cache_concurrent_access():
+    import sys
+    import threading
+
+    from betfair_bot import MarketCatalogueCache
+
+    # TTL zero: cada get encontra a entrada expirada e a remove enquanto outras threads gravam
+    cache = MarketCatalogueCache(ttl_seconds=0, max_size=50)
+    markets = [{'marketId': f'1.{i}'} for i in range(100)]
+    errors = []
+    gets_per_thread = 2000
+
+    def reader():
+        try:
+            for i in range(gets_per_thread):
+                cache.get(f'1.{i % 100}')
+        except Exception as e:
+            errors.append(e)
+
+    def writer():
+        try:
+            for _ in range(50):
+                cache.put_many(markets)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer) for _ in range(2)]
+    # Trocas de thread frequentes para expor as corridas
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == 4 * gets_per_thread
+    assert stats['size'] <= 50
+
+
+def test_entry_checks_fetch_current_orders_once_per_cycle(make_simulator, make_bot):
+    from betfair_bot import SportType
+
+    simulator = make_simulator(soccer_markets=10)
+    bot = make_bot()
+    bot.begin_cycle()
+    matches = bot.discover_live_markets([SportType.SOCCER])[SportType.SOCCER]
+    # Odd mínima inalcançável: todo mercado retorna cedo, depois do batch
+    bot.soccer_config['min_odd'] = 1000
+    simulator.reset_stats()
+
+    for match in matches:
+        assert bot.check_soccer_entry_conditions(match['market_id'], match['under_runner_id']) is None
+
+    assert len(matches) == 10
+    assert simulator.call_counts['listCurrentOrders'] == 1
+    assert 'current_orders' in bot.cycle_snapshot
+
+
+def test_confirm_placed_bets_reports_lost_bets(simulator, make_bot, monkeypatch):
+    bot = make_bot()
+    monkeypatch.setattr(bot.db, 'confirm_inserts', lambda timeout: ['1001'])
+
+    assert bot.confirm_placed_bets() == ['1001']
+    assert '1001' in bot.last_error
@@ -0,0 +1,95 @@
+"""Testes do cancelamento em massa (MassCancel)"""
+
+import pytest
+
+from cancelar_todas_apostas import CANCEL_MAX_INSTRUCTIONS, MassCancel
+from conftest import first_selection, place_order
+
+
+@pytest.fixture
+def open_orders(simulator, api):
+    """Ordens não casadas (BACK a 900): 70 em um mercado e 5 em outro"""
+    market_ids = list(simulator.markets)[:2]
+    bet_ids = []
+    for market_id, count in zip(market_ids, (70, 5)):
+        selection_id = first_selection(simulator, market_id)
+        bet_ids.extend(place_order(api, market_id, selection_id, 900) for _ in range(count))
+    simulator.reset_stats()
+    return bet_ids
+
+
+def executable_orders(simulator):
+    with simulator.lock:
+        return [order for order in simulator.orders.values() if order['status'] == 'EXECUTABLE']
+
+
+def record_refs(api, monkeypatch, fail_calls=0):
+    """Registra o customerRef de cada cancelOrders; as primeiras fail_calls chamadas falham"""
+    refs = []
+    cancel_orders = api.cancel_orders
+
+    def spy(*args, **kwargs):
+        refs.append(kwargs.get('customer_ref'))
+        if len(refs) <= fail_calls:
+            return {'status': 'FAILURE', 'errorCode': 'SERVICE_BUSY'}
+        return cancel_orders(*args, **kwargs)
+
+    monkeypatch.setattr(api, 'cancel_orders', spy)
+    return refs
+
+
+def test_fetch_orders_follows_pages(simulator, api, open_orders, monkeypatch):
+    iter_current_orders = api.iter_current_orders
+    monkeypatch.setattr(
+        api, 'iter_current_orders',
+        lambda **kwargs: iter_current_orders(**dict(kwargs, record_count=20))
+    )
+
+    orders = MassCancel(api).fetch_orders()
+
+    assert sorted(order['betId'] for order in orders) == sorted(open_orders)
+    assert simulator.call_counts['listCurrentOrders'] == 4
+
+
+def test_cancel_by_market_splits_instructions(simulator, api, open_orders):
+    engine = MassCancel(api)
+
+    outcomes = engine.cancel_by_market(engine.group_by_market(engine.fetch_orders()))
+
+    assert sorted(bet_id for _, bet_id, _ in outcomes) == sorted(open_orders)
+    assert all(error is None for _, _, error in outcomes)
+    assert executable_orders(simulator) == []
+    # 70 ordens em blocos de até 60 instruções + 1 chamada para o outro mercado
+    assert 70 > CANCEL_MAX_INSTRUCTIONS
+    assert simulator.call_counts['cancelOrders'] == 3
+
+
+def test_verify_sweeps_leftovers_with_unique_refs(simulator, api, open_orders, monkeypatch):
+    # A primeira rodada falha em todas as chamadas; a segunda cancela o que sobrou
+    refs = record_refs(api, monkeypatch, fail_calls=3)
+
+    remaining = MassCancel(api).verify(rounds=2)
+
+    assert remaining == []
+    assert executable_orders(simulator) == []
+    assert len(refs) == 6
+    assert len(set(refs)) == len(refs)
+
+
+def test_verify_returns_orders_that_stay_executable(simulator, api, open_orders, monkeypatch):
+    refs = record_refs(api, monkeypatch, fail_calls=1000)
+
+    remaining = MassCancel(api).verify(rounds=2)
+
+    assert sorted(order['betId'] for order in remaining) == sorted(open_orders)
+    assert len(refs) == 6
+    assert len(set(refs)) == len(refs)
+
+
+def test_cancel_all_markets_without_listing(simulator, api, open_orders):
+    outcomes = MassCancel(api).cancel_all_markets()
+
+    assert sorted(bet_id for _, bet_id, _ in outcomes) == sorted(open_orders)
+    assert all(error is None for _, _, error in outcomes)
+    assert executable_orders(simulator) == []
+    assert simulator.call_counts.get('listCurrentOrders', 0) == 0
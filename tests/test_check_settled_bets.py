@@ -0,0 +1,168 @@
+"""Testes da sincronização incremental de ordens liquidadas (ClearedOrdersSync)"""
+
+from datetime import datetime
+
+import pytest
+
+from check_settled_bets import CLEARED_ORDERS_WATERMARK_KEY, ClearedOrdersSync
+from conftest import first_selection, place_order
+from database import BetDatabase
+
+
+def settle_markets_with_orders(simulator, api, count):
+    """Coloca uma ordem casada em count mercados e liquida esses mercados"""
+    market_ids = list(simulator.markets)[:count]
+    for market_id in market_ids:
+        # BACK a 1.01 casa na hora (qualquer odd disponível é maior)
+        place_order(api, market_id, first_selection(simulator, market_id), 1.01)
+    with simulator.lock:
+        for market_id in market_ids:
+            market = simulator.markets[market_id]
+            market.close()
+            simulator._settle_market(market)
+    return market_ids
+
+
+@pytest.fixture(params=[False, True], ids=['direto', 'write-behind'])
+def db(request, workdir):
+    database = BetDatabase(str(workdir / 'data' / 'bets.db'))
+    if request.param:
+        database.start_writer(flush_interval=0.05)
+    yield database
+    database.close()
+
+
+def test_sync_pages_and_advances_watermark(simulator, api, db):
+    settle_markets_with_orders(simulator, api, 5)
+    with simulator.lock:
+        latest = max(order['settledDate'] for order in simulator.cleared_orders)
+
+    summary = ClearedOrdersSync(api, db, page_size=2).run()
+
+    assert summary['cleared'] == 5
+    assert summary['watermark'] == latest
+    assert db.get_sync_state(CLEARED_ORDERS_WATERMARK_KEY) == latest
+
+    # Próxima execução começa da marca d'água: só as ordens daquele instante voltam
+    simulator.reset_stats()
+    summary = ClearedOrdersSync(api, db, page_size=2).run()
+    with simulator.lock:
+        at_watermark = sum(1 for order in simulator.cleared_orders if order['settledDate'] == latest)
+    assert summary['cleared'] == at_watermark
+
+
+def test_failed_page_keeps_watermark(simulator, api, db, monkeypatch):
+    settle_markets_with_orders(simulator, api, 5)
+    db.set_sync_state(CLEARED_ORDERS_WATERMARK_KEY, '2000-01-01T00:00:00.000Z')
+
+    write = db._update_settled_bets_sql
+    calls = []
+
+    def fail_second_page(cursor, rows):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError('disco cheio')
+        return write(cursor, rows)
+
+    monkeypatch.setattr(db, '_update_settled_bets_sql', fail_second_page)
+
+    summary = ClearedOrdersSync(api, db, page_size=2).run()
+
+    assert len(calls) == 3
+    assert summary['cleared'] == 5
+    assert summary['watermark'] == '2000-01-01T00:00:00.000Z'
+    assert db.get_sync_state(CLEARED_ORDERS_WATERMARK_KEY) == '2000-01-01T00:00:00.000Z'
+
+    # Com a gravação normalizada, a janela inteira é repetida e a marca avança
+    monkeypatch.setattr(db, '_update_settled_bets_sql', write)
+    summary = ClearedOrdersSync(api, db, page_size=2).run()
+    assert summary['cleared'] == 5
+    assert db.get_sync_state(CLEARED_ORDERS_WATERMARK_KEY) == summary['watermark'] > '2000'
+
+
+def test_api_error_keeps_watermark(simulator, api, db, monkeypatch):
+    settle_markets_with_orders(simulator, api, 3)
+    db.set_sync_state(CLEARED_ORDERS_WATERMARK_KEY, '2000-01-01T00:00:00.000Z')
+
+    def fail(**kwargs):
+        yield from ()
+        raise Exception('Erro da API: TOO_MUCH_DATA')
+
+    monkeypatch.setattr(api, 'iter_cleared_orders', fail)
+
+    with pytest.raises(Exception, match='TOO_MUCH_DATA'):
+        ClearedOrdersSync(api, db).run()
+    assert db.get_sync_state(CLEARED_ORDERS_WATERMARK_KEY) == '2000-01-01T00:00:00.000Z'
+
+
+def insert_bet(db, bet_id, market_id, selection_id, stake):
+    assert db.insert_bet({
+        'bet_id': bet_id, 'market_id': market_id, 'sport': 'SOCCER', 'strategy': 'teste',
+        'side': 'BACK', 'selection_id': str(selection_id), 'entry_price': 1.01,
+        'entry_time': datetime.now().isoformat(), 'stake': stake, 'take_profit_pct': 10,
+        'stop_loss_pct': 10, 'status': 'ACTIVE',
+    })
+
+
+def settle_with_winner(simulator, api, db, market_id, stakes):
+    """
+    Aposta BACK a 1.01 (casa na hora) nos runners do mercado com os stakes dados
+    (None = sem aposta) e liquida o mercado com o primeiro runner vencedor
+
+    Returns:
+        list: bet_id de cada runner (None onde não houve aposta)
+    """
+    with simulator.lock:
+        selection_ids = [runner['selectionId'] for runner in simulator.markets[market_id].runners]
+    bet_ids = []
+    for selection_id, stake in zip(selection_ids, stakes):
+        bet_id = None
+        if stake:
+            bet_id = place_order(api, market_id, selection_id, 1.01, size=stake)
+            insert_bet(db, bet_id, market_id, selection_id, stake)
+        bet_ids.append(bet_id)
+    with simulator.lock:
+        market = simulator.markets[market_id]
+        market.close()
+        market.winner_id = selection_ids[0]
+        simulator._settle_market(market)
+    return bet_ids
+
+
+def test_sync_writes_gross_and_net_profit(simulator, api, db):
+    winning_market, losing_market = list(simulator.markets)[:2]
+    # Mercado com lucro: +5.00 (500 a 1.01) e -2.00 -> comissão de 5% sobre 3.00
+    winner, loser = settle_with_winner(simulator, api, db, winning_market, [500, 2])
+    # Mercado com prejuízo: só a aposta perdedora, sem comissão
+    _, only_loser = settle_with_winner(simulator, api, db, losing_market, [None, 2])
+
+    summary = ClearedOrdersSync(api, db).run()
+
+    assert summary['cleared_updated'] == 3
+    rows = {bet_id: db.get_bet(bet_id) for bet_id in (winner, loser, only_loser)}
+    assert rows[winner]['gross_profit'] == pytest.approx(5.0)
+    assert rows[winner]['net_profit'] == pytest.approx(5.0 - 0.15)
+    assert rows[winner]['status'] == 'CLOSED_PROFIT'
+    assert rows[loser]['gross_profit'] == pytest.approx(-2.0)
+    assert rows[loser]['net_profit'] == pytest.approx(-2.0)
+    assert rows[loser]['status'] == 'CLOSED_LOSS'
+    assert rows[only_loser]['net_profit'] == pytest.approx(-2.0)
+    assert all(row['settled_date'] for row in rows.values())
+
+    # Soma líquida do mercado = lucro do mercado - comissão cobrada pela exchange
+    with simulator.lock:
+        commission = simulator.market_commissions[winning_market]
+    assert commission == pytest.approx(0.15)
+    assert rows[winner]['net_profit'] + rows[loser]['net_profit'] == pytest.approx(3.0 - commission)
+
+
+def test_net_profit_is_null_without_market_commission(simulator, api, db, monkeypatch):
+    market_id = next(iter(simulator.markets))
+    winner, _ = settle_with_winner(simulator, api, db, market_id, [500, None])
+    monkeypatch.setattr(api, 'get_market_commissions', lambda market_ids: {})
+
+    ClearedOrdersSync(api, db).run()
+
+    row = db.get_bet(winner)
+    assert row['gross_profit'] == pytest.approx(5.0)
+    assert row['net_profit'] is None
@@ -0,0 +1,135 @@
+"""Testes da API do dashboard: cache com ETag/304, gzip e jobs em segundo plano"""
+
+import gzip
+import threading
+from datetime import datetime
+
+import pytest
+
+from database import BetDatabase
+
+
+def insert_bets(db, count, start=0):
+    for i in range(start, start + count):
+        assert db.insert_bet({
+            'bet_id': f'b{i}', 'market_id': '1.1', 'event_name': f'Time {i} x Time {i + 1}',
+            'sport': 'SOCCER', 'strategy': 'teste', 'side': 'BACK', 'selection_id': '1',
+            'entry_price': 2.0, 'entry_time': datetime.now().isoformat(), 'stake': 2.0,
+            'take_profit_pct': 10, 'stop_loss_pct': 10, 'status': 'ACTIVE',
+        })
+
+
+@pytest.fixture
+def dashboard(workdir, monkeypatch):
+    import dashboard_api
+
+    db = BetDatabase(str(workdir / 'data' / 'bets.db'))
+    monkeypatch.setattr(dashboard_api, 'db', db)
+    dashboard_api._response_cache.clear()
+    yield dashboard_api
+    dashboard_api._response_cache.clear()
+    db.close()
+
+
+@pytest.fixture
+def client(dashboard):
+    return dashboard.app.test_client()
+
+
+def test_conditional_get_returns_304_until_data_changes(dashboard, client):
+    insert_bets(dashboard.db, 1)
+
+    response = client.get('/api/bets/history')
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert weak
+    assert response.json['count'] == 1
+
+    response = client.get('/api/bets/history', headers={'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.get_etag() == (etag, True)
+
+    # Escrita no banco muda a versão: o ETag antigo não vale mais
+    insert_bets(dashboard.db, 1, start=1)
+    response = client.get('/api/bets/history', headers={'If-None-Match': f'W/"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    assert response.json['count'] == 2
+
+
+def test_etag_depends_on_query_string(dashboard, client):
+    insert_bets(dashboard.db, 1)
+
+    all_bets = client.get('/api/bets/history')
+    active = client.get('/api/bets/history?status=active')
+
+    assert all_bets.get_etag() != active.get_etag()
+
+
+def test_large_responses_are_gzipped_when_accepted(dashboard, client):
+    insert_bets(dashboard.db, 20)
+
+    plain = client.get('/api/bets/history')
+    compressed = client.get('/api/bets/history', headers={'Accept-Encoding': 'gzip'})
+
+    assert len(plain.data) >= dashboard.GZIP_MIN_SIZE
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.get_etag() == plain.get_etag()
+
+
+def test_small_responses_are_not_gzipped(dashboard, client):
+    response = client.get('/api/balance/history', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert len(response.data) < dashboard.GZIP_MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_concurrent_jobs_with_same_key_are_deduplicated(dashboard, client, monkeypatch):
+    runner = dashboard.JobRunner(workers=2)
+    monkeypatch.setattr(dashboard, 'job_runner', runner)
+    release = threading.Event()
+    runs = []
+
+    def slow_check(job):
+        runs.append(job.id)
+        job.report('verificando')
+        release.wait(10)
+        return {'success': True}, 200
+
+    monkeypatch.setattr(dashboard, 'run_check_all_settled', slow_check)
+    monkeypatch.setattr(dashboard, 'run_check_bet_settled', lambda job, bet_id: ({'success': True}, 200))
+
+    first = client.post('/api/bets/check-all-settled')
+    second = client.post('/api/bets/check-all-settled')
+    assert (first.status_code, second.status_code) == (202, 202)
+    assert first.json['deduplicated'] is False
+    assert second.json['deduplicated'] is True
+    assert second.json['job_id'] == first.json['job_id']
+
+    # Chaves diferentes não são deduplicadas
+    other = client.post('/api/bet/b1/check-settled')
+    assert other.json['job_id'] != first.json['job_id']
+
+    release.set()
+    job = runner.get(first.json['job_id'])
+    version, state = None, job.to_dict()
+    for _ in range(50):
+        if state['status'] == 'done':
+            break
+        version, state = runner.wait(job, version, timeout=0.1)
+
+    status = client.get(first.json['status_url']).json
+    assert status['status'] == 'done'
+    assert status['result'] == {'success': True}
+    assert [entry['message'] for entry in status['progress']] == ['verificando']
+    assert runs == [first.json['job_id']]
+
+    # Terminado o job, um novo pedido cria outro
+    third = client.post('/api/bets/check-all-settled')
+    assert third.json['deduplicated'] is False
+    assert third.json['job_id'] != first.json['job_id']
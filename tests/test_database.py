@@ -0,0 +1,306 @@
+"""Testes do BetDatabase: escritor em segundo plano (ordem, barreiras, falhas e parada)"""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from database import SCHEMA_VERSION, BetDatabase
+
+
+def bet_data(bet_id, **overrides):
+    data = {
+        'bet_id': bet_id, 'market_id': '1.1', 'sport': 'SOCCER', 'strategy': 'teste',
+        'side': 'BACK', 'selection_id': '1', 'entry_price': 2.0,
+        'entry_time': datetime.now().isoformat(), 'stake': 2.0, 'take_profit_pct': 10,
+        'stop_loss_pct': 10, 'status': 'ACTIVE',
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def db(workdir):
+    database = BetDatabase(str(workdir / 'data' / 'bets.db'))
+    yield database
+    database.close()
+
+
+def test_writer_keeps_submission_order(db):
+    db.start_writer(flush_interval=0.05, max_batch=7)
+    db.insert_bet(bet_data('b1'))
+    for i in range(50):
+        db.update_bet('b1', {'current_price': 2.0 + i / 100})
+
+    assert db.flush(timeout=5)
+    assert db.get_bet('b1')['current_price'] == 2.49
+    assert db.confirm_inserts(timeout=1) == []
+    assert db._pending_inserts == {}
+
+
+def test_flush_reports_failures_since_previous_barrier(db):
+    db.start_writer(flush_interval=0.05)
+    db.insert_bet(bet_data('b1'))
+    assert db.flush(timeout=5)
+
+    # Aposta duplicada: a escrita é ignorada e a próxima barreira reporta a falha
+    db.insert_bet(bet_data('b1'))
+    db.insert_bet(bet_data('b2'))
+    assert db.flush(timeout=5) is False
+    assert db.get_bet('b2') is not None
+    assert db._writer.failed == 1
+
+    # A falha é reportada uma única vez
+    assert db.flush(timeout=5)
+
+
+def test_confirm_inserts_requeues_lost_bet(db, monkeypatch):
+    db.start_writer(flush_interval=0.05)
+    insert_sql = db._insert_bet_sql
+
+    def failing_insert(cursor, data):
+        raise sqlite3.DatabaseError('disco cheio')
+
+    monkeypatch.setattr(db, '_insert_bet_sql', failing_insert)
+    db.insert_bet(bet_data('b1'))
+    assert db._pending_inserts['b1'][1].wait(5) is False
+    assert db.get_bet('b1') is None
+
+    # A barreira falhou: a aposta é reenfileirada (agora com a escrita funcionando)
+    monkeypatch.setattr(db, '_insert_bet_sql', insert_sql)
+    assert db.confirm_inserts(timeout=5) == []
+    assert db._pending_inserts['b1'][2] == 2
+    assert db.confirm_inserts(timeout=5) == []
+    assert db.get_bet('b1') is not None
+    assert db._pending_inserts == {}
+
+
+def test_confirm_inserts_gives_up_after_max_attempts(db, monkeypatch):
+    db.start_writer(flush_interval=0.05)
+
+    def failing_insert(cursor, data):
+        raise sqlite3.DatabaseError('disco cheio')
+
+    monkeypatch.setattr(db, '_insert_bet_sql', failing_insert)
+    db.insert_bet(bet_data('b1'))
+
+    assert db.confirm_inserts(timeout=5, max_attempts=2) == []
+    assert db.confirm_inserts(timeout=5, max_attempts=2) == ['b1']
+    assert db._pending_inserts == {}
+
+
+def test_stop_keeps_live_writer_until_it_exits(db, monkeypatch):
+    writer = db.start_writer(flush_interval=0.05)
+    release = threading.Event()
+    write_batch = writer._write_batch
+
+    def slow_write_batch(batch, durable):
+        release.wait(10)
+        return write_batch(batch, durable)
+
+    monkeypatch.setattr(writer, '_write_batch', slow_write_batch)
+    db.insert_bet(bet_data('b1'))
+
+    # O escritor está preso gravando: stop não termina e close mantém escritor e pool
+    assert writer.stop(timeout=0.2) is False
+    assert writer.running
+    db.close(timeout=0.2)
+    assert db._writer is writer
+
+    # Escritas novas continuam na fila (não são gravadas em paralelo com a thread)
+    db.update_bet('b1', {'current_price': 3.0})
+    assert writer.pending >= 1
+
+    release.set()
+    assert writer.stop(timeout=5)
+    assert not writer.running
+    db.close()
+    assert db._writer is None
+    assert db.get_bet('b1')['current_price'] == 3.0
+
+
+def test_close_discards_data_version_connection(db):
+    assert db.get_data_version() is not None
+    assert db._version_conn is not None
+
+    db.close()
+    assert db._version_conn is None
+
+    # Uma nova leitura reabre a conexão dedicada
+    version = db.get_data_version()
+    db.insert_bet(bet_data('b1'))
+    assert db.get_data_version() != version
+
+
+def query(db, sql, params=()):
+    conn = db._get_connection()
+    try:
+        return [tuple(row) for row in conn.execute(sql, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def execute(db, sql, params=()):
+    conn = db._get_connection()
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def seed_bet_history(db):
+    """Apostas em três dias e três esportes, com fechamentos, correções e exclusão"""
+    days = ['2026-01-01T10:00:00', '2026-01-02T11:00:00', '2026-01-03T12:00:00']
+    sports = ['SOCCER', 'ICE_HOCKEY', 'TENNIS']
+    for i in range(12):
+        db.insert_bet(bet_data(f'b{i}', entry_time=days[i % 3], sport=sports[i % 3], stake=2.0 + i))
+    db.close_bet('b0', 'CLOSED_PROFIT', 10.0, 'take_profit', 1.8)
+    db.close_bet('b1', 'CLOSED_LOSS', -5.0, 'stop_loss', 2.2)
+    db.close_bet('b2', 'CLOSED_TIMEOUT', 1.5, 'timeout', 2.0)
+    db.close_bet('b3', 'CLOSED_PROFIT', 4.0, 'take_profit', 1.9)
+    # Correções: a aposta muda de dia/esporte e um fechamento é revertido
+    db.update_bet('b4', {'entry_time': days[2], 'sport': 'TENNIS'})
+    db.update_bet('b3', {'status': 'ACTIVE', 'profit_loss': None})
+    db.update_bet('b5', {'stake': 50.0})
+    # O dia 2026-01-01 fica só com apostas de b6 e b9 depois da exclusão
+    execute(db, "DELETE FROM bets WHERE bet_id IN ('b0', 'b3')")
+
+
+DAILY_STATS_SQL = """
+    SELECT date, total_bets, profit_bets, loss_bets, ROUND(total_profit, 6),
+           soccer_bets, hockey_bets, tennis_bets
+    FROM daily_stats WHERE total_bets != 0 ORDER BY date
+"""
+
+
+def test_daily_stats_triggers_match_rebuild(db):
+    seed_bet_history(db)
+    maintained = query(db, DAILY_STATS_SQL)
+
+    assert db.rebuild_daily_stats()
+    rebuilt = query(db, DAILY_STATS_SQL)
+
+    assert maintained == rebuilt
+    assert [row[0] for row in rebuilt] == ['2026-01-01', '2026-01-02', '2026-01-03']
+
+
+BET_STATS_SQL = """
+    SELECT sport, status, bet_count, ROUND(total_stake, 6), ROUND(total_profit, 6)
+    FROM bet_stats WHERE bet_count != 0 ORDER BY sport, status
+"""
+
+
+def test_bet_stats_triggers_match_rebuild(db):
+    seed_bet_history(db)
+    maintained = query(db, BET_STATS_SQL)
+
+    assert db.check_bet_stats() == []
+    assert db.rebuild_bet_stats()
+    assert query(db, BET_STATS_SQL) == maintained
+
+    stats = db.get_statistics()
+    assert stats['total_bets'] == 10
+    assert stats['active_bets'] == 8
+    assert (stats['profit_bets'], stats['loss_bets']) == (0, 1)
+    assert stats['total_profit'] == pytest.approx(-5.0 * 3.0 / 100 + 1.5 * 4.0 / 100)
+    assert (stats['soccer_bets'], stats['hockey_bets'], stats['tennis_bets']) == (2, 3, 5)
+
+
+def test_check_bet_stats_detects_and_repairs_drift(db):
+    seed_bet_history(db)
+    execute(db, "UPDATE bet_stats SET bet_count = bet_count + 5 WHERE sport = 'SOCCER' AND status = 'ACTIVE'")
+
+    mismatches = db.check_bet_stats(repair=True)
+
+    assert [(m['sport'], m['status'], m['stored_count'] - m['actual_count']) for m in mismatches] == [
+        ('SOCCER', 'ACTIVE', 5)
+    ]
+    assert db.check_bet_stats() == []
+
+
+# Esquema original (antes das migrações): sem entry_date, bet_stats, triggers e user_version
+BASELINE_SCHEMA = """
+    CREATE TABLE bets (
+        bet_id TEXT PRIMARY KEY, market_id TEXT NOT NULL, event_id TEXT, event_name TEXT,
+        sport TEXT NOT NULL, strategy TEXT NOT NULL, side TEXT NOT NULL, selection_id TEXT NOT NULL,
+        entry_price REAL NOT NULL, entry_time TIMESTAMP NOT NULL, stake REAL NOT NULL,
+        liability REAL DEFAULT 0, take_profit_pct REAL NOT NULL, stop_loss_pct REAL NOT NULL,
+        status TEXT NOT NULL, current_price REAL, profit_loss REAL, close_reason TEXT,
+        close_time TIMESTAMP, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE daily_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date DATE NOT NULL UNIQUE,
+        total_bets INTEGER DEFAULT 0, profit_bets INTEGER DEFAULT 0, loss_bets INTEGER DEFAULT 0,
+        total_profit REAL DEFAULT 0.0, soccer_bets INTEGER DEFAULT 0, hockey_bets INTEGER DEFAULT 0,
+        tennis_bets INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE balance_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        available REAL NOT NULL, total REAL NOT NULL, exposure REAL DEFAULT 0
+    );
+    CREATE INDEX idx_bets_status ON bets(status);
+    CREATE INDEX idx_bets_sport ON bets(sport);
+    CREATE INDEX idx_bets_entry_time ON bets(entry_time);
+    CREATE INDEX idx_daily_stats_date ON daily_stats(date);
+"""
+
+
+def test_baseline_database_migrates(workdir):
+    path = workdir / 'data' / 'legacy.db'
+    legacy = sqlite3.connect(str(path))
+    legacy.executescript(BASELINE_SCHEMA)
+    legacy.executemany("""
+        INSERT INTO bets (bet_id, market_id, sport, strategy, side, selection_id, entry_price,
+                          entry_time, stake, take_profit_pct, stop_loss_pct, status, profit_loss)
+        VALUES (?, '1.1', ?, 'teste', 'BACK', '1', 2.0, ?, 2.0, 10, 10, ?, ?)
+    """, [
+        ('b1', 'Soccer', '2026-01-01T10:00:00', 'closed_profit', 10.0),
+        ('b2', 'SportType.ICE_HOCKEY', '2026-01-01T11:00:00', 'BetStatus.CLOSED_LOSS', -5.0),
+        ('b3', 'hockey', '2026-01-02T10:00:00', 'active', None),
+        ('b4', 'TENNIS', '2026-01-02T11:00:00', 'ACTIVE', None),
+    ])
+    # daily_stats desatualizada (era recalculada só de vez em quando)
+    legacy.execute("INSERT INTO daily_stats (date, total_bets) VALUES ('2026-01-01', 1)")
+    legacy.commit()
+    legacy.close()
+
+    db = BetDatabase(str(path))
+    try:
+        assert query(db, "SELECT bet_id, sport, status FROM bets ORDER BY bet_id") == [
+            ('b1', 'SOCCER', 'CLOSED_PROFIT'),
+            ('b2', 'ICE_HOCKEY', 'CLOSED_LOSS'),
+            ('b3', 'ICE_HOCKEY', 'ACTIVE'),
+            ('b4', 'TENNIS', 'ACTIVE'),
+        ]
+        assert query(db, "PRAGMA user_version") == [(SCHEMA_VERSION,)]
+        assert query(db, "SELECT entry_date FROM bets WHERE bet_id = 'b3'") == [('2026-01-02',)]
+
+        indexes = {name for (name,) in query(db, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_bets_status' not in indexes
+        assert {'idx_bets_status_entry_time', 'idx_bets_market_status', 'idx_bets_entry_date'} <= indexes
+
+        # Estatísticas reconstruídas a partir das apostas existentes
+        assert query(db, DAILY_STATS_SQL) == [
+            ('2026-01-01', 2, 1, 1, 0.1, 1, 1, 0),
+            ('2026-01-02', 2, 0, 0, 0.0, 0, 1, 1),
+        ]
+        assert db.check_bet_stats() == []
+        assert sorted(bet['bet_id'] for bet in db.get_bets_by_status('active')) == ['b3', 'b4']
+
+        plan = ' '.join(row[-1] for row in query(
+            db, "EXPLAIN QUERY PLAN SELECT * FROM bets WHERE status = 'ACTIVE' ORDER BY entry_time DESC"
+        ))
+        assert 'idx_bets_status_entry_time' in plan
+    finally:
+        db.close()
+
+    # Reabrir não migra de novo nem altera os dados
+    db = BetDatabase(str(path))
+    try:
+        assert query(db, DAILY_STATS_SQL)[0] == ('2026-01-01', 2, 1, 1, 0.1, 1, 1, 0)
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+"""Testes do planejamento do cash out em massa (CashoutEngine.plan)"""
+
+from conftest import first_selection, place_order
+from fazer_cashout import CashoutEngine, calculate_hedge_stake, group_positions
+
+
+def matched_positions(simulator, api, market_ids):
+    """BACK casado (a 1.01) em cada mercado, mais uma ordem não casada que deve ser ignorada"""
+    for market_id in market_ids:
+        place_order(api, market_id, first_selection(simulator, market_id), 1.01)
+    place_order(api, market_ids[0], first_selection(simulator, market_ids[0]), 900)
+    return group_positions(api.list_current_orders()['currentOrders'])
+
+
+def test_plan_hedges_every_position_with_one_book_request(simulator, api, monkeypatch):
+    market_ids = list(simulator.markets)[:3]
+    positions = matched_positions(simulator, api, market_ids)
+    simulator.reset_stats()
+
+    # Guardar os books usados no plano (as odds do simulador andam com o tempo)
+    books = {}
+    list_market_books = api.list_market_books
+    monkeypatch.setattr(api, 'list_market_books',
+                        lambda *args, **kwargs: books.update(list_market_books(*args, **kwargs)) or books)
+
+    plans, failures = CashoutEngine(api).plan(positions)
+
+    assert failures == []
+    assert sorted(plans) == sorted(market_ids)
+    assert simulator.call_counts == {'listMarketBook': 1}
+
+    for market_id, market_plans in plans.items():
+        [(position, hedge)] = market_plans
+        runner = next(r for r in books[market_id]['runners'] if r['selectionId'] == position['selection_id'])
+        lay_price = runner['ex']['availableToLay'][0]['price']
+        assert hedge['side'] == 'LAY'
+        assert hedge['price'] == lay_price
+        assert hedge['stake'] == calculate_hedge_stake(position['back_stake'], position['back_price'], lay_price)
+        assert hedge['instruction']['selectionId'] == position['selection_id']
+
+
+def test_plan_reports_unavailable_markets(simulator, api):
+    market_ids = list(simulator.markets)[:2]
+    positions = matched_positions(simulator, api, market_ids)
+    with simulator.lock:
+        simulator.markets[market_ids[1]].close()
+    positions['1.999999'] = {
+        1: {'market_id': '1.999999', 'selection_id': 1, 'back_stake': 2.0, 'back_price': 2.0,
+            'lay_stake': 0, 'lay_price': 0, 'orders': []}
+    }
+
+    plans, failures = CashoutEngine(api).plan(positions)
+
+    assert list(plans) == [market_ids[0]]
+    reasons = {position['market_id']: reason for position, reason in failures}
+    assert reasons['1.999999'] == "Não foi possível obter odds atuais do mercado"
+    assert reasons[market_ids[1]] == "Mercado não está aberto (status: CLOSED)"
+
+
+def test_fetch_orders_reads_every_page(simulator, api, monkeypatch):
+    market_id = next(iter(simulator.markets))
+    selection_id = first_selection(simulator, market_id)
+    bet_ids = [place_order(api, market_id, selection_id, 1.01) for _ in range(25)]
+    iter_current_orders = api.iter_current_orders
+    monkeypatch.setattr(
+        api, 'iter_current_orders',
+        lambda **kwargs: iter_current_orders(**dict(kwargs, record_count=10))
+    )
+    simulator.reset_stats()
+
+    orders = CashoutEngine(api).fetch_orders()
+
+    assert sorted(order['betId'] for order in orders) == sorted(bet_ids)
+    assert simulator.call_counts['listCurrentOrders'] == 3
+
+
+def test_execute_places_hedges_with_unique_refs(simulator, api, monkeypatch):
+    market_ids = list(simulator.markets)[:3]
+    positions = matched_positions(simulator, api, market_ids)
+    refs = []
+    place_orders = api.place_orders
+
+    def spy(*args, **kwargs):
+        refs.append(kwargs.get('customer_ref'))
+        return place_orders(*args, **kwargs)
+
+    monkeypatch.setattr(api, 'place_orders', spy)
+    engine = CashoutEngine(api)
+
+    # Duas execuções no mesmo segundo (ex: nova tentativa) não repetem referências
+    for _ in range(2):
+        plans, _ = engine.plan(positions)
+        outcomes = engine.execute(plans)
+        assert len(outcomes) == 3
+        assert all(bet_id and error is None for _, _, bet_id, error in outcomes)
+
+    assert len(refs) == 6
+    assert len(set(refs)) == len(refs)
+    assert all(len(ref) <= 32 for ref in refs)
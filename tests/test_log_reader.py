@@ -0,0 +1,79 @@
+"""Testes de log_reader: tail_lines e LogWatcher (incremental, rotação e truncamento)"""
+
+import os
+
+from log_reader import LogWatcher, tail_lines
+
+
+def write_lines(path, start, count, mode='a'):
+    with open(path, mode) as f:
+        for i in range(start, start + count):
+            f.write(f"linha {i}\n")
+
+
+def test_tail_lines_reads_only_the_end(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    write_lines(log_file, 0, 1000, mode='w')
+
+    # Blocos pequenos: a leitura atravessa várias fronteiras de bloco
+    assert tail_lines(log_file, 3, block_size=7) == ['linha 997\n', 'linha 998\n', 'linha 999\n']
+    assert tail_lines(log_file, 5000) == [f"linha {i}\n" for i in range(1000)]
+    assert tail_lines(log_file, 0) == []
+
+
+def test_tail_lines_without_trailing_newline(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    log_file.write_text("a\nb\nc")
+
+    assert tail_lines(log_file, 2, block_size=2) == ['b\n', 'c']
+
+
+def test_watcher_returns_only_new_complete_lines(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    write_lines(log_file, 0, 10, mode='w')
+    watcher = LogWatcher(log_file, max_lines=5)
+
+    assert watcher.poll() == [f"linha {i}\n" for i in range(5, 10)]
+    assert watcher.poll() == []
+
+    write_lines(log_file, 10, 2)
+    assert watcher.poll() == ['linha 10\n', 'linha 11\n']
+
+    # Linha parcial só aparece quando for completada
+    with open(log_file, 'a') as f:
+        f.write("metade")
+    assert watcher.poll() == []
+    with open(log_file, 'a') as f:
+        f.write(" final\n")
+    assert watcher.poll() == ['metade final\n']
+    assert watcher.read() == ['linha 8\n', 'linha 9\n', 'linha 10\n', 'linha 11\n', 'metade final\n']
+
+
+def test_watcher_follows_rotation(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    write_lines(log_file, 0, 10, mode='w')
+    watcher = LogWatcher(log_file, max_lines=5)
+    watcher.poll()
+
+    # Rotação: o arquivo atual é renomeado e um novo (outro inode) é criado
+    os.rename(log_file, tmp_path / 'bot.log.1')
+    write_lines(log_file, 100, 3, mode='w')
+
+    assert watcher.poll() == ['linha 100\n', 'linha 101\n', 'linha 102\n']
+    write_lines(log_file, 103, 1)
+    assert watcher.poll() == ['linha 103\n']
+
+
+def test_watcher_follows_truncation(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    write_lines(log_file, 0, 50, mode='w')
+    watcher = LogWatcher(log_file, max_lines=5)
+    watcher.poll()
+
+    # Truncamento no mesmo inode: o arquivo fica menor que o offset lido
+    with open(log_file, 'r+') as f:
+        f.truncate(0)
+    write_lines(log_file, 200, 2)
+
+    assert watcher.poll() == ['linha 200\n', 'linha 201\n']
+    assert watcher.read() == ['linha 200\n', 'linha 201\n']
@@ -156,6 +156,26 @@ def print_balance():
     
     print_separator()
 
+def rebuild_statistics():
+    """Verifica e reconstrói as tabelas de estatísticas a partir das apostas"""
+    db = BetDatabase()
+    
+    print_separator()
+    mismatches = db.check_bet_stats()
+    if mismatches:
+        print(f"⚠️ Contadores gerais divergentes em {len(mismatches)} grupo(s):")
+        for row in mismatches:
+            print(f"  {row['sport'] or '-'} / {row['status'] or '-'}: "
+                  f"{row['stored_count']} registradas, {row['actual_count']} reais")
+    else:
+        print("✓ Contadores gerais consistentes")
+    
+    if db.rebuild_bet_stats() and db.rebuild_daily_stats():
+        print("✓ Estatísticas gerais e diárias reconstruídas a partir das apostas")
+    else:
+        print("❌ Erro ao reconstruir estatísticas (veja os logs)")
+    print_separator()
+
 def print_menu():
     """Mostra menu de opções"""
     print("\n" + "=" * 80)
@@ -169,6 +189,7 @@ def print_menu():
     print("  5 - Ver histórico (30 dias)")
     print("  6 - Ver saldo da conta")
     print("  7 - Ver tudo")
+    print("  8 - Verificar/reconstruir estatísticas")
     print("  0 - Sair")
     print()
 
@@ -203,6 +224,8 @@ def main():
                 print_active_bets()
                 print_today_bets()
                 print_recent_history(7)
+            elif option == '8':
+                rebuild_statistics()
             else:
                 print("\n❌ Opção inválida!")
             